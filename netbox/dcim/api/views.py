@@ -408,6 +408,8 @@ class DeviceViewSet(ConfigContextQuerySetMixin, NetBoxModelViewSet):
         If the `exclude` query param includes `config_context` as a value, return the DeviceSerializer
 
         Else, return the DeviceWithConfigContextSerializer
+
+        If the `fields` query param has been passed, the serializer includes only the requested fields
         """
 
         request = self.get_serializer_context()['request']
@@ -415,9 +417,9 @@ class DeviceViewSet(ConfigContextQuerySetMixin, NetBoxModelViewSet):
             return serializers.NestedDeviceSerializer
 
         elif 'config_context' in request.query_params.get('exclude', []):
-            return serializers.DeviceSerializer
+            return self.get_projected_serializer_class(serializers.DeviceSerializer)
 
-        return serializers.DeviceWithConfigContextSerializer
+        return self.get_projected_serializer_class(serializers.DeviceWithConfigContextSerializer)
 
     @swagger_auto_schema(
         manual_parameters=[
@@ -17,6 +17,16 @@ RACK_ELEVATION_DEFAULT_LEGEND_WIDTH = 30
 RACK_ELEVATION_DEFAULT_MARGIN_WIDTH = 15
 
 
+#
+# Cable paths
+#
+
+# Each CablePath node is packed into a single integer: the ContentType ID occupies the high bits and the object ID
+# the low PATH_NODE_OBJECT_ID_BITS bits.
+PATH_NODE_OBJECT_ID_BITS = 48
+PATH_NODE_OBJECT_ID_MASK = (1 << PATH_NODE_OBJECT_ID_BITS) - 1
+
+
 #
 # RearPorts
 #
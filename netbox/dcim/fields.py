@@ -11,6 +11,7 @@ __all__ = (
     'ASNField',
     'MACAddressField',
     'PathField',
+    'PathNodesField',
     'WWNField',
 )
 
@@ -97,11 +98,23 @@ class WWNField(models.Field):
 
 class PathField(ArrayField):
     """
-    An ArrayField which holds a set of objects, each identified by a (type, ID) tuple.
+    An ArrayField which holds a set of objects, each identified by a (type, ID) tuple. Retained for historical
+    migrations; superseded by PathNodesField.
     """
     def __init__(self, **kwargs):
         kwargs['base_field'] = models.CharField(max_length=40)
         super().__init__(**kwargs)
 
 
+class PathNodesField(ArrayField):
+    """
+    An ArrayField which holds a set of objects, each identified by a (type, ID) tuple packed into a single integer
+    (see compile_path_node()).
+    """
+    def __init__(self, **kwargs):
+        kwargs['base_field'] = models.BigIntegerField()
+        super().__init__(**kwargs)
+
+
 PathField.register_lookup(PathContains)
+PathNodesField.register_lookup(PathContains)
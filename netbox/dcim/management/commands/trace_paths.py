@@ -1,10 +1,17 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+from django.apps import apps
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 from django.core.management.color import no_style
-from django.db import connection
+from django.db import connection, connections, transaction
 from django.db.models import Q
 
 from dcim.models import CablePath, ConsolePort, ConsoleServerPort, Interface, PowerFeed, PowerOutlet, PowerPort
-from dcim.signals import create_cablepath
+from dcim.tracing import CablePathTracer
+from dcim.utils import bulk_create_cablepaths
 
 ENDPOINT_MODELS = (
     ConsolePort,
@@ -15,6 +22,44 @@ ENDPOINT_MODELS = (
     PowerPort
 )
 
+# Cache key under which the progress of a forced retrace is recorded, and the period (in seconds) for which it is kept
+CHECKPOINT_KEY = 'trace_paths_checkpoint'
+CHECKPOINT_TIMEOUT = 86400
+
+
+# Database connections inherited by a worker process from the parent (see discard_db_connections())
+_inherited_connections = []
+
+
+def discard_db_connections():
+    """
+    Discard any database connections inherited from the parent process, so that each worker opens its own. These must
+    not be closed, as this would also terminate the parent's database sessions. References to them are retained so
+    that they are not closed upon garbage collection either.
+    """
+    for conn in connections.all():
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
+
+def trace_origins(model_label, pks):
+    """
+    Trace and save the CablePaths originating from a batch of endpoints. Returns the number of paths created.
+    """
+    model = apps.get_model(model_label)
+    origins = list(model.objects.filter(pk__in=pks))
+
+    tracer = CablePathTracer()
+    tracer.prefetch(origins)
+    cablepaths = [tracer.trace([obj]) for obj in origins]
+    cablepaths = [cp for cp in cablepaths if cp is not None]
+
+    with transaction.atomic():
+        bulk_create_cablepaths(cablepaths)
+
+    return len(cablepaths)
+
 
 class Command(BaseCommand):
     help = "Generate any missing cable paths among all cable termination objects in NetBox"
@@ -28,6 +73,18 @@ class Command(BaseCommand):
             "--no-input", action='store_true', dest='no_input',
             help="Do not prompt user for any input/confirmation"
         )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of worker processes to trace paths in parallel (default: 1)"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of endpoints to trace and save per batch (default: 1000)"
+        )
+        parser.add_argument(
+            "--resume", action='store_true',
+            help="With --force, resume an interrupted forced run (if any) instead of starting over"
+        )
 
     def draw_progress_bar(self, percentage):
         """
@@ -36,55 +93,127 @@ class Command(BaseCommand):
         bar_size = int(percentage / 5)
         self.stdout.write(f"\r  [{'#' * bar_size}{' ' * (20-bar_size)}] {int(percentage)}%", ending='')
 
+    def delete_paths(self, options):
+        """
+        Delete all existing CablePaths and reset the PK sequence. Returns False if the user aborts.
+        """
+        cable_paths = CablePath.objects.all()
+        paths_count = cable_paths.count()
+
+        # Prompt the user to confirm recalculation of all paths
+        if paths_count and not options['no_input']:
+            self.stdout.write(self.style.ERROR("WARNING: Forcing recalculation of all cable paths."))
+            self.stdout.write(
+                f"This will delete and recalculate all {paths_count} existing cable paths. Are you sure?"
+            )
+            confirmation = input("Type yes to confirm: ")
+            if confirmation != 'yes':
+                self.stdout.write(self.style.SUCCESS("Aborting"))
+                return False
+
+        # Delete all existing CablePath instances
+        self.stdout.write(f"Deleting {paths_count} existing cable paths...")
+        deleted_count, _ = CablePath.objects.all().delete()
+        self.stdout.write((self.style.SUCCESS(f'  Deleted {deleted_count} paths')))
+
+        # Reinitialize the model's PK sequence
+        self.stdout.write(f'Resetting database sequence for CablePath model')
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), [CablePath])
+        with connection.cursor() as cursor:
+            for sql in sequence_sql:
+                cursor.execute(sql)
+
+        return True
+
     def handle(self, *model_names, **options):
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+
+        # If --force was passed, first delete all existing CablePaths. If --resume was also passed and a previous
+        # forced run was interrupted, its paths have already been deleted: resume tracing the endpoints which still
+        # lack a path.
+        checkpoint = cache.get(CHECKPOINT_KEY) if options['resume'] else None
+        if options['force'] and checkpoint:
+            self.stdout.write(self.style.WARNING(
+                f"Resuming an interrupted forced run (completed: {', '.join(checkpoint['completed']) or 'none'})"
+            ))
+        elif options['force']:
+            if not self.delete_paths(options):
+                return
+            checkpoint = {'completed': []}
+            cache.set(CHECKPOINT_KEY, checkpoint, CHECKPOINT_TIMEOUT)
 
-        # If --force was passed, first delete all existing CablePaths
-        if options['force']:
-            cable_paths = CablePath.objects.all()
-            paths_count = cable_paths.count()
-
-            # Prompt the user to confirm recalculation of all paths
-            if paths_count and not options['no_input']:
-                self.stdout.write(self.style.ERROR("WARNING: Forcing recalculation of all cable paths."))
-                self.stdout.write(
-                    f"This will delete and recalculate all {paths_count} existing cable paths. Are you sure?"
-                )
-                confirmation = input("Type yes to confirm: ")
-                if confirmation != 'yes':
-                    self.stdout.write(self.style.SUCCESS("Aborting"))
-                    return
-
-            # Delete all existing CablePath instances
-            self.stdout.write(f"Deleting {paths_count} existing cable paths...")
-            deleted_count, _ = CablePath.objects.all().delete()
-            self.stdout.write((self.style.SUCCESS(f'  Deleted {deleted_count} paths')))
-
-            # Reinitialize the model's PK sequence
-            self.stdout.write(f'Resetting database sequence for CablePath model')
-            sequence_sql = connection.ops.sequence_reset_sql(no_style(), [CablePath])
-            with connection.cursor() as cursor:
-                for sql in sequence_sql:
-                    cursor.execute(sql)
-
-        # Retrace paths
-        for model in ENDPOINT_MODELS:
-            params = Q(cable__isnull=False)
-            if hasattr(model, 'wireless_link'):
-                params |= Q(wireless_link__isnull=False)
-            origins = model.objects.filter(params)
-            if not options['force']:
-                origins = origins.filter(_path__isnull=True)
-            origins_count = origins.count()
-            if not origins_count:
-                self.stdout.write(f'Found no missing {model._meta.verbose_name} paths; skipping')
-                continue
-            self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
-            i = 0
-            for i, obj in enumerate(origins, start=1):
-                create_cablepath([obj])
-                if not i % 100:
-                    self.draw_progress_bar(i * 100 / origins_count)
-            self.draw_progress_bar(100)
-            self.stdout.write(self.style.SUCCESS(f'\n  Retraced {i} {model._meta.verbose_name_plural}'))
+        pool = None
+        if workers > 1:
+            # Workers are forked upon the submission of the first batch, by which point the parent will have opened a
+            # database connection: each worker discards the inherited connection and opens its own
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('fork'),
+                initializer=discard_db_connections
+            )
 
+        try:
+            # Retrace paths
+            for model in ENDPOINT_MODELS:
+                if options['force'] and model._meta.label in checkpoint['completed']:
+                    self.stdout.write(f'Already retraced all {model._meta.verbose_name_plural}; skipping')
+                    continue
+                params = Q(cable__isnull=False)
+                if hasattr(model, 'wireless_link'):
+                    params |= Q(wireless_link__isnull=False)
+                # Endpoints which already have a path have been traced (existing paths are deleted when forcing)
+                origins = model.objects.filter(params, _path__isnull=True)
+                pks = list(origins.order_by('pk').values_list('pk', flat=True))
+                if not pks:
+                    self.stdout.write(f'Found no missing {model._meta.verbose_name} paths; skipping')
+                else:
+                    self.retrace(model, pks, pool, batch_size)
+
+                if options['force']:
+                    checkpoint['completed'].append(model._meta.label)
+                    cache.set(CHECKPOINT_KEY, checkpoint, CHECKPOINT_TIMEOUT)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        cache.delete(CHECKPOINT_KEY)
         self.stdout.write(self.style.SUCCESS('Finished.'))
+
+    def retrace(self, model, pks, pool, batch_size):
+        """
+        Trace all paths originating from the given endpoints, in batches, reporting progress and throughput.
+        """
+        origins_count = len(pks)
+        self.stdout.write(f'Retracing {origins_count} cabled {model._meta.verbose_name_plural}...')
+        batches = [pks[i:i + batch_size] for i in range(0, origins_count, batch_size)]
+        start_time = time.monotonic()
+        completed = 0
+
+        if pool is None:
+            results = (
+                (len(batch), trace_origins(model._meta.label, batch)) for batch in batches
+            )
+        else:
+            futures = {
+                pool.submit(trace_origins, model._meta.label, batch): len(batch) for batch in batches
+            }
+            results = (
+                (futures[future], future.result()) for future in as_completed(futures)
+            )
+
+        try:
+            for batch_length, _ in results:
+                completed += batch_length
+                self.draw_progress_bar(completed * 100 / origins_count)
+        finally:
+            # Cancel any pending batches if interrupted
+            if pool is not None:
+                for future in futures:
+                    future.cancel()
+
+        elapsed = time.monotonic() - start_time
+        rate = completed / elapsed if elapsed else completed
+        self.stdout.write(self.style.SUCCESS(
+            f'\n  Retraced {completed} {model._meta.verbose_name_plural} in {elapsed:.1f}s ({rate:.0f} objects/sec)'
+        ))
@@ -0,0 +1,72 @@
+import itertools
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+import dcim.fields
+from dcim.utils import compile_path_node, decompile_path_node
+
+
+def pack_node(node):
+    # Nodes may be either legacy strings in the form <ContentType ID>:<Object ID> or already packed integers
+    if isinstance(node, str):
+        ct_id, object_id = node.split(':')
+        return compile_path_node(int(ct_id), int(object_id))
+    return node
+
+
+def pack_cable_paths(apps, schema_editor):
+    """
+    Convert the nodes of all CablePaths to packed integers.
+    """
+    CablePath = apps.get_model('dcim', 'CablePath')
+
+    cable_paths = []
+    for cablepath in CablePath.objects.all():
+        cablepath.path = [
+            [pack_node(node) for node in step] for step in cablepath.path
+        ]
+        cablepath._nodes = list(itertools.chain(*cablepath.path))
+        cable_paths.append(cablepath)
+
+    CablePath.objects.bulk_update(cable_paths, fields=('path', '_nodes'), batch_size=100)
+
+
+def unpack_cable_paths(apps, schema_editor):
+    """
+    Revert the nodes of all CablePaths to strings.
+    """
+    CablePath = apps.get_model('dcim', 'CablePath')
+
+    cable_paths = []
+    for cablepath in CablePath.objects.all():
+        cablepath.path = [
+            ['{}:{}'.format(*decompile_path_node(int(node))) for node in step] for step in cablepath.path
+        ]
+        cablepath._nodes = list(itertools.chain(*cablepath.path))
+        cable_paths.append(cablepath)
+
+    CablePath.objects.bulk_update(cable_paths, fields=('path', '_nodes'), batch_size=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0161_cabling_cleanup'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=pack_cable_paths,
+            reverse_code=unpack_cable_paths
+        ),
+        migrations.AlterField(
+            model_name='cablepath',
+            name='_nodes',
+            field=dcim.fields.PathNodesField(base_field=models.BigIntegerField(), size=None),
+        ),
+        migrations.AddIndex(
+            model_name='cablepath',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['_nodes'], name='dcim_cablepath_nodes_gin'),
+        ),
+    ]
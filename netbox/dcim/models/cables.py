@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Sum
@@ -11,13 +12,12 @@ from django.urls import reverse
 
 from dcim.choices import *
 from dcim.constants import *
-from dcim.fields import PathField
-from dcim.utils import decompile_path_node, object_to_path_node, path_node_to_object
+from dcim.fields import PathNodesField
+from dcim.utils import decompile_path_node
 from netbox.models import NetBoxModel
 from utilities.fields import ColorField
 from utilities.querysets import RestrictedQuerySet
 from utilities.utils import to_meters
-from wireless.models import WirelessLink
 from .device_components import FrontPort, RearPort
 
 __all__ = (
@@ -370,7 +370,9 @@ class CablePath(models.Model):
     if the instance represents a complete end-to-end path from origin(s) to destination(s). `is_split` is True if the
     path diverges across multiple cables.
 
-    `_nodes` retains a flattened list of all nodes within the path to enable simple filtering.
+    Each node is stored as a single integer packing its ContentType ID and object ID (see compile_path_node()).
+
+    `_nodes` retains a flattened list of all nodes within the path to enable simple (GIN-indexed) filtering.
     """
     path = models.JSONField(
         default=list
@@ -384,7 +386,12 @@ class CablePath(models.Model):
     is_split = models.BooleanField(
         default=False
     )
-    _nodes = PathField()
+    _nodes = PathNodesField()
+
+    class Meta:
+        indexes = (
+            GinIndex(fields=('_nodes',), name='dcim_cablepath_nodes_gin'),
+        )
 
     def __str__(self):
         return f"Path #{self.pk}: {len(self.path)} hops"
@@ -443,161 +450,26 @@ class CablePath(models.Model):
         return int(len(self.path) / 3)
 
     @classmethod
-    def from_origin(cls, terminations):
+    def from_origin(cls, terminations, tracer=None):
         """
         Create a new CablePath instance as traced from the given termination objects. These can be any object to which a
         Cable or WirelessLink connects (interfaces, console ports, circuit termination, etc.). All terminations must be
         of the same type and must belong to the same parent object.
-        """
-        from circuits.models import CircuitTermination
 
-        if not terminations:
-            return None
+        An existing CablePathTracer may be passed to reuse topology which has already been loaded for other paths.
+        """
+        from dcim.tracing import CablePathTracer
 
-        # Ensure all originating terminations are attached to the same link
-        if len(terminations) > 1:
-            assert all(t.link == terminations[0].link for t in terminations[1:])
+        if tracer is None:
+            tracer = CablePathTracer()
 
-        path = []
-        position_stack = []
-        is_complete = False
-        is_active = True
-        is_split = False
-
-        while terminations:
-
-            # Terminations must all be of the same type
-            assert all(isinstance(t, type(terminations[0])) for t in terminations[1:])
-
-            # Check for a split path (e.g. rear port fanning out to multiple front ports with
-            # different cables attached)
-            if len(set(t.link for t in terminations)) > 1:
-                is_split = True
-                break
-
-            # Step 1: Record the near-end termination object(s)
-            path.append([
-                object_to_path_node(t) for t in terminations
-            ])
-
-            # Step 2: Determine the attached link (Cable or WirelessLink), if any
-            link = terminations[0].link
-            if link is None and len(path) == 1:
-                # If this is the start of the path and no link exists, return None
-                return None
-            elif link is None:
-                # Otherwise, halt the trace if no link exists
-                break
-            assert type(link) in (Cable, WirelessLink)
-
-            # Step 3: Record the link and update path status if not "connected"
-            path.append([object_to_path_node(link)])
-            if hasattr(link, 'status') and link.status != LinkStatusChoices.STATUS_CONNECTED:
-                is_active = False
-
-            # Step 4: Determine the far-end terminations
-            if isinstance(link, Cable):
-                termination_type = ContentType.objects.get_for_model(terminations[0])
-                local_cable_terminations = CableTermination.objects.filter(
-                    termination_type=termination_type,
-                    termination_id__in=[t.pk for t in terminations]
-                )
-                # Terminations must all belong to same end of Cable
-                local_cable_end = local_cable_terminations[0].cable_end
-                assert all(ct.cable_end == local_cable_end for ct in local_cable_terminations[1:])
-                remote_cable_terminations = CableTermination.objects.filter(
-                    cable=link,
-                    cable_end='A' if local_cable_end == 'B' else 'B'
-                )
-                remote_terminations = [ct.termination for ct in remote_cable_terminations]
-            else:
-                # WirelessLink
-                remote_terminations = [link.interface_b] if link.interface_a is terminations[0] else [link.interface_a]
-
-            # Step 5: Record the far-end termination object(s)
-            path.append([
-                object_to_path_node(t) for t in remote_terminations
-            ])
-
-            # Step 6: Determine the "next hop" terminations, if applicable
-            if not remote_terminations:
-                break
-
-            if isinstance(remote_terminations[0], FrontPort):
-                # Follow FrontPorts to their corresponding RearPorts
-                rear_ports = RearPort.objects.filter(
-                    pk__in=[t.rear_port_id for t in remote_terminations]
-                )
-                if len(rear_ports) > 1:
-                    assert all(rp.positions == 1 for rp in rear_ports)
-                elif rear_ports[0].positions > 1:
-                    position_stack.append([fp.rear_port_position for fp in remote_terminations])
-
-                terminations = rear_ports
-
-            elif isinstance(remote_terminations[0], RearPort):
-
-                if len(remote_terminations) > 1 or remote_terminations[0].positions == 1:
-                    front_ports = FrontPort.objects.filter(
-                        rear_port_id__in=[rp.pk for rp in remote_terminations],
-                        rear_port_position=1
-                    )
-                elif position_stack:
-                    front_ports = FrontPort.objects.filter(
-                        rear_port_id=remote_terminations[0].pk,
-                        rear_port_position__in=position_stack.pop()
-                    )
-                else:
-                    # No position indicated: path has split, so we stop at the RearPorts
-                    is_split = True
-                    break
-
-                terminations = front_ports
-
-            elif isinstance(remote_terminations[0], CircuitTermination):
-                # Follow a CircuitTermination to its corresponding CircuitTermination (A to Z or vice versa)
-                term_side = remote_terminations[0].term_side
-                assert all(ct.term_side == term_side for ct in remote_terminations[1:])
-                circuit_termination = CircuitTermination.objects.filter(
-                    circuit=remote_terminations[0].circuit,
-                    term_side='Z' if term_side == 'A' else 'A'
-                ).first()
-                if circuit_termination is None:
-                    break
-                elif circuit_termination.provider_network:
-                    # Circuit terminates to a ProviderNetwork
-                    path.extend([
-                        [object_to_path_node(circuit_termination)],
-                        [object_to_path_node(circuit_termination.provider_network)],
-                    ])
-                    break
-                elif circuit_termination.site and not circuit_termination.cable:
-                    # Circuit terminates to a Site
-                    path.extend([
-                        [object_to_path_node(circuit_termination)],
-                        [object_to_path_node(circuit_termination.site)],
-                    ])
-                    break
-
-                terminations = [circuit_termination]
-
-            # Anything else marks the end of the path
-            else:
-                is_complete = True
-                break
-
-        return cls(
-            path=path,
-            is_complete=is_complete,
-            is_active=is_active,
-            is_split=is_split
-        )
+        return tracer.trace(terminations)
 
-    def retrace(self):
+    def retrace(self, tracer=None):
         """
         Retrace the path from the currently-defined originating termination(s)
         """
-        _new = self.from_origin(self.origins)
+        _new = self.from_origin(self.origins, tracer=tracer)
         if _new:
             self.path = _new.path
             self.is_complete = _new.is_complete
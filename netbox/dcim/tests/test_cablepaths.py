@@ -4,6 +4,7 @@ from circuits.models import *
 from dcim.choices import LinkStatusChoices
 from dcim.models import *
 from dcim.svg import CableTraceSVG
+from dcim.tracing import CablePathTracer
 from dcim.utils import object_to_path_node
 
 
@@ -15,6 +16,7 @@ class CablePathTestCase(TestCase):
         1XX: Test direct connections between different endpoint types
         2XX: Test different cable topologies
         3XX: Test responses to changes in existing objects
+        4XX: Test bulk tracing
     """
     @classmethod
     def setUpTestData(cls):
@@ -1803,3 +1805,84 @@ class CablePathTestCase(TestCase):
             is_active=True
         )
         self.assertEqual(CablePath.objects.count(), 2)
+
+    def test_401_prefetched_tracer(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [RP2] [FP2] --C3-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=1)
+        rearport2 = RearPort.objects.create(device=self.device, name='Rear Port 2', positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=1
+        )
+        frontport2 = FrontPort.objects.create(
+            device=self.device, name='Front Port 2', rear_port=rearport2, rear_port_position=1
+        )
+        Cable(a_terminations=[interface1], b_terminations=[frontport1]).save()
+        Cable(a_terminations=[rearport1], b_terminations=[rearport2]).save()
+        Cable(a_terminations=[frontport2], b_terminations=[interface2]).save()
+
+        interfaces = Interface.objects.filter(pk__in=(interface1.pk, interface2.pk))
+        tracer = CablePathTracer()
+        tracer.prefetch(interfaces)
+
+        # Once the topology has been loaded, tracing requires no further queries
+        for interface in interfaces:
+            with self.assertNumQueries(0):
+                cablepath = tracer.trace([interface])
+            self.assertEqual(cablepath.path, interface._path.path)
+            self.assertEqual(cablepath.is_complete, interface._path.is_complete)
+            self.assertEqual(cablepath.is_active, interface._path.is_active)
+            self.assertEqual(cablepath.is_split, interface._path.is_split)
+
+    def test_402_partial_retrace(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [RP2] [FP2] --C3-- [IF2]
+        """
+        interface1 = Interface.objects.create(device=self.device, name='Interface 1')
+        interface2 = Interface.objects.create(device=self.device, name='Interface 2')
+        rearport1 = RearPort.objects.create(device=self.device, name='Rear Port 1', positions=4)
+        rearport2 = RearPort.objects.create(device=self.device, name='Rear Port 2', positions=4)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name='Front Port 1', rear_port=rearport1, rear_port_position=2
+        )
+        frontport2 = FrontPort.objects.create(
+            device=self.device, name='Front Port 2', rear_port=rearport2, rear_port_position=2
+        )
+        cable1 = Cable(a_terminations=[interface1], b_terminations=[frontport1])
+        cable1.save()
+        cable2 = Cable(a_terminations=[rearport1], b_terminations=[rearport2])
+        cable2.save()
+        cable3 = Cable(a_terminations=[frontport2], b_terminations=[interface2])
+        cable3.save()
+        self.assertEqual(CablePath.objects.count(), 2)
+
+        # Re-walking a path from any step must reproduce the complete path
+        for cablepath in CablePath.objects.all():
+            for index in range(len(cablepath.path)):
+                new_path = CablePathTracer().retrace(cablepath, index)
+                self.assertEqual(new_path.path, cablepath.path)
+                self.assertEqual(new_path.is_complete, cablepath.is_complete)
+                self.assertEqual(new_path.is_active, cablepath.is_active)
+
+        # Toggling the status of cable 3 updates the existing paths in place
+        path_ids = set(CablePath.objects.values_list('pk', flat=True))
+        cable3 = Cable.objects.get(pk=cable3.pk)
+        cable3.status = LinkStatusChoices.STATUS_PLANNED
+        cable3.save()
+        cable3 = Cable.objects.get(pk=cable3.pk)
+        cable3.status = LinkStatusChoices.STATUS_CONNECTED
+        cable3.save()
+        self.assertEqual(set(CablePath.objects.values_list('pk', flat=True)), path_ids)
+        self.assertPathExists(
+            (interface1, cable1, frontport1, rearport1, cable2, rearport2, frontport2, cable3, interface2),
+            is_complete=True,
+            is_active=True
+        )
+        self.assertPathExists(
+            (interface2, cable3, frontport2, rearport2, cable2, rearport1, frontport1, cable1, interface1),
+            is_complete=True,
+            is_active=True
+        )
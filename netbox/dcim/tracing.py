@@ -0,0 +1,594 @@
+import itertools
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Subquery
+
+from circuits.models import CircuitTermination, ProviderNetwork
+from wireless.models import WirelessLink
+from .choices import LinkStatusChoices
+from .models import Cable, CablePath, CableTermination, FrontPort, Interface, RearPort, Site
+from .utils import compile_path_node, decompile_path_node
+
+__all__ = (
+    'CablePathTracer',
+)
+
+
+class CablePathTracer:
+    """
+    Trace CablePaths against an in-memory copy of the cable topology. Cables, CableTerminations, front/rear ports,
+    circuit terminations and wireless links are loaded in bulk (either up front via prefetch() or lazily when a
+    trace encounters an object which has not yet been loaded), so that tracing many paths costs a handful of
+    queries per hop depth rather than several queries per hop per path.
+
+    A tracer holds a snapshot of the topology: it must not be reused after cables or ports have been modified.
+
+        tracer = CablePathTracer()
+        tracer.prefetch(interfaces)
+        for interface in interfaces:
+            cablepath = tracer.trace([interface])
+    """
+    def __init__(self):
+        self._content_types = {}
+
+        # Cable ID -> status
+        self._cable_status = {}
+        # Cable ID -> list of (cable_end, node) tuples, in CableTermination order
+        self._cable_terminations = {}
+        # Device IDs for which all front & rear ports have been loaded
+        self._devices = set()
+        # Node -> device ID for port terminations encountered on cables
+        self._node_devices = {}
+        # RearPort ID -> (device_id, rank, cable_id, positions)
+        self._rear_ports = {}
+        # FrontPort ID -> (device_id, rank, cable_id, rear_port_id, rear_port_position)
+        self._front_ports = {}
+        # RearPort ID -> list of FrontPort IDs
+        self._rear_port_front_ports = defaultdict(list)
+        # CircuitTermination ID -> (circuit_id, term_side, provider_network_id, site_id, cable_id)
+        self._circuit_terminations = {}
+        # (circuit_id, term_side) -> CircuitTermination ID
+        self._circuit_sides = {}
+        # WirelessLink ID -> (interface_a_id, interface_b_id, status)
+        self._wireless_links = {}
+        # Node -> link tuple for path endpoints (interfaces, console ports, etc.) loaded by node
+        self._endpoint_links = {}
+
+    #
+    # Content types
+    #
+
+    def _ct_id(self, model):
+        if model not in self._content_types:
+            self._content_types[model] = ContentType.objects.get_for_model(model).pk
+        return self._content_types[model]
+
+    #
+    # Bulk loading
+    #
+
+    def _load_cables(self, cable_ids):
+        cable_ids = set(cable_ids) - set(self._cable_terminations)
+        if not cable_ids:
+            return
+        for cable_id in cable_ids:
+            self._cable_terminations[cable_id] = []
+        for pk, status in Cable.objects.filter(pk__in=cable_ids).values_list('pk', 'status'):
+            self._cable_status[pk] = status
+
+        cable_terminations = CableTermination.objects.filter(cable_id__in=cable_ids).values_list(
+            'cable_id', 'cable_end', 'termination_type_id', 'termination_id', '_device_id'
+        )
+        for cable_id, cable_end, ct_id, object_id, device_id in cable_terminations:
+            node = (ct_id, object_id)
+            self._cable_terminations[cable_id].append((cable_end, node))
+            if device_id:
+                self._node_devices[node] = device_id
+
+    def _load_devices(self, device_ids):
+        device_ids = set(device_ids) - self._devices
+        if not device_ids:
+            return
+        self._devices.update(device_ids)
+
+        # Ports are ranked in their default ordering within each device, to reproduce database ordering in memory
+        ranks = defaultdict(int)
+        rear_ports = RearPort.objects.filter(device_id__in=device_ids).values_list(
+            'pk', 'device_id', 'cable_id', 'positions'
+        )
+        for pk, device_id, cable_id, positions in rear_ports:
+            self._rear_ports[pk] = (device_id, ranks[device_id], cable_id, positions)
+            ranks[device_id] += 1
+
+        ranks = defaultdict(int)
+        front_ports = FrontPort.objects.filter(device_id__in=device_ids).values_list(
+            'pk', 'device_id', 'cable_id', 'rear_port_id', 'rear_port_position'
+        )
+        for pk, device_id, cable_id, rear_port_id, rear_port_position in front_ports:
+            self._front_ports[pk] = (device_id, ranks[device_id], cable_id, rear_port_id, rear_port_position)
+            self._rear_port_front_ports[rear_port_id].append(pk)
+            ranks[device_id] += 1
+
+    def _load_ports(self, model, pks):
+        """
+        Ensure that the given FrontPorts or RearPorts (and all other ports on their parent devices) are loaded.
+        """
+        ct_id = self._ct_id(model)
+        loaded = self._front_ports if model is FrontPort else self._rear_ports
+        pks = [pk for pk in pks if pk not in loaded]
+        if not pks:
+            return
+        device_ids = {self._node_devices.get((ct_id, pk)) for pk in pks}
+        if None in device_ids:
+            device_ids = set(model.objects.filter(pk__in=pks).values_list('device_id', flat=True))
+        self._load_devices(device_ids)
+
+    def _load_circuit_terminations(self, pks):
+        pks = set(pks) - set(self._circuit_terminations)
+        if not pks:
+            return
+        # Load both sides of each circuit
+        circuit_ids = CircuitTermination.objects.filter(pk__in=pks).values('circuit_id')
+        circuit_terminations = CircuitTermination.objects.filter(circuit_id__in=Subquery(circuit_ids)).values_list(
+            'pk', 'circuit_id', 'term_side', 'provider_network_id', 'site_id', 'cable_id'
+        )
+        for pk, circuit_id, term_side, provider_network_id, site_id, cable_id in circuit_terminations:
+            self._circuit_terminations[pk] = (circuit_id, term_side, provider_network_id, site_id, cable_id)
+            self._circuit_sides[(circuit_id, term_side)] = pk
+
+    def _load_wireless_links(self, pks):
+        pks = set(pks) - set(self._wireless_links)
+        if not pks:
+            return
+        wireless_links = WirelessLink.objects.filter(pk__in=pks).values_list(
+            'pk', 'interface_a_id', 'interface_b_id', 'status'
+        )
+        for pk, interface_a_id, interface_b_id, status in wireless_links:
+            self._wireless_links[pk] = (interface_a_id, interface_b_id, status)
+
+    def _load_endpoints(self, model, pks):
+        ct_id = self._ct_id(model)
+        pks = [pk for pk in pks if (ct_id, pk) not in self._endpoint_links]
+        if not pks:
+            return
+        fields = ['pk', 'cable_id']
+        if hasattr(model, 'wireless_link'):
+            fields.append('wireless_link_id')
+        for pk, cable_id, *wireless_link_id in model.objects.filter(pk__in=pks).values_list(*fields):
+            if cable_id:
+                self._endpoint_links[(ct_id, pk)] = ('cable', cable_id)
+            elif wireless_link_id and wireless_link_id[0]:
+                self._endpoint_links[(ct_id, pk)] = ('wireless', wireless_link_id[0])
+            else:
+                self._endpoint_links[(ct_id, pk)] = None
+
+    def _load_nodes(self, nodes):
+        """
+        Ensure that the given path nodes (and their links, if any) are loaded, using one query per object type.
+        """
+        to_load = defaultdict(set)
+        for ct_id, object_id in nodes:
+            to_load[ct_id].add(object_id)
+
+        for ct_id, pks in to_load.items():
+            model = ContentType.objects.get_for_id(ct_id).model_class()
+            if model in (FrontPort, RearPort):
+                self._load_ports(model, pks)
+            elif model is CircuitTermination:
+                self._load_circuit_terminations(pks)
+            elif model is Cable:
+                self._load_cables(pks)
+            elif model is WirelessLink:
+                self._load_wireless_links(pks)
+            elif hasattr(model, 'cable'):
+                self._load_endpoints(model, pks)
+
+    def _has_node(self, node):
+        """
+        Return True if the given (loaded) termination node still exists.
+        """
+        ct_id, object_id = node
+        if ct_id == self._ct_id(FrontPort):
+            return object_id in self._front_ports
+        elif ct_id == self._ct_id(RearPort):
+            return object_id in self._rear_ports
+        elif ct_id == self._ct_id(CircuitTermination):
+            return object_id in self._circuit_terminations
+        return node in self._endpoint_links
+
+    def prefetch(self, terminations):
+        """
+        Load the complete topology reachable from the given termination objects. Each hop of depth costs a fixed
+        number of queries regardless of the number of terminations.
+        """
+        cable_ids = set()
+        wireless_link_ids = set()
+        for t in terminations:
+            if getattr(t, 'cable_id', None):
+                cable_ids.add(t.cable_id)
+            elif getattr(t, 'wireless_link_id', None):
+                wireless_link_ids.add(t.wireless_link_id)
+        self._load_wireless_links(wireless_link_ids)
+        self._prefetch_cables(cable_ids)
+
+    def prefetch_devices(self, devices):
+        """
+        Load the complete topology reachable from every cabled component of the given Devices (or Device IDs).
+        """
+        device_ids = {getattr(device, 'pk', device) for device in devices}
+        cable_ids = CableTermination.objects.filter(_device_id__in=device_ids).values_list('cable_id', flat=True)
+        self._load_devices(device_ids)
+        self._prefetch_cables(set(cable_ids))
+
+    def _prefetch_cables(self, cable_ids):
+        """
+        Load the given Cables and walk outward through any pass-through terminations, one hop per iteration.
+        """
+        frontport_ct = self._ct_id(FrontPort)
+        rearport_ct = self._ct_id(RearPort)
+        circuittermination_ct = self._ct_id(CircuitTermination)
+
+        cable_ids = set(cable_ids) - set(self._cable_terminations)
+        while cable_ids:
+            self._load_cables(cable_ids)
+
+            # Collect the pass-through terminations attached to this set of cables
+            front_port_ids, rear_port_ids, circuit_termination_ids = set(), set(), set()
+            device_ids = set()
+            for cable_id in cable_ids:
+                for cable_end, node in self._cable_terminations[cable_id]:
+                    ct_id, object_id = node
+                    if ct_id == frontport_ct:
+                        front_port_ids.add(object_id)
+                    elif ct_id == rearport_ct:
+                        rear_port_ids.add(object_id)
+                    elif ct_id == circuittermination_ct:
+                        circuit_termination_ids.add(object_id)
+                    else:
+                        continue
+                    if node in self._node_devices:
+                        device_ids.add(self._node_devices[node])
+            self._load_devices(device_ids)
+            self._load_ports(FrontPort, front_port_ids)
+            self._load_ports(RearPort, rear_port_ids)
+            self._load_circuit_terminations(circuit_termination_ids)
+
+            # Determine the cables attached to the next hop of each pass-through termination
+            next_cable_ids = set()
+            for pk in front_port_ids:
+                rear_port_id = self._front_ports[pk][3]
+                next_cable_ids.add(self._rear_ports[rear_port_id][2])
+            for pk in rear_port_ids:
+                for front_port_id in self._rear_port_front_ports[pk]:
+                    next_cable_ids.add(self._front_ports[front_port_id][2])
+            for pk in circuit_termination_ids:
+                circuit_id, term_side = self._circuit_terminations[pk][:2]
+                peer_id = self._circuit_sides.get((circuit_id, 'Z' if term_side == 'A' else 'A'))
+                if peer_id is not None:
+                    next_cable_ids.add(self._circuit_terminations[peer_id][4])
+            next_cable_ids.discard(None)
+
+            cable_ids = next_cable_ids - set(self._cable_terminations)
+
+    def prefetch_retraces(self, retraces):
+        """
+        Load everything needed to retrace a set of existing CablePaths. `retraces` is an iterable of
+        (CablePath, index) tuples, as passed to retrace().
+        """
+        resume_nodes = set()
+        prefix_nodes = set()
+        for cablepath, index in retraces:
+            start = self._get_resume_step(index)
+            resume_nodes.update(decompile_path_node(node) for node in cablepath.path[start])
+            prefix_nodes.update(decompile_path_node(node) for node in itertools.chain(*cablepath.path[:start]))
+            if start:
+                # Load the origins too, in case the path must be retraced in full
+                resume_nodes.update(decompile_path_node(node) for node in cablepath.path[0])
+        self._load_nodes(resume_nodes | prefix_nodes)
+
+        cable_ids = set()
+        wireless_link_ids = set()
+        for node in resume_nodes:
+            if not self._has_node(node):
+                continue
+            link = self._get_link(node)
+            if link and link[0] == 'cable':
+                cable_ids.add(link[1])
+            elif link:
+                wireless_link_ids.add(link[1])
+        self._load_wireless_links(wireless_link_ids)
+        self._prefetch_cables(cable_ids)
+
+    def get_origins(self, cablepaths):
+        """
+        Return the list of originating objects for each of the given CablePaths, using one query per origin type.
+        """
+        to_fetch = defaultdict(set)
+        for cablepath in cablepaths:
+            for node in cablepath.path[0]:
+                ct_id, object_id = decompile_path_node(node)
+                to_fetch[ct_id].add(object_id)
+
+        objects = {}
+        for ct_id, object_ids in to_fetch.items():
+            model = ContentType.objects.get_for_id(ct_id).model_class()
+            for obj in model.objects.filter(pk__in=object_ids):
+                objects[(ct_id, obj.pk)] = obj
+
+        origins = []
+        for cablepath in cablepaths:
+            origins.append([
+                objects[decompile_path_node(node)] for node in cablepath.path[0]
+                if decompile_path_node(node) in objects
+            ])
+        return origins
+
+    #
+    # Tracing
+    #
+
+    def _order_ports(self, model, pks):
+        """
+        Return the given FrontPort or RearPort IDs (deduplicated) in the model's default ordering.
+        """
+        ports = self._front_ports if model is FrontPort else self._rear_ports
+        pks = list(dict.fromkeys(pks))
+        device_ids = {ports[pk][0] for pk in pks}
+        if len(device_ids) > 1:
+            # Devices are ordered by name; defer to the database to order ports spanning multiple devices
+            return list(model.objects.filter(pk__in=pks).values_list('pk', flat=True))
+        return sorted(pks, key=lambda pk: ports[pk][1])
+
+    def _get_link(self, node):
+        """
+        Return the link attached to a loaded node as a ('cable'|'wireless', ID) tuple, or None.
+        """
+        ct_id, object_id = node
+        if ct_id == self._ct_id(FrontPort):
+            cable_id = self._front_ports[object_id][2]
+        elif ct_id == self._ct_id(RearPort):
+            cable_id = self._rear_ports[object_id][2]
+        elif ct_id == self._ct_id(CircuitTermination):
+            cable_id = self._circuit_terminations[object_id][4]
+        else:
+            return self._endpoint_links[node]
+        return ('cable', cable_id) if cable_id else None
+
+    @staticmethod
+    def _get_resume_step(index):
+        """
+        Return the index of the near-end step from which a path must be re-walked when the node at the given step
+        has changed. A changed near-end node may also alter the hop leading to it (e.g. a circuit termination being
+        deleted), so the preceding segment is re-walked as well.
+        """
+        if index % 3:
+            return index - index % 3
+        return max(index - 3, 0)
+
+    def _replay(self, path, start):
+        """
+        Recover the tracing state (whether the path is active and the stack of rear port positions) at the given
+        near-end step of an existing path.
+        """
+        cable_ct = self._ct_id(Cable)
+        frontport_ct = self._ct_id(FrontPort)
+        rearport_ct = self._ct_id(RearPort)
+        is_active = True
+        position_stack = []
+
+        for i in range(1, start, 3):
+            ct_id, object_id = decompile_path_node(path[i][0])
+            if ct_id == cable_ct:
+                status = self._cable_status[object_id]
+            else:
+                status = self._wireless_links[object_id][2]
+            if status != LinkStatusChoices.STATUS_CONNECTED:
+                is_active = False
+
+        for i in range(2, start, 3):
+            far_nodes = [decompile_path_node(node) for node in path[i]]
+            near_nodes = [decompile_path_node(node) for node in path[i + 1]]
+            if far_nodes[0][0] == frontport_ct:
+                if len(near_nodes) == 1 and self._rear_ports[near_nodes[0][1]][3] > 1:
+                    position_stack.append([self._front_ports[pk][4] for _, pk in far_nodes])
+            elif far_nodes[0][0] == rearport_ct:
+                if len(far_nodes) == 1 and self._rear_ports[far_nodes[0][1]][3] > 1:
+                    position_stack.pop()
+
+        return is_active, position_stack
+
+    def retrace(self, cablepath, index=0):
+        """
+        Return a new (unsaved) CablePath instance by re-walking an existing CablePath from the segment in which the
+        given step index falls (e.g. the first step traversing a modified object). Steps before that segment are
+        reused as-is. Returns None if the path no longer originates from a connected termination.
+        """
+        start = self._get_resume_step(index)
+        nodes = [decompile_path_node(node) for node in cablepath.path[start]]
+        self._load_nodes(nodes)
+        if start and not all(self._has_node(node) for node in nodes):
+            # Objects have been deleted from the middle of the path; retrace it in full
+            start = 0
+            nodes = [decompile_path_node(node) for node in cablepath.path[0]]
+            self._load_nodes(nodes)
+        nodes = [node for node in nodes if self._has_node(node)]
+        if not nodes:
+            return None
+
+        path = [list(step) for step in cablepath.path[:start]]
+        self._load_nodes(decompile_path_node(node) for node in itertools.chain(*path))
+        is_active, position_stack = self._replay(cablepath.path, start)
+        links = {node: self._get_link(node) for node in nodes}
+
+        return self._walk(nodes, links, path, position_stack, is_active)
+
+    def trace(self, terminations):
+        """
+        Return a new (unsaved) CablePath instance as traced from the given termination objects, or None if the
+        terminations are not connected to a link. See CablePath.from_origin().
+        """
+        if not terminations:
+            return None
+
+        links = {}
+        for t in terminations:
+            node = (self._ct_id(type(t)), t.pk)
+            if getattr(t, 'cable_id', None):
+                links[node] = ('cable', t.cable_id)
+            elif getattr(t, 'wireless_link_id', None):
+                links[node] = ('wireless', t.wireless_link_id)
+            else:
+                links[node] = None
+        nodes = list(links)
+
+        # Ensure all originating terminations are attached to the same link
+        if len(nodes) > 1:
+            assert len(set(links.values())) == 1
+
+        return self._walk(nodes, links)
+
+    def _walk(self, nodes, links, path=None, position_stack=None, is_active=True):
+        """
+        Walk the topology from the given near-end nodes, extending `path` (if resuming an existing path) until the
+        path ends or splits.
+        """
+        cable_ct = self._ct_id(Cable)
+        frontport_ct = self._ct_id(FrontPort)
+        rearport_ct = self._ct_id(RearPort)
+        circuittermination_ct = self._ct_id(CircuitTermination)
+
+        path = path or []
+        position_stack = position_stack or []
+        is_complete = False
+        is_split = False
+
+        while nodes:
+
+            # Terminations must all be of the same type
+            assert all(node[0] == nodes[0][0] for node in nodes[1:])
+
+            # Check for a split path (e.g. rear port fanning out to multiple front ports with
+            # different cables attached)
+            if len(set(links[node] for node in nodes)) > 1:
+                is_split = True
+                break
+
+            # Step 1: Record the near-end termination object(s)
+            path.append([compile_path_node(*node) for node in nodes])
+
+            # Step 2: Determine the attached link (Cable or WirelessLink), if any
+            link = links[nodes[0]]
+            if link is None and len(path) == 1:
+                # If this is the start of the path and no link exists, return None
+                return None
+            elif link is None:
+                # Otherwise, halt the trace if no link exists
+                break
+            link_type, link_id = link
+
+            # Step 3: Record the link, update path status if not "connected", and determine the far-end
+            # terminations
+            if link_type == 'cable':
+                self._load_cables([link_id])
+                path.append([compile_path_node(cable_ct, link_id)])
+                if self._cable_status[link_id] != LinkStatusChoices.STATUS_CONNECTED:
+                    is_active = False
+                # Terminations must all belong to same end of Cable
+                local_cable_ends = [
+                    cable_end for cable_end, node in self._cable_terminations[link_id] if node in links
+                ]
+                local_cable_end = local_cable_ends[0]
+                assert all(cable_end == local_cable_end for cable_end in local_cable_ends[1:])
+                remote_nodes = [
+                    node for cable_end, node in self._cable_terminations[link_id] if cable_end != local_cable_end
+                ]
+            else:
+                self._load_wireless_links([link_id])
+                interface_a_id, interface_b_id, status = self._wireless_links[link_id]
+                path.append([compile_path_node(self._ct_id(WirelessLink), link_id)])
+                if status != LinkStatusChoices.STATUS_CONNECTED:
+                    is_active = False
+                remote_id = interface_b_id if interface_a_id == nodes[0][1] else interface_a_id
+                remote_nodes = [(self._ct_id(Interface), remote_id)]
+
+            # Step 4: Record the far-end termination object(s)
+            path.append([compile_path_node(*node) for node in remote_nodes])
+
+            # Step 5: Determine the "next hop" terminations, if applicable
+            if not remote_nodes:
+                break
+            remote_ct, remote_id = remote_nodes[0]
+            remote_ids = [object_id for _, object_id in remote_nodes]
+
+            if remote_ct == frontport_ct:
+                # Follow FrontPorts to their corresponding RearPorts
+                self._load_ports(FrontPort, remote_ids)
+                rear_port_ids = self._order_ports(RearPort, [self._front_ports[pk][3] for pk in remote_ids])
+                if len(rear_port_ids) > 1:
+                    assert all(self._rear_ports[pk][3] == 1 for pk in rear_port_ids)
+                elif self._rear_ports[rear_port_ids[0]][3] > 1:
+                    position_stack.append([self._front_ports[pk][4] for pk in remote_ids])
+
+                nodes = [(rearport_ct, pk) for pk in rear_port_ids]
+
+            elif remote_ct == rearport_ct:
+                self._load_ports(RearPort, remote_ids)
+
+                if len(remote_ids) > 1 or self._rear_ports[remote_id][3] == 1:
+                    front_port_ids = [
+                        pk for rp in remote_ids for pk in self._rear_port_front_ports[rp]
+                        if self._front_ports[pk][4] == 1
+                    ]
+                elif position_stack:
+                    positions = position_stack.pop()
+                    front_port_ids = [
+                        pk for pk in self._rear_port_front_ports[remote_id]
+                        if self._front_ports[pk][4] in positions
+                    ]
+                else:
+                    # No position indicated: path has split, so we stop at the RearPorts
+                    is_split = True
+                    break
+
+                nodes = [(frontport_ct, pk) for pk in self._order_ports(FrontPort, front_port_ids)]
+
+            elif remote_ct == circuittermination_ct:
+                # Follow a CircuitTermination to its corresponding CircuitTermination (A to Z or vice versa)
+                self._load_circuit_terminations(remote_ids)
+                circuit_id, term_side = self._circuit_terminations[remote_id][:2]
+                assert all(self._circuit_terminations[pk][1] == term_side for pk in remote_ids[1:])
+                peer_id = self._circuit_sides.get((circuit_id, 'Z' if term_side == 'A' else 'A'))
+                if peer_id is None:
+                    break
+                _, _, provider_network_id, site_id, cable_id = self._circuit_terminations[peer_id]
+                if provider_network_id:
+                    # Circuit terminates to a ProviderNetwork
+                    path.extend([
+                        [compile_path_node(circuittermination_ct, peer_id)],
+                        [compile_path_node(self._ct_id(ProviderNetwork), provider_network_id)],
+                    ])
+                    break
+                elif site_id and not cable_id:
+                    # Circuit terminates to a Site
+                    path.extend([
+                        [compile_path_node(circuittermination_ct, peer_id)],
+                        [compile_path_node(self._ct_id(Site), site_id)],
+                    ])
+                    break
+
+                nodes = [(circuittermination_ct, peer_id)]
+
+            # Anything else marks the end of the path
+            else:
+                is_complete = True
+                break
+
+            links = {node: self._get_link(node) for node in nodes}
+
+        return CablePath(
+            path=path,
+            is_complete=is_complete,
+            is_active=is_active,
+            is_split=is_split
+        )
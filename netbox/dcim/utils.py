@@ -1,22 +1,24 @@
 import itertools
+from collections import defaultdict
 
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
 
+from .constants import PATH_NODE_OBJECT_ID_BITS, PATH_NODE_OBJECT_ID_MASK
+
 
 def compile_path_node(ct_id, object_id):
-    return f'{ct_id}:{object_id}'
+    return (ct_id << PATH_NODE_OBJECT_ID_BITS) | object_id
 
 
 def decompile_path_node(repr):
-    ct_id, object_id = repr.split(':')
-    return int(ct_id), int(object_id)
+    return repr >> PATH_NODE_OBJECT_ID_BITS, repr & PATH_NODE_OBJECT_ID_MASK
 
 
 def object_to_path_node(obj):
     """
-    Return a representation of an object suitable for inclusion in a CablePath path. Node representation is in the
-    form <ContentType ID>:<Object ID>.
+    Return a representation of an object suitable for inclusion in a CablePath path. Nodes are represented as a single
+    integer, packing the ContentType ID into the high bits and the object ID into the low bits.
     """
     ct = ContentType.objects.get_for_model(obj)
     return compile_path_node(ct.pk, obj.pk)
@@ -32,29 +34,82 @@ def path_node_to_object(repr):
     return ct.model_class().objects.filter(pk=object_id).first()
 
 
-def create_cablepath(terminations):
+def create_cablepath(terminations, tracer=None):
     """
     Create CablePaths for all paths originating from the specified set of nodes.
 
     :param terminations: Iterable of CableTermination objects
+    :param tracer: A CablePathTracer to reuse for tracing (optional)
     """
     from dcim.models import CablePath
 
-    cp = CablePath.from_origin(terminations)
+    cp = CablePath.from_origin(terminations, tracer=tracer)
     if cp:
         cp.save()
 
 
+def bulk_create_cablepaths(cablepaths, batch_size=None):
+    """
+    Save a set of new CablePaths and record them on their originating objects using bulk queries.
+
+    :param cablepaths: Iterable of unsaved CablePath instances
+    :param batch_size: Maximum number of objects to insert or update per query (optional)
+    """
+    from dcim.models import CablePath
+
+    cablepaths = list(cablepaths)
+    for cp in cablepaths:
+        cp._nodes = list(itertools.chain(*cp.path))
+    CablePath.objects.bulk_create(cablepaths, batch_size=batch_size)
+
+    # Record a direct reference to each CablePath on its originating object(s)
+    origins = defaultdict(list)
+    for cp in cablepaths:
+        origin_model = cp.origin_type.model_class()
+        for node in cp.path[0]:
+            origins[origin_model].append(origin_model(pk=decompile_path_node(node)[1], _path_id=cp.pk))
+    for origin_model, objects in origins.items():
+        origin_model.objects.bulk_update(objects, ['_path'], batch_size=batch_size)
+
+
 def rebuild_paths(terminations):
     """
-    Rebuild all CablePaths which traverse the specified nodes.
+    Rebuild all CablePaths which traverse the specified nodes. Each path is re-walked only from the segment in which
+    it first traverses one of the nodes; the preceding steps are reused. Affected paths are saved using a single bulk
+    update (paths which no longer originate from a connected termination are deleted).
     """
     from dcim.models import CablePath
+    from dcim.tracing import CablePathTracer
 
+    # Map each affected CablePath to the first step at which it traverses any of the nodes
+    retraces = {}
     for obj in terminations:
-        cable_paths = CablePath.objects.filter(_nodes__contains=obj)
-
-        with transaction.atomic():
-            for cp in cable_paths:
-                cp.delete()
-                create_cablepath(cp.origins)
+        node = object_to_path_node(obj)
+        for cp in CablePath.objects.filter(_nodes__contains=obj):
+            index = next((i for i, step in enumerate(cp.path) if node in step), 0)
+            if cp.pk not in retraces or index < retraces[cp.pk][1]:
+                retraces[cp.pk] = (cp, index)
+    if not retraces:
+        return
+
+    tracer = CablePathTracer()
+    tracer.prefetch_retraces(retraces.values())
+
+    to_update = []
+    to_delete = []
+    for cp, index in retraces.values():
+        new_path = tracer.retrace(cp, index)
+        if new_path is None:
+            to_delete.append(cp.pk)
+            continue
+        cp.path = new_path.path
+        cp._nodes = list(itertools.chain(*cp.path))
+        cp.is_active = new_path.is_active
+        cp.is_complete = new_path.is_complete
+        cp.is_split = new_path.is_split
+        to_update.append(cp)
+
+    with transaction.atomic():
+        if to_delete:
+            CablePath.objects.filter(pk__in=to_delete).delete()
+        CablePath.objects.bulk_update(to_update, ('path', '_nodes', 'is_active', 'is_complete', 'is_split'))
@@ -12,6 +12,7 @@ from rq import Worker
 
 from extras import filtersets
 from extras.choices import JobResultStatusChoices
+from extras.configcontexts import prefetch_config_contexts
 from extras.models import *
 from extras.models import CustomField
 from extras.reports import get_report, get_reports, run_report
@@ -35,23 +36,24 @@ class ExtrasRootView(APIRootView):
 class ConfigContextQuerySetMixin:
     """
     Used by views that work with config context models (device and virtual machine).
-    Provides a get_queryset() method which deals with adding the config context
-    data annotation or not.
+    Provides a paginate_queryset() method which attaches the rendered config context
+    of each object in the page, retrieved in bulk from the cache (see
+    prefetch_config_contexts()).
     """
-    def get_queryset(self):
+    def paginate_queryset(self, queryset):
         """
-        Build the proper queryset based on the request context
-
-        If the `brief` query param equates to True or the `exclude` query param
-        includes `config_context` as a value, return the base queryset.
-
-        Else, return the queryset annotated with config context data
+        Paginate the queryset and, unless the `brief` query param equates to True,
+        the `exclude` query param includes `config_context` as a value, or the `fields`
+        query param omits it, prefetch the rendered config contexts for the page.
         """
-        queryset = super().get_queryset()
+        page = super().paginate_queryset(queryset)
         request = self.get_serializer_context()['request']
-        if self.brief or 'config_context' in request.query_params.get('exclude', []):
-            return queryset
-        return queryset.annotate_config_context_data()
+        excluded = self.brief or 'config_context' in request.query_params.get('exclude', []) or (
+            self.requested_fields and 'config_context' not in self.requested_fields
+        )
+        if page is not None and not excluded:
+            prefetch_config_contexts(page)
+        return page
 
 
 #
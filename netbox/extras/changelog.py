@@ -0,0 +1,78 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+
+from .choices import ObjectChangeActionChoices
+from .models import ObjectChange
+
+__all__ = (
+    'ObjectChangeQueue',
+)
+
+
+class ObjectChangeQueue:
+    """
+    Buffer the ObjectChanges recorded during a request so that they can be saved with a single bulk_create() once the
+    request has completed.
+
+    Each ObjectChange is marked as committed only once the transaction (if any) in which the change was made has been
+    committed, so that changes which are subsequently rolled back are discarded. Creations and updates are also indexed
+    by object, so that any later many-to-many changes to the same object can be folded into the existing record.
+    """
+    def __init__(self):
+        self.objectchanges = []
+        self._latest = {}
+
+    def __len__(self):
+        return len(self.objectchanges)
+
+    @staticmethod
+    def _get_key(instance):
+        return ContentType.objects.get_for_model(instance).pk, instance.pk
+
+    def append(self, instance, objectchange, user, request_id):
+        """
+        Queue an ObjectChange representing a change to the given instance.
+        """
+        objectchange.user = user
+        objectchange.user_name = user.username
+        objectchange.request_id = request_id
+        objectchange._committed = False
+        self.objectchanges.append(objectchange)
+
+        if objectchange.action == ObjectChangeActionChoices.ACTION_DELETE:
+            self._latest.pop(self._get_key(instance), None)
+        else:
+            self._latest[self._get_key(instance)] = objectchange
+
+        def mark_committed():
+            objectchange._committed = True
+        transaction.on_commit(mark_committed)
+
+    def update_postchange_data(self, instance, postchange_data):
+        """
+        Update the post-change data of the most recent creation or update of the given instance (if any). Returns True
+        if a queued ObjectChange was updated.
+        """
+        objectchange = self._latest.get(self._get_key(instance))
+        if objectchange is None:
+            return False
+        objectchange.postchange_data = postchange_data
+        return True
+
+    def clear(self):
+        self.objectchanges.clear()
+        self._latest.clear()
+
+    def flush(self, batch_size=100):
+        """
+        Save all queued ObjectChanges whose transactions have been committed.
+        """
+        if connection.in_atomic_block:
+            # The outcome of the enclosing transaction cannot yet be known (e.g. when changes are made within an atomic
+            # block wrapping the entire request), so assume that all changes will be committed.
+            objectchanges = self.objectchanges
+        else:
+            objectchanges = [oc for oc in self.objectchanges if oc._committed]
+
+        ObjectChange.objects.bulk_create(objectchanges, batch_size=batch_size)
+        self.clear()
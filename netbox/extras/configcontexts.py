@@ -0,0 +1,286 @@
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from utilities.utils import deepmerge
+
+__all__ = (
+    'clear_config_context_cache',
+    'clear_config_context_index',
+    'ConfigContextIndex',
+    'get_config_context_index',
+    'get_rendered_config_contexts',
+    'invalidate_config_contexts',
+    'prefetch_config_contexts',
+    'render_config_context_data',
+)
+
+# Cache key under which the current version of all rendered config contexts is stored
+CONFIG_CONTEXT_VERSION_KEY = 'config_context_version'
+
+# Rendered config contexts are discarded after this many seconds if not invalidated sooner
+CONFIG_CONTEXT_CACHE_TIMEOUT = 86400
+
+# Cache key under which the current version of the ConfigContextIndex is stored
+CONFIG_CONTEXT_INDEX_VERSION_KEY = 'config_context_index_version'
+
+# The ConfigContext fields by which objects are matched
+CONFIG_CONTEXT_ASSIGNMENTS = (
+    'regions', 'site_groups', 'sites', 'locations', 'device_types', 'roles', 'platforms', 'cluster_types',
+    'cluster_groups', 'clusters', 'tenant_groups', 'tenants', 'tags',
+)
+
+# In-process ConfigContextIndex (see get_config_context_index())
+_index_lock = threading.Lock()
+_index_cache = {
+    'version': None,
+    'index': None,
+}
+
+
+def clear_config_context_cache():
+    """
+    Invalidate the rendered config contexts of all objects (e.g. because a ConfigContext has been modified).
+    """
+    cache.set(CONFIG_CONTEXT_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_cache_version():
+    """
+    Return a string identifying the current version of all rendered config contexts. This incorporates the number and
+    most recent modification time of all ConfigContexts, so that changes made without sending signals (e.g. via
+    bulk_create()) also take effect immediately.
+    """
+    from extras.models import ConfigContext
+
+    state = ConfigContext.objects.aggregate(count=Count('pk'), last_updated=Max('last_updated'))
+    return f"{cache.get(CONFIG_CONTEXT_VERSION_KEY)}:{state['count']}:{state['last_updated']}"
+
+
+def get_cache_key(model, pk, last_updated, version):
+    """
+    Return the cache key for an object's rendered config context. The object's last_updated time is included so that
+    any change to the object itself invalidates its rendered config context.
+    """
+    timestamp = last_updated.timestamp() if last_updated else None
+    return f'config_context:{model._meta.label_lower}:{pk}:{timestamp}:{version}'
+
+
+def render_config_context_data(config_context_data):
+    """
+    Merge a list of ConfigContext data (ordered by weight and name), overwriting lower-weight values with higher-weight
+    values where a collision occurs.
+    """
+    data = {}
+    for context in config_context_data or []:
+        data = deepmerge(data, context)
+    return data
+
+
+def get_rendered_config_contexts(objects):
+    """
+    Return a dictionary mapping the PK of each of the given Devices or VirtualMachines (all of the same type) to its
+    rendered config context, excluding any local config context data. Rendered config contexts are retrieved from the
+    cache where available; the remainder are rendered using a single query and cached.
+    """
+    objects = list(objects)
+    if not objects:
+        return {}
+    model = objects[0]._meta.model
+    version = get_cache_version()
+
+    keys = {
+        obj.pk: get_cache_key(model, obj.pk, obj.last_updated, version) for obj in objects
+    }
+    cached = cache.get_many(keys.values())
+    rendered = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+
+    # Render and cache any config contexts not already cached
+    missing = [pk for pk in keys if pk not in rendered]
+    if missing:
+        queryset = model.objects.filter(pk__in=missing).annotate_config_context_data()
+        new_rendered = {
+            pk: render_config_context_data(config_context_data)
+            for pk, config_context_data in queryset.values_list('pk', 'config_context_data')
+        }
+        cache.set_many(
+            {keys[pk]: data for pk, data in new_rendered.items()},
+            CONFIG_CONTEXT_CACHE_TIMEOUT
+        )
+        rendered.update(new_rendered)
+
+    return rendered
+
+
+def prefetch_config_contexts(objects):
+    """
+    Retrieve the rendered config contexts for a list of Devices or VirtualMachines (all of the same type) in bulk and
+    attach them to each object, to be returned by get_config_context().
+    """
+    rendered = get_rendered_config_contexts(objects)
+    for obj in objects:
+        obj._rendered_config_context = rendered.get(obj.pk, {})
+
+
+def invalidate_config_contexts(queryset):
+    """
+    Discard the cached config contexts rendered for all objects in the given queryset of Devices or VirtualMachines.
+    """
+    version = get_cache_version()
+    cache.delete_many([
+        get_cache_key(queryset.model, pk, last_updated, version)
+        for pk, last_updated in queryset.values_list('pk', 'last_updated')
+    ])
+
+
+#
+# In-memory matching
+#
+
+class ConfigContextIndex:
+    """
+    An in-memory index of all active ConfigContexts, used to determine those which apply to a device or VM without
+    querying the database.
+
+    For each type of assignment (regions, sites, tags, etc.), the index maps each assigned object's PK to the set of
+    ConfigContexts assigned to it, and records the set of ConfigContexts with no assignments of that type (which match
+    any object). The ConfigContexts applicable to an object are then found by intersecting, for each type of assignment,
+    the union of the sets for the object's related PKs with the unassigned set. The index also holds the region and
+    site group hierarchies and the attributes of sites, clusters, and tenants used for matching.
+    """
+    def __init__(self):
+        from dcim.models import Region, Site, SiteGroup
+        from extras.models import ConfigContext
+        from tenancy.models import Tenant
+        from virtualization.models import Cluster
+
+        # Active ConfigContexts, in order of precedence
+        contexts = ConfigContext.objects.filter(is_active=True).order_by('weight', 'name')
+        self.data = dict(contexts.values_list('pk', 'data'))
+        self.ordering = {pk: i for i, pk in enumerate(self.data)}
+
+        self.assigned = {}
+        self.unassigned = {}
+        for field_name in CONFIG_CONTEXT_ASSIGNMENTS:
+            field = ConfigContext._meta.get_field(field_name)
+            through = field.remote_field.through
+            source_field = field.m2m_field_name()
+            target_field = field.m2m_reverse_field_name()
+            assigned = defaultdict(set)
+            for context_id, object_id in through.objects.filter(
+                **{f'{source_field}__in': list(self.data)}
+            ).values_list(f'{source_field}_id', f'{target_field}_id'):
+                assigned[object_id].add(context_id)
+            self.assigned[field_name] = dict(assigned)
+            self.unassigned[field_name] = set(self.data).difference(*assigned.values())
+
+        self.region_parents = dict(Region.objects.values_list('pk', 'parent_id'))
+        self.sitegroup_parents = dict(SiteGroup.objects.values_list('pk', 'parent_id'))
+        self.sites = {pk: (region_id, group_id) for pk, region_id, group_id in Site.objects.values_list(
+            'pk', 'region_id', 'group_id'
+        )}
+        self.clusters = {pk: (type_id, group_id) for pk, type_id, group_id in Cluster.objects.values_list(
+            'pk', 'type_id', 'group_id'
+        )}
+        self.tenants = dict(Tenant.objects.values_list('pk', 'group_id'))
+
+    @staticmethod
+    def _get_ancestors(model, pk, parents):
+        """
+        Return the PKs of the given region or site group and all of its ancestors. Should it be unknown to the index
+        (e.g. if created since the index was built), its ancestors are retrieved from the database.
+        """
+        if pk is not None and pk not in parents:
+            parents.update(
+                model.objects.get(pk=pk).get_ancestors(include_self=True).values_list('pk', 'parent_id')
+            )
+        ancestors = []
+        while pk is not None:
+            ancestors.append(pk)
+            pk = parents.get(pk)
+        return ancestors
+
+    def _get_object_assignments(self, obj):
+        """
+        Return a dictionary mapping each type of assignment to the PKs of the objects related to the given object.
+        """
+        from dcim.models import Region, SiteGroup
+
+        # `device_role` for Device; `role` for VirtualMachine
+        role_id = getattr(obj, 'device_role_id', None) or getattr(obj, 'role_id', None)
+
+        # Fall back to the related objects should any be unknown to the index (e.g. if created since it was built)
+        site_id = obj.site_id
+        if site_id is not None and site_id not in self.sites:
+            self.sites[site_id] = (obj.site.region_id, obj.site.group_id)
+        cluster_id = getattr(obj, 'cluster_id', None)
+        if cluster_id is not None and cluster_id not in self.clusters:
+            self.clusters[cluster_id] = (obj.cluster.type_id, obj.cluster.group_id)
+        tenant_id = obj.tenant_id
+        if tenant_id is not None and tenant_id not in self.tenants:
+            self.tenants[tenant_id] = obj.tenant.group_id
+        region_id, sitegroup_id = self.sites.get(site_id, (None, None))
+        cluster_type_id, cluster_group_id = self.clusters.get(cluster_id, (None, None))
+
+        return {
+            'regions': self._get_ancestors(Region, region_id, self.region_parents),
+            'site_groups': self._get_ancestors(SiteGroup, sitegroup_id, self.sitegroup_parents),
+            'sites': [site_id],
+            'locations': [getattr(obj, 'location_id', None)],
+            'device_types': [getattr(obj, 'device_type_id', None)],
+            'roles': [role_id],
+            'platforms': [obj.platform_id],
+            'cluster_types': [cluster_type_id],
+            'cluster_groups': [cluster_group_id],
+            'clusters': [cluster_id],
+            'tenant_groups': [self.tenants.get(tenant_id)],
+            'tenants': [tenant_id],
+            'tags': [tag.pk for tag in obj.tags.all()],
+        }
+
+    def get_for_object(self, obj):
+        """
+        Return the PKs of all active ConfigContexts which apply to the given device or VM, in order of precedence.
+        """
+        matches = set(self.data)
+        for field_name, object_ids in self._get_object_assignments(obj).items():
+            assigned = self.assigned[field_name]
+            matches &= self.unassigned[field_name].union(
+                *[assigned[pk] for pk in object_ids if pk in assigned]
+            )
+            if not matches:
+                return []
+
+        return sorted(matches, key=self.ordering.get)
+
+    def get_data_for_object(self, obj):
+        """
+        Return the data of all active ConfigContexts which apply to the given device or VM, in order of precedence.
+        """
+        return [self.data[pk] for pk in self.get_for_object(obj)]
+
+
+def clear_config_context_index():
+    """
+    Invalidate the ConfigContextIndex in all processes (e.g. because a ConfigContext has been modified).
+    """
+    cache.set(CONFIG_CONTEXT_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_config_context_index():
+    """
+    Return the ConfigContextIndex for this process, building it if it does not yet exist or has been invalidated by
+    clear_config_context_index() in any process. As with rendered config contexts, the index is also rebuilt following
+    any change to ConfigContexts made without sending signals.
+    """
+    version = f'{cache.get(CONFIG_CONTEXT_INDEX_VERSION_KEY)}:{get_cache_version()}'
+    with _index_lock:
+        if _index_cache['index'] is None or _index_cache['version'] != version:
+            _index_cache['index'] = ConfigContextIndex()
+            _index_cache['version'] = version
+        return _index_cache['index']
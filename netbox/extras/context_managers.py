@@ -5,6 +5,7 @@ from django.db.models.signals import m2m_changed, pre_delete, post_save
 from extras.signals import clear_webhooks, clear_webhook_queue, handle_changed_object, handle_deleted_object
 from netbox import thread_locals
 from netbox.request_context import set_request
+from .changelog import ObjectChangeQueue
 from .webhooks import flush_webhooks
 
 
@@ -17,6 +18,7 @@ def change_logging(request):
     :param request: WSGIRequest object with a unique `id` set
     """
     set_request(request)
+    thread_locals.objectchange_queue = ObjectChangeQueue()
     thread_locals.webhook_queue = []
 
     # Connect our receivers to the post_save and post_delete signals.
@@ -34,6 +36,10 @@ def change_logging(request):
     pre_delete.disconnect(handle_deleted_object, dispatch_uid='handle_deleted_object')
     clear_webhooks.disconnect(clear_webhook_queue, dispatch_uid='clear_webhook_queue')
 
+    # Save all queued ObjectChanges
+    thread_locals.objectchange_queue.flush()
+    del thread_locals.objectchange_queue
+
     # Flush queued webhooks to RQ
     flush_webhooks(thread_locals.webhook_queue)
     del thread_locals.webhook_queue
@@ -0,0 +1,85 @@
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from netbox.request_context import get_request
+
+__all__ = (
+    'clear_custom_fields_cache',
+    'get_custom_fields',
+)
+
+# Cache key under which the current version of the cached CustomFields is stored
+CUSTOM_FIELDS_CACHE_VERSION_KEY = 'custom_fields_cache_version'
+
+# In-process cache of CustomFields by content type (see get_custom_fields())
+_custom_fields_lock = threading.Lock()
+_custom_fields_cache = {
+    'version': None,
+    'custom_fields': None,
+}
+
+
+def clear_custom_fields_cache():
+    """
+    Invalidate the cached CustomFields in all processes (e.g. because a CustomField has been modified).
+    """
+    cache.set(CUSTOM_FIELDS_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    with _custom_fields_lock:
+        _custom_fields_cache['custom_fields'] = None
+
+    # Discard the version determined for the current request (if any)
+    request = get_request()
+    if request is not None and hasattr(request, '_custom_fields_version'):
+        del request._custom_fields_version
+
+
+def get_cache_version():
+    """
+    Return a string identifying the current version of all CustomFields. This incorporates the number, assignments,
+    and most recent modification time of all CustomFields, so that changes made without sending signals (or which have
+    since been rolled back) also take effect. This is determined only once per request.
+    """
+    from extras.models import CustomField
+
+    request = get_request()
+    version = getattr(request, '_custom_fields_version', None)
+    if version is None:
+        state = CustomField.objects.aggregate(
+            count=Count('pk', distinct=True),
+            assignments=Count('content_types'),
+            last_updated=Max('last_updated')
+        )
+        version = (
+            f"{cache.get(CUSTOM_FIELDS_CACHE_VERSION_KEY)}:{state['count']}:{state['assignments']}:"
+            f"{state['last_updated']}"
+        )
+        if request is not None:
+            request._custom_fields_version = version
+
+    return version
+
+
+def get_custom_fields(content_type):
+    """
+    Return a tuple of all CustomFields assigned to the given ContentType, in their natural ordering. CustomFields are
+    cached in-process until invalidated by clear_custom_fields_cache() in any process.
+    """
+    from extras.models import CustomField
+
+    version = get_cache_version()
+    with _custom_fields_lock:
+        if _custom_fields_cache['custom_fields'] is None or _custom_fields_cache['version'] != version:
+            custom_fields = defaultdict(list)
+            for custom_field in CustomField.objects.select_related('object_type').prefetch_related('content_types'):
+                for assigned_content_type in custom_field.content_types.all():
+                    custom_fields[assigned_content_type.pk].append(custom_field)
+            _custom_fields_cache['custom_fields'] = {
+                content_type_id: tuple(fields) for content_type_id, fields in custom_fields.items()
+            }
+            _custom_fields_cache['version'] = version
+
+        return _custom_fields_cache['custom_fields'].get(content_type.pk, ())
@@ -1,6 +1,6 @@
 from django.contrib.contenttypes.models import ContentType
 
-from extras.models import *
+from extras.customfields import get_custom_fields
 from extras.choices import CustomFieldVisibilityChoices
 
 __all__ = (
@@ -34,7 +34,7 @@ class CustomFieldsMixin:
         return ContentType.objects.get_for_model(self.model)
 
     def _get_custom_fields(self, content_type):
-        return CustomField.objects.filter(content_types=content_type)
+        return get_custom_fields(content_type)
 
     def _get_form_field(self, customfield):
         return customfield.to_form_field()
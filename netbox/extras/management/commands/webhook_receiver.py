@@ -1,15 +1,21 @@
 import json
 import sys
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from django.core.management.base import BaseCommand
 
 
 request_counter = 1
+request_counter_lock = threading.Lock()
 
 
 class WebhookHandler(BaseHTTPRequestHandler):
+    # Support persistent connections
+    protocol_version = 'HTTP/1.1'
     show_headers = True
+    delay = 0
 
     def __getattr__(self, item):
 
@@ -32,31 +38,42 @@ class WebhookHandler(BaseHTTPRequestHandler):
     def do_ANY(self):
         global request_counter
 
+        # Read the request body (if any) before responding, so that the connection may be reused
+        content_length = self.headers.get('Content-Length')
+        if content_length is not None:
+            body = self.rfile.read(int(content_length)).decode('utf-8')
+
+        # Simulate a slow receiver (if configured)
+        if self.delay:
+            time.sleep(self.delay)
+
         # Send a 200 response regardless of the request content
+        response = b'Webhook received!\n'
         self.send_response(200)
+        self.send_header('Content-Length', str(len(response)))
         self.end_headers()
-        self.wfile.write(b'Webhook received!\n')
+        self.wfile.write(response)
 
-        # Print the request headers
-        if self.show_headers:
-            for k, v in self.headers.items():
-                print(f'{k}: {v}')
-            print()
+        with request_counter_lock:
 
-        # Print the request body (if any)
-        content_length = self.headers.get('Content-Length')
-        if content_length is not None:
-            body = self.rfile.read(int(content_length)).decode('utf-8')
-            if self.headers.get('Content-Type') == 'application/json':
-                body = json.loads(body)
-                print(json.dumps(body, indent=4))
-        else:
-            print('(No body)')
+            # Print the request headers
+            if self.show_headers:
+                for k, v in self.headers.items():
+                    print(f'{k}: {v}')
+                print()
+
+            # Print the request body (if any)
+            if content_length is not None:
+                if self.headers.get('Content-Type') == 'application/json':
+                    body = json.loads(body)
+                    print(json.dumps(body, indent=4))
+            else:
+                print('(No body)')
 
-        print(f'Completed request #{request_counter}')
-        print('------------')
+            print(f'Completed request #{request_counter}')
+            print('------------')
 
-        request_counter += 1
+            request_counter += 1
 
 
 class Command(BaseCommand):
@@ -73,15 +90,20 @@ class Command(BaseCommand):
             "--no-headers", action='store_true', dest='no_headers',
             help="Hide HTTP request headers"
         )
+        parser.add_argument(
+            '--delay', type=float, default=0,
+            help="Number of seconds to wait before responding to each request (default: 0)"
+        )
 
     def handle(self, *args, **options):
         port = options['port']
         quit_command = 'CTRL-BREAK' if sys.platform == 'win32' else 'CONTROL-C'
 
         WebhookHandler.show_headers = not options['no_headers']
+        WebhookHandler.delay = options['delay']
 
         self.stdout.write('Listening on port http://localhost:{}. Stop with {}.'.format(port, quit_command))
-        httpd = HTTPServer(('localhost', port), WebhookHandler)
+        httpd = ThreadingHTTPServer(('localhost', port), WebhookHandler)
 
         try:
             httpd.serve_forever()
@@ -2,6 +2,7 @@ from django.core.validators import ValidationError
 from django.db import models
 from django.urls import reverse
 
+from extras.configcontexts import get_rendered_config_contexts, render_config_context_data
 from extras.querysets import ConfigContextQuerySet
 from netbox.models import ChangeLoggedModel
 from netbox.models.features import WebhooksMixin
@@ -144,17 +145,18 @@ class ConfigContextModel(models.Model):
         Compile all config data, overwriting lower-weight values with higher-weight values where a collision occurs.
         Return the rendered configuration context for a device or VM.
         """
-        data = {}
-
-        if not hasattr(self, 'config_context_data'):
-            # The annotation is not available, so we fall back to manually querying for the config context objects
-            config_context_data = ConfigContext.objects.get_for_object(self, aggregate_data=True)
-        else:
+        if hasattr(self, 'config_context_data'):
             # The attribute may exist, but the annotated value could be None if there is no config context data
-            config_context_data = self.config_context_data or []
-
-        for context in config_context_data:
-            data = deepmerge(data, context)
+            data = render_config_context_data(self.config_context_data)
+        elif hasattr(self, '_rendered_config_context'):
+            # The rendered config context has been prefetched (see prefetch_config_contexts())
+            data = self._rendered_config_context
+        elif self.pk:
+            # Retrieve the rendered config context from cache (rendering it if necessary)
+            data = get_rendered_config_contexts([self]).get(self.pk, {})
+        else:
+            # The object has not been saved, so we fall back to manually querying for the config context objects
+            data = render_config_context_data(ConfigContext.objects.get_for_object(self, aggregate_data=True))
 
         # If the object has local config context data defined, merge it last
         if self.local_context_data:
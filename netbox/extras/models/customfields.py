@@ -35,10 +35,13 @@ class CustomFieldManager(models.Manager.from_queryset(RestrictedQuerySet)):
 
     def get_for_model(self, model):
         """
-        Return all CustomFields assigned to the given model.
+        Return a tuple of all CustomFields assigned to the given model. These are retrieved from the in-process cache
+        of CustomFields (see get_custom_fields()).
         """
+        from extras.customfields import get_custom_fields
+
         content_type = ContentType.objects.get_for_model(model._meta.concrete_model)
-        return self.get_queryset().filter(content_types=content_type)
+        return get_custom_fields(content_type)
 
 
 class CustomField(CloningMixin, ExportTemplatesMixin, WebhooksMixin, ChangeLoggedModel):
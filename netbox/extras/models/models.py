@@ -1,5 +1,6 @@
 import json
 import uuid
+from itertools import chain
 
 from django.contrib import admin
 from django.contrib.auth.models import User
@@ -8,7 +9,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
 from django.core.validators import ValidationError
 from django.db import models
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.formats import date_format
@@ -23,8 +24,8 @@ from netbox.models import ChangeLoggedModel
 from netbox.models.features import (
     CloningMixin, CustomFieldsMixin, CustomLinksMixin, ExportTemplatesMixin, JobResultsMixin, TagsMixin, WebhooksMixin,
 )
-from utilities.querysets import RestrictedQuerySet
-from utilities.utils import render_jinja2
+from utilities.querysets import RestrictedQuerySet, StreamingQuerySet
+from utilities.utils import get_jinja2_template, render_jinja2
 
 __all__ = (
     'ConfigRevision',
@@ -329,15 +330,41 @@ class ExportTemplate(ExportTemplatesMixin, WebhooksMixin, ChangeLoggedModel):
 
         return output
 
+    def render_stream(self, queryset, buffer_size=65536):
+        """
+        Render the contents of the template incrementally, yielding output in pieces of roughly buffer_size characters.
+        The queryset is streamed from the database each time the template iterates over it, rather than being held in
+        memory.
+        """
+        context = {
+            'queryset': StreamingQuerySet(queryset)
+        }
+        buffer = []
+        length = 0
+        for output in get_jinja2_template(self.template_code).generate(**context):
+            buffer.append(output)
+            length += len(output)
+            if length >= buffer_size:
+                output = ''.join(buffer)
+                # Hold back a trailing CR in case it is followed by an LF
+                buffer = ['\r'] if output.endswith('\r') else []
+                length = len(buffer)
+                yield output[:len(output) - length].replace('\r\n', '\n')
+        yield ''.join(buffer).replace('\r\n', '\n')
+
     def render_to_response(self, queryset):
         """
-        Render the template to an HTTP response, delivered as a named file attachment
+        Render the template to a streaming HTTP response, delivered as a named file attachment
         """
-        output = self.render(queryset)
+        output = self.render_stream(queryset)
         mime_type = 'text/plain' if not self.mime_type else self.mime_type
 
+        # Render the first piece of output before building the response, so that any error encountered at the outset
+        # (e.g. invalid template syntax) is raised to the caller
+        first_output = next(output)
+
         # Build the response
-        response = HttpResponse(output, content_type=mime_type)
+        response = StreamingHttpResponse(chain([first_output], output), content_type=mime_type)
 
         if self.as_attachment:
             basename = queryset.model._meta.verbose_name_plural.replace(' ', '_')
@@ -10,7 +10,32 @@ class ConfigContextQuerySet(RestrictedQuerySet):
 
     def get_for_object(self, obj, aggregate_data=False):
         """
-        Return all applicable ConfigContexts for a given object. Only active ConfigContexts will be included.
+        Return all applicable ConfigContexts for a given object. Only active ConfigContexts will be included. Matching
+        ConfigContexts are determined in memory using the ConfigContextIndex.
+
+        Args:
+          aggregate_data: If True, return only the list of JSON data objects (without querying the database, unless
+            the QuerySet has been filtered)
+        """
+        from extras.configcontexts import get_config_context_index
+        index = get_config_context_index()
+
+        if aggregate_data and not self.query.where:
+            return index.get_data_for_object(obj)
+
+        queryset = self.filter(pk__in=index.get_for_object(obj)).order_by('weight', 'name')
+
+        if aggregate_data:
+            return queryset.aggregate(
+                config_context_data=JSONBAgg('data', ordering=['weight', 'name'])
+            )['config_context_data']
+
+        return queryset
+
+    def filter_for_object(self, obj, aggregate_data=False):
+        """
+        Return all applicable ConfigContexts for a given object, determined by querying the database. Only active
+        ConfigContexts will be included.
 
         Args:
           aggregate_data: If True, use the JSONBAgg aggregate function to return only the list of JSON data objects
@@ -2,18 +2,28 @@ import importlib
 import logging
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver, Signal
 from django_prometheus.models import model_deletes, model_inserts, model_updates
 
+from dcim.models import Device, DeviceRole, DeviceType, Location, Platform, Region, Site, SiteGroup
 from extras.validators import CustomValidator
 from netbox import thread_locals
 from netbox.config import get_config
 from netbox.request_context import get_request
 from netbox.signals import post_clean
+from tenancy.models import Tenant, TenantGroup
+from utilities.utils import clear_jinja2_cache
+from virtualization.models import Cluster, ClusterGroup, ClusterType, VirtualMachine
 from .choices import ObjectChangeActionChoices
-from .models import ConfigRevision, CustomField, ObjectChange
-from .webhooks import enqueue_object, get_snapshots, serialize_for_webhook
+from .configcontexts import clear_config_context_cache, clear_config_context_index, invalidate_config_contexts
+from .customfields import clear_custom_fields_cache
+from .models import (
+    ConfigContext, ConfigContextModel, ConfigRevision, CustomField, CustomLink, ExportTemplate, Tag, TaggedItem, Webhook,
+)
+from .webhooks import clear_webhooks_cache, enqueue_object, get_snapshots, serialize_for_webhook
 
 #
 # Change logging/webhooks
@@ -52,21 +62,16 @@ def handle_changed_object(sender, instance, **kwargs):
     else:
         return
 
-    # Record an ObjectChange if applicable
+    # Queue an ObjectChange if applicable. M2M changes are folded into the change already queued for the object.
     if hasattr(instance, 'to_objectchange'):
+        objectchange_queue = thread_locals.objectchange_queue
         if m2m_changed:
-            ObjectChange.objects.filter(
-                changed_object_type=ContentType.objects.get_for_model(instance),
-                changed_object_id=instance.pk,
-                request_id=request.id
-            ).update(
-                postchange_data=instance.to_objectchange(action).postchange_data
+            objectchange_queue.update_postchange_data(
+                instance, instance.to_objectchange(action).postchange_data
             )
         else:
             objectchange = instance.to_objectchange(action)
-            objectchange.user = request.user
-            objectchange.request_id = request.id
-            objectchange.save()
+            objectchange_queue.append(instance, objectchange, request.user, request.id)
 
     # If this is an M2M change, update the previously queued webhook (from post_save)
     webhook_queue = thread_locals.webhook_queue
@@ -93,12 +98,10 @@ def handle_deleted_object(sender, instance, **kwargs):
 
     request = get_request()
 
-    # Record an ObjectChange if applicable
+    # Queue an ObjectChange if applicable
     if hasattr(instance, 'to_objectchange'):
         objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
-        objectchange.user = request.user
-        objectchange.request_id = request.id
-        objectchange.save()
+        thread_locals.objectchange_queue.append(instance, objectchange, request.user, request.id)
 
     # Enqueue webhooks
     webhook_queue = thread_locals.webhook_queue
@@ -119,10 +122,126 @@ def clear_webhook_queue(sender, **kwargs):
     webhook_queue.clear()
 
 
+def handle_webhook_changed(**kwargs):
+    """
+    Invalidate the cached Webhooks when a Webhook or its assigned object types are modified.
+    """
+    clear_webhooks_cache()
+
+
+post_save.connect(handle_webhook_changed, sender=Webhook)
+post_delete.connect(handle_webhook_changed, sender=Webhook)
+m2m_changed.connect(handle_webhook_changed, sender=Webhook.content_types.through)
+
+
+#
+# Config contexts
+#
+
+def handle_configcontext_changed(created=False, **kwargs):
+    """
+    Invalidate the ConfigContextIndex and all rendered config contexts when a ConfigContext or its assignments are
+    modified, when an object to which ConfigContexts may be assigned is deleted, or when a region or site group (which
+    may have moved within its hierarchy) is modified. As with the handlers below, this is done both immediately and
+    once the change has been committed, as other processes may otherwise cache the prior state in the meantime.
+    """
+    def invalidate():
+        clear_config_context_cache()
+        clear_config_context_index()
+
+    if not created:
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+def handle_configcontext_model_tags_changed(instance, action, **kwargs):
+    """
+    Invalidate the rendered config context of a device or VM when its tags are modified.
+    """
+    def invalidate():
+        invalidate_config_contexts(type(instance).objects.filter(pk=instance.pk))
+
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, ConfigContextModel):
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+def handle_site_changed(instance, created, **kwargs):
+    """
+    Invalidate the ConfigContextIndex and the rendered config contexts of all devices and VMs within a site when it is
+    modified.
+    """
+    def invalidate():
+        clear_config_context_index()
+        invalidate_config_contexts(Device.objects.filter(site=instance))
+        invalidate_config_contexts(VirtualMachine.objects.filter(Q(site=instance) | Q(cluster__site=instance)))
+
+    if not created:
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+def handle_cluster_changed(instance, created, **kwargs):
+    """
+    Invalidate the ConfigContextIndex and the rendered config contexts of all devices and VMs within a cluster when it
+    is modified.
+    """
+    def invalidate():
+        clear_config_context_index()
+        invalidate_config_contexts(Device.objects.filter(cluster=instance))
+        invalidate_config_contexts(VirtualMachine.objects.filter(cluster=instance))
+
+    if not created:
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+def handle_tenant_changed(instance, created, **kwargs):
+    """
+    Invalidate the ConfigContextIndex and the rendered config contexts of all devices and VMs assigned to a tenant when
+    it is modified.
+    """
+    def invalidate():
+        clear_config_context_index()
+        invalidate_config_contexts(Device.objects.filter(tenant=instance))
+        invalidate_config_contexts(VirtualMachine.objects.filter(tenant=instance))
+
+    if not created:
+        invalidate()
+        transaction.on_commit(invalidate)
+
+
+post_save.connect(handle_configcontext_changed, sender=ConfigContext)
+post_delete.connect(handle_configcontext_changed, sender=ConfigContext)
+for field_name in (
+    'regions', 'site_groups', 'sites', 'locations', 'device_types', 'roles', 'platforms', 'cluster_types',
+    'cluster_groups', 'clusters', 'tenant_groups', 'tenants', 'tags',
+):
+    m2m_changed.connect(handle_configcontext_changed, sender=getattr(ConfigContext, field_name).through)
+for model in (Region, SiteGroup):
+    post_save.connect(handle_configcontext_changed, sender=model)
+for model in (
+    Region, SiteGroup, Site, Location, DeviceType, DeviceRole, Platform, ClusterType, ClusterGroup, Cluster,
+    TenantGroup, Tenant, Tag,
+):
+    post_delete.connect(handle_configcontext_changed, sender=model)
+m2m_changed.connect(handle_configcontext_model_tags_changed, sender=TaggedItem)
+post_save.connect(handle_site_changed, sender=Site)
+post_save.connect(handle_cluster_changed, sender=Cluster)
+post_save.connect(handle_tenant_changed, sender=Tenant)
+
+
 #
 # Custom fields
 #
 
+def handle_cf_changed(**kwargs):
+    """
+    Invalidate the cached CustomFields when a CustomField or its assigned object types are modified.
+    """
+    clear_custom_fields_cache()
+
+
 def handle_cf_added_obj_types(instance, action, pk_set, **kwargs):
     """
     Handle the population of default/null values when a CustomField is added to one or more ContentTypes.
@@ -154,12 +273,35 @@ def handle_cf_deleted(instance, **kwargs):
     instance.remove_stale_data(instance.content_types.all())
 
 
+post_save.connect(handle_cf_changed, sender=CustomField)
+post_delete.connect(handle_cf_changed, sender=CustomField)
+m2m_changed.connect(handle_cf_changed, sender=CustomField.content_types.through)
 post_save.connect(handle_cf_renamed, sender=CustomField)
 pre_delete.connect(handle_cf_deleted, sender=CustomField)
 m2m_changed.connect(handle_cf_added_obj_types, sender=CustomField.content_types.through)
 m2m_changed.connect(handle_cf_removed_obj_types, sender=CustomField.content_types.through)
 
 
+#
+# Jinja2 templates
+#
+
+def handle_template_changed(**kwargs):
+    """
+    Discard any compiled Jinja2 templates when an object holding template code is modified. (Templates are cached by a
+    hash of their code, so this serves only to evict those which are no longer needed.)
+    """
+    clear_jinja2_cache()
+
+
+post_save.connect(handle_template_changed, sender=CustomLink)
+post_save.connect(handle_template_changed, sender=ExportTemplate)
+post_save.connect(handle_template_changed, sender=Webhook)
+post_delete.connect(handle_template_changed, sender=CustomLink)
+post_delete.connect(handle_template_changed, sender=ExportTemplate)
+post_delete.connect(handle_template_changed, sender=Webhook)
+
+
 #
 # Custom validation
 #
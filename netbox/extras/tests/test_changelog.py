@@ -136,6 +136,27 @@ class ChangeLogViewTest(ModelViewTestCase):
         self.assertEqual(oc.prechange_data['tags'], ['Tag 1', 'Tag 2'])
         self.assertEqual(oc.postchange_data, None)
 
+    def test_bulk_import_objects(self):
+        csv_data = (
+            'name,slug,status,cf_my_field',
+            'Site 1,site-1,active,ABC',
+            'Site 2,site-2,active,DEF',
+            'Site 3,site-3,planned,GHI',
+        )
+
+        self.add_permissions('dcim.add_site')
+        response = self.client.post(self._get_url('import'), {'csv': '\n'.join(csv_data)})
+        self.assertHttpStatus(response, 200)
+
+        # Verify the creation of an ObjectChange record for each object within the same request
+        objectchanges = ObjectChange.objects.filter(changed_object_type=ContentType.objects.get_for_model(Site))
+        self.assertEqual(objectchanges.count(), 3)
+        self.assertEqual(len(set(objectchanges.values_list('request_id', flat=True))), 1)
+        oc = objectchanges.get(changed_object_id=Site.objects.get(name='Site 1').pk)
+        self.assertEqual(oc.action, ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(oc.user_name, self.user.username)
+        self.assertEqual(oc.postchange_data['custom_fields']['my_field'], 'ABC')
+
     def test_bulk_update_objects(self):
         sites = (
             Site(name='Site 1', slug='site-1', status=SiteStatusChoices.STATUS_ACTIVE),
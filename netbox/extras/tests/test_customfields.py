@@ -350,8 +350,43 @@ class CustomFieldManagerTest(TestCase):
         custom_field.content_types.set([content_type])
 
     def test_get_for_model(self):
-        self.assertEqual(CustomField.objects.get_for_model(Site).count(), 1)
-        self.assertEqual(CustomField.objects.get_for_model(VirtualMachine).count(), 0)
+        self.assertEqual(len(CustomField.objects.get_for_model(Site)), 1)
+        self.assertEqual(len(CustomField.objects.get_for_model(VirtualMachine)), 0)
+
+    def test_get_for_model_cached(self):
+        CustomField.objects.get_for_model(Site)
+
+        # Only the current version of all CustomFields should be retrieved
+        with self.assertNumQueries(1):
+            custom_fields = CustomField.objects.get_for_model(Site)
+        self.assertEqual([cf.name for cf in custom_fields], ['text_field'])
+
+    def test_get_for_model_invalidated(self):
+        self.assertEqual(len(CustomField.objects.get_for_model(Site)), 1)
+
+        # Assign a new CustomField to both sites and VMs
+        custom_field = CustomField(type=CustomFieldTypeChoices.TYPE_INTEGER, name='integer_field')
+        custom_field.save()
+        custom_field.content_types.set([
+            ContentType.objects.get_for_model(Site),
+            ContentType.objects.get_for_model(VirtualMachine),
+        ])
+        self.assertEqual(
+            [cf.name for cf in CustomField.objects.get_for_model(Site)],
+            ['integer_field', 'text_field']
+        )
+        self.assertEqual(len(CustomField.objects.get_for_model(VirtualMachine)), 1)
+
+        # Modify the CustomField
+        custom_field.label = 'Integer'
+        custom_field.save()
+        self.assertEqual(CustomField.objects.get_for_model(VirtualMachine)[0].label, 'Integer')
+
+        # Unassign and delete the CustomField
+        custom_field.content_types.remove(ContentType.objects.get_for_model(VirtualMachine))
+        self.assertEqual(len(CustomField.objects.get_for_model(VirtualMachine)), 0)
+        custom_field.delete()
+        self.assertEqual(len(CustomField.objects.get_for_model(Site)), 1)
 
 
 class CustomFieldAPITest(APITestCase):
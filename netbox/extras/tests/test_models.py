@@ -1,7 +1,9 @@
+from django.contrib.contenttypes.models import ContentType
 from django.test import TestCase
 
 from dcim.models import Device, DeviceRole, DeviceType, Location, Manufacturer, Platform, Region, Site, SiteGroup
-from extras.models import ConfigContext, Tag
+from extras.configcontexts import prefetch_config_contexts
+from extras.models import ConfigContext, ExportTemplate, Tag
 from tenancy.models import Tenant, TenantGroup
 from virtualization.models import Cluster, ClusterGroup, ClusterType, VirtualMachine
 
@@ -15,6 +17,48 @@ class TagTest(TestCase):
         self.assertEqual(tag.slug, 'testing-unicode-台灣')
 
 
+class ExportTemplateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(1, 6)
+        ])
+
+    def test_render_to_response(self):
+        export_template = ExportTemplate(
+            content_type=ContentType.objects.get_for_model(Site),
+            name='Export Template 1',
+            template_code='{{ queryset|length }}\r\n{% for site in queryset %}{{ site.name }}\r\n{% endfor %}',
+            file_extension='txt'
+        )
+        queryset = Site.objects.order_by('name')
+
+        response = export_template.render_to_response(queryset)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="netbox_sites.txt"')
+
+        # Streamed output should match the non-streamed rendering, regardless of buffer size
+        expected = '5\nSite 1\nSite 2\nSite 3\nSite 4\nSite 5\n'
+        self.assertEqual(export_template.render(queryset), expected)
+        self.assertEqual(b''.join(response.streaming_content).decode(), expected)
+        self.assertEqual(''.join(export_template.render_stream(queryset, buffer_size=1)), expected)
+
+    def test_render_to_response_slice_queryset(self):
+        export_template = ExportTemplate(
+            content_type=ContentType.objects.get_for_model(Site),
+            name='Export Template 1',
+            template_code='{{ queryset[0].name }}\r\n{% for site in queryset[1:3] %}{{ site.name }}\r\n{% endfor %}',
+            file_extension='txt'
+        )
+        queryset = Site.objects.order_by('name')
+
+        response = export_template.render_to_response(queryset)
+        expected = 'Site 1\nSite 2\nSite 3\n'
+        self.assertEqual(export_template.render(queryset), expected)
+        self.assertEqual(b''.join(response.streaming_content).decode(), expected)
+
+
 class ConfigContextTest(TestCase):
     """
     These test cases deal with the weighting, ordering, and deep merge logic of config context data.
@@ -74,6 +118,50 @@ class ConfigContextTest(TestCase):
         }
         self.assertEqual(self.device.get_config_context(), expected_data)
 
+    def test_rendered_config_context_invalidation(self):
+        site_context = ConfigContext.objects.create(name='context 1', weight=100, data={'a': 1})
+        site_context.sites.add(self.site)
+        self.assertEqual(self.device.get_config_context(), {'a': 1})
+
+        # Modifying the ConfigContext's data or assignments should invalidate the rendered context
+        site_context.data = {'a': 2}
+        site_context.save()
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context(), {'a': 2})
+        platform_context = ConfigContext.objects.create(name='context 2', weight=200, data={'b': 1})
+        platform_context.platforms.add(self.platform)
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context(), {'a': 2})
+
+        # Modifying the device's assignments should invalidate its rendered context
+        self.device.platform = self.platform
+        self.device.save()
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context(), {'a': 2, 'b': 1})
+
+        # Modifying the device's tags should invalidate its rendered context
+        tag_context = ConfigContext.objects.create(name='context 3', weight=300, data={'c': 1})
+        tag_context.tags.add(self.tag)
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context(), {'a': 2, 'b': 1})
+        self.device.tags.add(self.tag)
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context(), {'a': 2, 'b': 1, 'c': 1})
+
+        # Modifying the device's site should invalidate its rendered context
+        region_context = ConfigContext.objects.create(name='context 4', weight=400, data={'d': 1})
+        region_context.regions.add(Region.objects.create(name='Region 2', slug='region-2'))
+        self.assertNotIn('d', Device.objects.get(pk=self.device.pk).get_config_context())
+        self.site.region = region_context.regions.first()
+        self.site.save()
+        self.assertEqual(Device.objects.get(pk=self.device.pk).get_config_context()['d'], 1)
+
+    def test_prefetch_config_contexts(self):
+        site_context = ConfigContext.objects.create(name='context 1', weight=100, data={'a': 1})
+        site_context.sites.add(self.site)
+        self.device.local_context_data = {'b': 2}
+        self.device.save()
+
+        devices = list(Device.objects.all())
+        prefetch_config_contexts(devices)
+        with self.assertNumQueries(0):
+            self.assertEqual(devices[0].get_config_context(), {'a': 1, 'b': 2})
+
     def test_name_ordering_after_weight(self):
 
         context1 = ConfigContext(
@@ -312,6 +400,128 @@ class ConfigContextTest(TestCase):
         annotated_queryset = VirtualMachine.objects.filter(name=virtual_machine.name).annotate_config_context_data()
         self.assertEqual(virtual_machine.get_config_context(), annotated_queryset[0].get_config_context())
 
+    def test_get_for_object_same_as_filter_for_object(self):
+        """
+        Ensure that the ConfigContexts matched in memory by get_for_object() are the same as those matched in the database
+        by filter_for_object().
+        """
+        cluster = Cluster.objects.create(
+            name="Cluster",
+            group=ClusterGroup.objects.create(name="Cluster Group"),
+            type=ClusterType.objects.create(name="Cluster Type")
+        )
+        child_region = Region.objects.create(name="Child Region", slug="child-region", parent=self.region)
+        site2 = Site.objects.create(name='Site 2', slug='site-2', region=child_region)
+
+        assignments = (
+            ('regions', self.region),
+            ('site_groups', self.sitegroup),
+            ('sites', self.site),
+            ('locations', self.location),
+            ('device_types', self.devicetype),
+            ('roles', self.devicerole),
+            ('platforms', self.platform),
+            ('cluster_types', cluster.type),
+            ('cluster_groups', cluster.group),
+            ('clusters', cluster),
+            ('tenant_groups', self.tenantgroup),
+            ('tenants', self.tenant),
+            ('tags', self.tag),
+        )
+        for i, (field_name, obj) in enumerate(assignments):
+            context = ConfigContext.objects.create(name=field_name, weight=100 + i % 3, data={field_name: 1})
+            getattr(context, field_name).add(obj)
+        ConfigContext.objects.create(name="global", weight=50, data={"global": 1})
+        ConfigContext.objects.create(name="inactive", weight=50, is_active=False, data={"inactive": 1})
+        multiple_context = ConfigContext.objects.create(name="multiple", weight=200, data={"multiple": 1})
+        multiple_context.sites.add(self.site)
+        multiple_context.platforms.add(self.platform)
+
+        device = Device.objects.create(
+            name="Device 2",
+            site=site2,
+            tenant=self.tenant,
+            platform=self.platform,
+            device_role=self.devicerole,
+            device_type=self.devicetype,
+            cluster=cluster
+        )
+        device.tags.add(self.tag)
+        virtual_machine = VirtualMachine.objects.create(
+            name="VM 1",
+            cluster=cluster,
+            site=self.site,
+            platform=self.platform,
+            role=self.devicerole
+        )
+
+        for obj in (self.device, device, virtual_machine):
+            self.assertEqual(
+                list(ConfigContext.objects.get_for_object(obj)),
+                list(ConfigContext.objects.filter_for_object(obj))
+            )
+            self.assertEqual(
+                ConfigContext.objects.get_for_object(obj, aggregate_data=True),
+                ConfigContext.objects.filter_for_object(obj, aggregate_data=True)
+            )
+
+        # Changes to the assignments of ConfigContexts should be reflected immediately
+        multiple_context.sites.remove(self.site)
+        self.assertIn(multiple_context, ConfigContext.objects.get_for_object(virtual_machine))
+        multiple_context.sites.add(site2)
+        self.assertNotIn(multiple_context, ConfigContext.objects.get_for_object(virtual_machine))
+
+    def test_get_for_object_hierarchy_created_after_index(self):
+        """
+        Ensure that regions and site groups created after the ConfigContextIndex has been built are matched along with
+        their ancestors.
+        """
+        region_context = ConfigContext.objects.create(name="region", weight=100, data={"region": 1})
+        region_context.regions.add(self.region)
+        sitegroup_context = ConfigContext.objects.create(name="site group", weight=100, data={"site_group": 1})
+        sitegroup_context.site_groups.add(self.sitegroup)
+
+        # Build the index
+        ConfigContext.objects.get_for_object(self.device)
+
+        child_region = Region.objects.create(name="Child Region", slug="child-region", parent=self.region)
+        child_sitegroup = SiteGroup.objects.create(
+            name="Child Site Group", slug="child-site-group", parent=self.sitegroup
+        )
+        site = Site.objects.create(name='Site 2', slug='site-2', region=child_region, group=child_sitegroup)
+        device = Device.objects.create(
+            name="Device 2",
+            site=site,
+            device_role=self.devicerole,
+            device_type=self.devicetype
+        )
+
+        self.assertEqual(
+            list(ConfigContext.objects.get_for_object(device)),
+            list(ConfigContext.objects.filter_for_object(device))
+        )
+        self.assertIn(region_context, ConfigContext.objects.get_for_object(device))
+        self.assertIn(sitegroup_context, ConfigContext.objects.get_for_object(device))
+
+    def test_get_for_object_num_queries(self):
+        """
+        Once the ConfigContextIndex has been built, matching the ConfigContexts for an object in memory should require
+        only a single query (to validate the index) regardless of the number of ConfigContexts.
+        """
+        for i in range(20):
+            context = ConfigContext.objects.create(name=f"context {i}", weight=100, data={"context": i})
+            context.sites.add(self.site)
+            context.tags.add(self.tag)
+        self.device.tags.add(self.tag)
+        device = Device.objects.prefetch_related('tags').get(pk=self.device.pk)
+
+        # Build the index
+        expected = ConfigContext.objects.filter_for_object(device, aggregate_data=True)
+        ConfigContext.objects.get_for_object(device)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ConfigContext.objects.get_for_object(device, aggregate_data=True), expected)
+
     def test_multiple_tags_return_distinct_objects(self):
         """
         Tagged items use a generic relationship, which results in duplicate rows being returned when queried.
@@ -5,16 +5,19 @@ from unittest.mock import patch
 import django_rq
 from django.contrib.contenttypes.models import ContentType
 from django.http import HttpResponse
+from django.test import override_settings
 from django.urls import reverse
-from requests import Session
+from requests import RequestException, Session
 from rest_framework import status
 
 from dcim.choices import SiteStatusChoices
 from dcim.models import Site
 from extras.choices import ObjectChangeActionChoices
 from extras.models import Tag, Webhook
-from extras.webhooks import enqueue_object, flush_webhooks, generate_signature, serialize_for_webhook
-from extras.webhooks_worker import eval_conditions, process_webhook
+from extras.webhooks import (
+    clear_webhooks_cache, enqueue_object, eval_conditions, flush_webhooks, generate_signature, serialize_for_webhook,
+)
+from extras.webhooks_worker import process_webhook, process_webhook_batch
 from utilities.testing import APITestCase
 
 
@@ -25,6 +28,7 @@ class WebhookTest(APITestCase):
 
         self.queue = django_rq.get_queue('default')
         self.queue.empty()
+        clear_webhooks_cache()
 
     @classmethod
     def setUpTestData(cls):
@@ -283,6 +287,53 @@ class WebhookTest(APITestCase):
         # Evaluate the conditions (status='active')
         self.assertTrue(eval_conditions(webhook, data))
 
+    def test_flush_webhooks_conditions(self):
+        # Add a condition to the object creation webhook
+        webhook = Webhook.objects.get(type_create=True)
+        webhook.conditions = {'attr': 'status.value', 'value': 'active'}
+        webhook.save()
+
+        # Enqueue the creation of two sites, only one of which meets the webhook's conditions
+        webhooks_queue = []
+        for i, site_status in enumerate((SiteStatusChoices.STATUS_ACTIVE, SiteStatusChoices.STATUS_PLANNED), start=1):
+            site = Site.objects.create(name=f'Site {i}', slug=f'site-{i}', status=site_status)
+            enqueue_object(
+                webhooks_queue,
+                instance=site,
+                user=self.user,
+                request_id=uuid.uuid4(),
+                action=ObjectChangeActionChoices.ACTION_CREATE
+            )
+        flush_webhooks(webhooks_queue)
+
+        # Verify that a job was queued only for the site which meets the conditions
+        self.assertEqual(self.queue.count, 1)
+        job = self.queue.jobs[0]
+        self.assertEqual(job.kwargs['webhook'], webhook)
+        self.assertEqual(job.kwargs['data']['name'], 'Site 1')
+
+    @override_settings(WEBHOOKS_BATCH_SIZE=2)
+    def test_flush_webhooks_batched(self):
+        # Enqueue the creation of three sites
+        webhooks_queue = []
+        for i in range(1, 4):
+            site = Site.objects.create(name=f'Site {i}', slug=f'site-{i}')
+            enqueue_object(
+                webhooks_queue,
+                instance=site,
+                user=self.user,
+                request_id=uuid.uuid4(),
+                action=ObjectChangeActionChoices.ACTION_CREATE
+            )
+        flush_webhooks(webhooks_queue)
+
+        # Verify that the events were split into two batches
+        self.assertEqual(self.queue.count, 2)
+        webhook = Webhook.objects.get(type_create=True)
+        self.assertEqual(self.queue.jobs[0].kwargs['webhook'], webhook)
+        self.assertEqual([e['data']['name'] for e in self.queue.jobs[0].kwargs['events']], ['Site 1', 'Site 2'])
+        self.assertEqual([e['data']['name'] for e in self.queue.jobs[1].kwargs['events']], ['Site 3'])
+
     def test_webhooks_worker(self):
 
         request_id = uuid.uuid4()
@@ -329,3 +380,37 @@ class WebhookTest(APITestCase):
         # Patch the Session object with our dummy_send() method, then process the webhook for sending
         with patch.object(Session, 'send', dummy_send) as mock_send:
             process_webhook(**job.kwargs)
+
+    @override_settings(WEBHOOKS_BATCH_SIZE=10)
+    def test_webhooks_worker_batch(self):
+        sent_names = []
+
+        def dummy_send(_, request, **kwargs):
+            """
+            A dummy implementation of Session.send() to be used for testing.
+            Returns a 500 HTTP response for Site 2 and a 200 HTTP response otherwise.
+            """
+            name = json.loads(request.body)['data']['name']
+            sent_names.append(name)
+            return HttpResponse(status=500 if name == 'Site 2' else 200)
+
+        # Enqueue a batch of webhooks for processing
+        webhooks_queue = []
+        for i in range(1, 4):
+            site = Site.objects.create(name=f'Site {i}', slug=f'site-{i}')
+            enqueue_object(
+                webhooks_queue,
+                instance=site,
+                user=self.user,
+                request_id=uuid.uuid4(),
+                action=ObjectChangeActionChoices.ACTION_CREATE
+            )
+        flush_webhooks(webhooks_queue)
+        self.assertEqual(self.queue.count, 1)
+        job = self.queue.jobs[0]
+
+        # Process the batch; all requests should be sent despite the failure of one
+        with patch.object(Session, 'send', dummy_send):
+            with self.assertRaises(RequestException):
+                process_webhook_batch(**job.kwargs)
+        self.assertEqual(sorted(sent_names), ['Site 1', 'Site 2', 'Site 3'])
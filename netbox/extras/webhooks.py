@@ -1,16 +1,41 @@
 import hashlib
 import hmac
+import logging
+import uuid
+from collections import defaultdict
 
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.utils import timezone
 from django_rq import get_queue
+from rq import Queue
 
 from utilities.api import get_serializer_for_model
 from utilities.utils import serialize_object
 from .choices import *
+from .conditions import ConditionSet
 from .models import Webhook
 from .registry import registry
 
+logger = logging.getLogger('netbox.webhooks')
+
+# Cache key under which the current version of the cached Webhooks is stored
+WEBHOOKS_CACHE_VERSION_KEY = 'webhooks_cache_version'
+
+# Maps each event to the Webhook attribute indicating whether it is enabled for that event
+WEBHOOK_EVENT_FLAGS = {
+    ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
+    ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
+    ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
+}
+
+# In-process cache of enabled Webhooks (see get_webhooks())
+_webhooks_cache = {
+    'version': None,
+    'webhooks': None,
+}
+
 
 def serialize_for_webhook(instance):
     """
@@ -74,44 +99,94 @@ def enqueue_object(queue, instance, user, request_id, action):
     })
 
 
+def eval_conditions(webhook, data, conditions=None):
+    """
+    Test whether the given data meets the conditions of the webhook (if any). Return True
+    if met or no conditions are specified. A previously compiled ConditionSet may be passed.
+    """
+    if not webhook.conditions:
+        return True
+
+    logger.debug(f'Evaluating webhook conditions: {webhook.conditions}')
+    if (conditions or ConditionSet(webhook.conditions)).eval(data):
+        return True
+
+    return False
+
+
+def clear_webhooks_cache():
+    """
+    Invalidate the cached Webhooks in all processes (e.g. because a Webhook has been modified).
+    """
+    cache.set(WEBHOOKS_CACHE_VERSION_KEY, uuid.uuid4().hex, None)
+    _webhooks_cache['webhooks'] = None
+
+
+def get_webhooks():
+    """
+    Return a dictionary mapping each (content type ID, event) to a list of (Webhook, ConditionSet) tuples for all
+    applicable enabled Webhooks. Webhooks are cached in-process until invalidated by clear_webhooks_cache() in any
+    process.
+    """
+    version = cache.get(WEBHOOKS_CACHE_VERSION_KEY)
+    if _webhooks_cache['webhooks'] is None or _webhooks_cache['version'] != version:
+        webhooks = defaultdict(list)
+        for webhook in Webhook.objects.filter(enabled=True).prefetch_related('content_types'):
+            conditions = ConditionSet(webhook.conditions) if webhook.conditions else None
+            events = [
+                event for event, action_flag in WEBHOOK_EVENT_FLAGS.items() if getattr(webhook, action_flag)
+            ]
+            for content_type in webhook.content_types.all():
+                for event in events:
+                    webhooks[(content_type.pk, event)].append((webhook, conditions))
+        _webhooks_cache['webhooks'] = dict(webhooks)
+        _webhooks_cache['version'] = version
+
+    return _webhooks_cache['webhooks']
+
+
 def flush_webhooks(queue):
     """
-    Flush a list of object representation to RQ for webhook processing.
+    Flush a list of object representation to RQ for webhook processing. Webhook conditions are evaluated prior to
+    queuing, and all jobs are enqueued using a single Redis pipeline. If WEBHOOKS_BATCH_SIZE is greater than one,
+    events for the same Webhook are grouped into batches of up to that size, each processed by a single job.
     """
+    if not queue:
+        return
     rq_queue = get_queue('default')
-    webhooks_cache = {
-        'type_create': {},
-        'type_update': {},
-        'type_delete': {},
-    }
+    webhooks = get_webhooks()
+    batch_size = settings.WEBHOOKS_BATCH_SIZE
 
+    # Map the events to be sent to each applicable Webhook
+    webhook_events = defaultdict(list)
     for data in queue:
-
-        action_flag = {
-            ObjectChangeActionChoices.ACTION_CREATE: 'type_create',
-            ObjectChangeActionChoices.ACTION_UPDATE: 'type_update',
-            ObjectChangeActionChoices.ACTION_DELETE: 'type_delete',
-        }[data['event']]
-        content_type = data['content_type']
-
-        # Cache applicable Webhooks
-        if content_type not in webhooks_cache[action_flag]:
-            webhooks_cache[action_flag][content_type] = Webhook.objects.filter(
-                **{action_flag: True},
-                content_types=content_type,
-                enabled=True
-            )
-        webhooks = webhooks_cache[action_flag][content_type]
-
-        for webhook in webhooks:
-            rq_queue.enqueue(
-                "extras.webhooks_worker.process_webhook",
-                webhook=webhook,
-                model_name=content_type.model,
-                event=data['event'],
-                data=data['data'],
-                snapshots=data['snapshots'],
-                timestamp=str(timezone.now()),
-                username=data['username'],
-                request_id=data['request_id']
-            )
+        for webhook, conditions in webhooks.get((data['content_type'].pk, data['event']), []):
+            if not eval_conditions(webhook, data['data'], conditions):
+                continue
+            webhook_events[webhook].append({
+                'model_name': data['content_type'].model,
+                'event': data['event'],
+                'data': data['data'],
+                'snapshots': data['snapshots'],
+                'timestamp': str(timezone.now()),
+                'username': data['username'],
+                'request_id': data['request_id'],
+            })
+
+    jobs = []
+    for webhook, events in webhook_events.items():
+        if batch_size > 1:
+            for i in range(0, len(events), batch_size):
+                jobs.append(Queue.prepare_data(
+                    "extras.webhooks_worker.process_webhook_batch",
+                    kwargs={'webhook': webhook, 'events': events[i:i + batch_size]}
+                ))
+        else:
+            for event in events:
+                jobs.append(Queue.prepare_data(
+                    "extras.webhooks_worker.process_webhook",
+                    kwargs={'webhook': webhook, **event}
+                ))
+
+    if jobs:
+        rq_queue.enqueue_many(jobs)
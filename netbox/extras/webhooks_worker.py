@@ -1,41 +1,112 @@
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import requests
 from django.conf import settings
 from django_rq import job
 from jinja2.exceptions import TemplateError
+from prometheus_client import Gauge, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .choices import ObjectChangeActionChoices
-from .conditions import ConditionSet
 from .webhooks import generate_signature
 
 logger = logging.getLogger('netbox.webhooks_worker')
 
-
-def eval_conditions(webhook, data):
+# Response statuses upon which a request will be retried
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Retries are delayed by RETRY_BACKOFF_FACTOR * 2 ** (n - 1) seconds, where n is the number of attempts so far
+RETRY_BACKOFF_FACTOR = 0.5
+
+#
+# Metrics
+#
+
+webhook_request_latency = Histogram(
+    'netbox_webhook_request_latency_seconds',
+    'Time taken to deliver a webhook request (including any retries)',
+    ['host', 'outcome']
+)
+webhook_requests_waiting = Gauge(
+    'netbox_webhook_requests_waiting',
+    'Number of webhook requests waiting for a connection to the receiving host',
+    ['host'],
+    multiprocess_mode='livesum'
+)
+webhook_requests_in_progress = Gauge(
+    'netbox_webhook_requests_in_progress',
+    'Number of webhook requests currently in flight',
+    ['host'],
+    multiprocess_mode='livesum'
+)
+
+#
+# Connection pooling
+#
+
+_pool_lock = threading.Lock()
+_pool = {
+    'pid': None,
+    'session': None,
+    'semaphores': {},
+}
+
+
+def get_session():
     """
-    Test whether the given data meets the conditions of the webhook (if any). Return True
-    if met or no conditions are specified.
+    Return the Session shared by all webhook requests made by this process. Its adapter maintains a pool of persistent
+    connections to each receiving host, so that consecutive requests to the same host need not each establish a new
+    TCP (and TLS) connection. A new Session is created after forking, as connections cannot be shared between processes.
     """
-    if not webhook.conditions:
-        return True
-
-    logger.debug(f'Evaluating webhook conditions: {webhook.conditions}')
-    if ConditionSet(webhook.conditions).eval(data):
-        return True
+    with _pool_lock:
+        if _pool['session'] is None or _pool['pid'] != os.getpid():
+            retries = Retry(
+                total=settings.WEBHOOKS_MAX_RETRIES,
+                backoff_factor=RETRY_BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=None,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_maxsize=settings.WEBHOOKS_MAX_CONNECTIONS_PER_HOST,
+                max_retries=retries
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _pool.update({
+                'pid': os.getpid(),
+                'session': session,
+                'semaphores': {},
+            })
+
+        return _pool['session']
+
+
+def get_host_semaphore(host):
+    """
+    Return the semaphore limiting the number of concurrent requests made by this process to the given host.
+    """
+    with _pool_lock:
+        if host not in _pool['semaphores']:
+            _pool['semaphores'][host] = threading.BoundedSemaphore(settings.WEBHOOKS_MAX_CONNECTIONS_PER_HOST)
+        return _pool['semaphores'][host]
 
-    return False
 
+#
+# Request handling
+#
 
-@job('default')
-def process_webhook(webhook, model_name, event, data, snapshots, timestamp, username, request_id):
+def prepare_request(webhook, model_name, event, data, snapshots, timestamp, username, request_id):
     """
-    Make a POST request to the defined Webhook
+    Render and return the PreparedRequest to be sent for a Webhook event.
     """
-    # Evaluate webhook conditions (if any)
-    if not eval_conditions(webhook, data):
-        return
-
     # Prepare context data for headers & body templates
     context = {
         'event': dict(ObjectChangeActionChoices)[event].lower(),
@@ -85,18 +156,82 @@ def process_webhook(webhook, model_name, event, data, snapshots, timestamp, user
     if webhook.secret != '':
         prepared_request.headers['X-Hook-Signature'] = generate_signature(prepared_request.body, webhook.secret)
 
-    # Send the request
-    with requests.Session() as session:
-        session.verify = webhook.ssl_verification
-        if webhook.ca_file_path:
-            session.verify = webhook.ca_file_path
-        response = session.send(prepared_request, proxies=settings.HTTP_PROXIES)
+    return prepared_request
+
+
+def send_request(webhook, prepared_request):
+    """
+    Send a prepared request for a Webhook using the shared connection pool, waiting for a free connection if the
+    maximum number of concurrent requests to the receiving host has been reached. Failed requests are retried (with
+    backoff) up to WEBHOOKS_MAX_RETRIES times.
+    """
+    host = urlsplit(prepared_request.url).netloc
+    session = get_session()
+
+    with webhook_requests_waiting.labels(host).track_inprogress():
+        get_host_semaphore(host).acquire()
+    try:
+        start_time = time.monotonic()
+        with webhook_requests_in_progress.labels(host).track_inprogress():
+            response = session.send(
+                prepared_request,
+                verify=webhook.ca_file_path or webhook.ssl_verification,
+                proxies=settings.HTTP_PROXIES
+            )
+    except requests.exceptions.RequestException as e:
+        webhook_request_latency.labels(host, 'error').observe(time.monotonic() - start_time)
+        logger.warning(f"Request to {host} failed: {e}")
+        raise e
+    finally:
+        get_host_semaphore(host).release()
 
     if 200 <= response.status_code <= 299:
+        webhook_request_latency.labels(host, 'success').observe(time.monotonic() - start_time)
         logger.info(f"Request succeeded; response status {response.status_code}")
         return f"Status {response.status_code} returned, webhook successfully processed."
     else:
+        webhook_request_latency.labels(host, 'failure').observe(time.monotonic() - start_time)
         logger.warning(f"Request failed; response status {response.status_code}: {response.content}")
         raise requests.exceptions.RequestException(
             f"Status {response.status_code} returned with content '{response.content}', webhook FAILED to process."
         )
+
+
+@job('default')
+def process_webhook(webhook, model_name, event, data, snapshots, timestamp, username, request_id):
+    """
+    Make a POST request to the defined Webhook. Webhook conditions are evaluated prior to queuing.
+    """
+    prepared_request = prepare_request(webhook, model_name, event, data, snapshots, timestamp, username, request_id)
+
+    return send_request(webhook, prepared_request)
+
+
+@job('default')
+def process_webhook_batch(webhook, events):
+    """
+    Make a request to the defined Webhook for each of a batch of events. Up to WEBHOOKS_CONCURRENCY requests are sent
+    concurrently, so events are not necessarily delivered in order. Each event is attempted even if an earlier one
+    fails; an exception is raised once all have been processed if any failed.
+    """
+    failures = []
+    prepared_requests = []
+    for event in events:
+        try:
+            prepared_requests.append(prepare_request(webhook, **event))
+        except Exception as e:
+            failures.append(e)
+
+    with ThreadPoolExecutor(max_workers=max(settings.WEBHOOKS_CONCURRENCY, 1)) as executor:
+        futures = [
+            executor.submit(send_request, webhook, prepared_request) for prepared_request in prepared_requests
+        ]
+        for future in futures:
+            if future.exception() is not None:
+                failures.append(future.exception())
+
+    if failures:
+        raise requests.exceptions.RequestException(
+            f"{len(failures)} of {len(events)} requests FAILED to process for webhook {webhook}: {failures[0]}"
+        )
+    return f"{len(events)} requests successfully processed."
@@ -1,3 +1,5 @@
+from itertools import islice
+
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
 from django.shortcuts import get_object_or_404
@@ -12,6 +14,7 @@ from circuits.models import Provider
 from dcim.models import Site
 from ipam import filtersets
 from ipam.models import *
+from ipam.utils import allocation_lock, defer_hierarchy_updates
 from netbox.api.viewsets import NetBoxModelViewSet
 from netbox.api.viewsets.mixins import ObjectValidationMixin
 from netbox.config import get_config
@@ -96,6 +99,13 @@ class PrefixViewSet(NetBoxModelViewSet):
             return serializers.PrefixLengthSerializer
         return super().get_serializer_class()
 
+    def perform_create(self, serializer):
+        # When creating prefixes in bulk, rebuild the prefix hierarchy once rather than after each prefix
+        if isinstance(self.request.data, list):
+            with transaction.atomic(), defer_hierarchy_updates():
+                return super().perform_create(serializer)
+        return super().perform_create(serializer)
+
 
 class IPRangeViewSet(NetBoxModelViewSet):
     queryset = IPRange.objects.prefetch_related('vrf', 'role', 'tenant', 'tags')
@@ -208,10 +218,14 @@ class AvailablePrefixesView(ObjectValidationMixin, APIView):
         request_body=serializers.PrefixLengthSerializer,
         responses={201: serializers.PrefixSerializer(many=True)}
     )
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-prefixes'])
     def post(self, request, pk):
         self.queryset = self.queryset.restrict(request.user, 'add')
         prefix = get_object_or_404(Prefix.objects.restrict(request.user), pk=pk)
+
+        with allocation_lock(ADVISORY_LOCK_KEYS['available-prefixes'], prefix):
+            return self.allocate(request, prefix)
+
+    def allocate(self, request, prefix):
         available_prefixes = prefix.get_available_prefixes()
 
         # Validate Requested Prefixes' length
@@ -283,11 +297,7 @@ class AvailableIPAddressesView(ObjectValidationMixin, APIView):
         limit = get_results_limit(request)
 
         # Calculate available IPs within the parent
-        ip_list = []
-        for index, ip in enumerate(parent.get_available_ips(), start=1):
-            ip_list.append(ip)
-            if index == limit:
-                break
+        ip_list = list(islice(parent.get_available_ips(), limit))
         serializer = serializers.AvailableIPSerializer(ip_list, many=True, context={
             'request': request,
             'parent': parent,
@@ -300,17 +310,20 @@ class AvailableIPAddressesView(ObjectValidationMixin, APIView):
         request_body=serializers.AvailableIPSerializer,
         responses={201: serializers.IPAddressSerializer(many=True)}
     )
-    @advisory_lock(ADVISORY_LOCK_KEYS['available-ips'])
     def post(self, request, pk):
         self.queryset = self.queryset.restrict(request.user, 'add')
         parent = self.get_parent(request, pk)
 
+        with allocation_lock(ADVISORY_LOCK_KEYS['available-ips'], parent):
+            return self.allocate(request, parent)
+
+    def allocate(self, request, parent):
         # Normalize to a list of objects
         requested_ips = request.data if isinstance(request.data, list) else [request.data]
 
         # Determine if the requested number of IPs is available
-        available_ips = parent.get_available_ips()
-        if available_ips.size < len(requested_ips):
+        available_ips = list(islice(parent.get_available_ips(), len(requested_ips)))
+        if len(available_ips) < len(requested_ips):
             return Response(
                 {
                     "detail": f"An insufficient number of IP addresses are available within {parent} "
@@ -320,9 +333,8 @@ class AvailableIPAddressesView(ObjectValidationMixin, APIView):
             )
 
         # Assign addresses from the list of available IPs and copy VRF assignment from the parent
-        available_ips = iter(available_ips)
-        for requested_ip in requested_ips:
-            requested_ip['address'] = f'{next(available_ips)}/{parent.mask_length}'
+        for requested_ip, available_ip in zip(requested_ips, available_ips):
+            requested_ip['address'] = f'{available_ip}/{parent.mask_length}'
             requested_ip['vrf'] = parent.vrf.pk if parent.vrf else None
 
         # Initialize the serializer with a list or a single object depending on what was requested
@@ -0,0 +1,134 @@
+import heapq
+
+import netaddr
+
+from .lookups import Host, Inet
+
+__all__ = (
+    'AvailableIPs',
+    'get_address_intervals',
+    'get_range_intervals',
+    'interleave_gaps',
+    'iter_gaps',
+)
+
+
+#
+# Range arithmetic on integer addresses
+#
+
+def interleave_gaps(first, last, items, get_interval):
+    """
+    Walk a sequence of items (sorted by first address) and yield a (gap, item) tuple for each gap and each item, where
+    gap is a (first, last) tuple of integer addresses not covered by any item between the first and last addresses
+    (exactly one of gap and item is not None). Items may overlap one another or extend beyond the bounds.
+
+    :param first: The first integer address to consider
+    :param last: The last integer address to consider
+    :param items: An iterable of items sorted by their first address
+    :param get_interval: A callable returning the (first, last) integer addresses covered by an item
+    """
+    cursor = first
+    for item in items:
+        start, end = get_interval(item)
+        if cursor <= start - 1 and cursor <= last:
+            yield (cursor, min(start - 1, last)), None
+        yield None, item
+        cursor = max(cursor, end + 1)
+    if cursor <= last:
+        yield (cursor, last), None
+
+
+def iter_gaps(first, last, intervals):
+    """
+    Yield all (first, last) gaps between the given sorted intervals of integer addresses, stopping once the last
+    address has been reached.
+    """
+    for gap, interval in interleave_gaps(first, last, intervals, lambda interval: interval):
+        if gap is not None:
+            yield gap
+        elif interval[0] > last:
+            return
+
+
+def get_address_intervals(queryset):
+    """
+    Stream the host portion of all addresses in an IPAddress queryset as (first, last) integer intervals, sorted by
+    address.
+    """
+    addresses = queryset.order_by(Inet(Host('address'))).values_list('address', flat=True)
+    for address in addresses.iterator():
+        yield address.ip.value, address.ip.value
+
+
+def get_range_intervals(queryset):
+    """
+    Stream all ranges in an IPRange queryset as (first, last) integer intervals, sorted by start address.
+    """
+    ranges = queryset.order_by(Inet(Host('start_address'))).values_list('start_address', 'end_address')
+    for start_address, end_address in ranges.iterator():
+        yield start_address.ip.value, end_address.ip.value
+
+
+class AvailableIPs:
+    """
+    A lazily evaluated view of the available IP addresses between two integer addresses. Occupied space is read from
+    one or more sources of sorted (first, last) intervals only when the object is iterated, so that e.g. retrieving the
+    first few available addresses within a large prefix stops reading from the database once they have been found.
+
+    :param version: The IP version (4 or 6)
+    :param first: The first usable integer address
+    :param last: The last usable integer address
+    :param interval_sources: Callables each returning an iterable of sorted (first, last) intervals of occupied space
+    """
+    def __init__(self, version, first, last, interval_sources=()):
+        self.version = version
+        self.first = first
+        self.last = last
+        self.interval_sources = interval_sources
+
+    def __repr__(self):
+        return f'<AvailableIPs {netaddr.IPAddress(self.first, self.version)}-{netaddr.IPAddress(self.last, self.version)}>'
+
+    def iter_gaps(self):
+        """
+        Yield each contiguous block of available addresses as a (first, last) tuple of integers.
+        """
+        intervals = heapq.merge(*[source() for source in self.interval_sources])
+        return iter_gaps(self.first, self.last, intervals)
+
+    def iter_ranges(self):
+        """
+        Yield each contiguous block of available addresses as a netaddr.IPRange.
+        """
+        for first, last in self.iter_gaps():
+            yield netaddr.IPRange(
+                netaddr.IPAddress(first, self.version),
+                netaddr.IPAddress(last, self.version)
+            )
+
+    def __iter__(self):
+        for first, last in self.iter_gaps():
+            for value in range(first, last + 1):
+                yield netaddr.IPAddress(value, self.version)
+
+    def __bool__(self):
+        return self.get_first() is not None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def size(self):
+        """
+        The total number of available addresses.
+        """
+        return sum(last - first + 1 for first, last in self.iter_gaps())
+
+    def get_first(self):
+        """
+        Return the first available address as a netaddr.IPAddress (or None).
+        """
+        for first, _ in self.iter_gaps():
+            return netaddr.IPAddress(first, self.version)
+        return None
@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from ipam.api.views import PrefixAvailableIPAddressesView
+from ipam.models import IPAddress, Prefix, VRF
+
+BENCHMARK_VRF = 'Allocation benchmark'
+
+
+class Command(BaseCommand):
+    help = "Measure the throughput of concurrent IP address allocations via the REST API under each lock scope"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", required=True,
+            help="Username of the (superuser) account on whose behalf addresses are allocated"
+        )
+        parser.add_argument(
+            "--clients", type=int, default=8,
+            help="Maximum number of parallel clients; throughput is measured at each power of two (default: 8)"
+        )
+        parser.add_argument(
+            "--allocations", type=int, default=50,
+            help="Number of addresses allocated by each client (default: 50)"
+        )
+        parser.add_argument(
+            "--shared", action='store_true',
+            help="Allocate all addresses from a single parent prefix rather than one prefix per client"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+        max_clients = max(options['clients'], 1)
+        allocations = max(options['allocations'], 1)
+
+        # Create a scratch VRF containing a parent prefix for each client
+        vrf = VRF.objects.create(name=BENCHMARK_VRF)
+        try:
+            parents = [
+                Prefix.objects.create(vrf=vrf, prefix=f'10.{i}.0.0/16') for i in range(max_clients)
+            ]
+            self.stdout.write(f"{'Clients':>8} {'Scope':>8} {'Allocations/sec':>16}")
+            client_counts = [2 ** i for i in range(max_clients.bit_length()) if 2 ** i <= max_clients]
+            for clients in client_counts:
+                for scope in ('global', 'parent'):
+                    with override_settings(ALLOCATION_LOCK_SCOPE=scope):
+                        rate = self.run(parents[:1] * clients if options['shared'] else parents[:clients], allocations)
+                    self.stdout.write(f"{clients:>8} {scope:>8} {rate:>16.1f}")
+                    IPAddress.objects.filter(vrf=vrf).delete()
+        finally:
+            IPAddress.objects.filter(vrf=vrf).delete()
+            Prefix.objects.filter(vrf=vrf).delete()
+            vrf.delete()
+
+        self.stdout.write(self.style.SUCCESS('Finished.'))
+
+    def allocate(self, parent, count):
+        """
+        Allocate addresses from the given parent prefix one at a time, as a provisioning client would.
+        """
+        factory = APIRequestFactory()
+        view = PrefixAvailableIPAddressesView.as_view()
+        try:
+            for _ in range(count):
+                request = factory.post(
+                    f'/api/ipam/prefixes/{parent.pk}/available-ips/', {'description': 'Benchmark'}, format='json'
+                )
+                force_authenticate(request, user=self.user)
+                response = view(request, pk=parent.pk)
+                if response.status_code != 201:
+                    raise CommandError(f"Allocation failed ({response.status_code}): {response.data}")
+        finally:
+            # Each thread opens its own database connection
+            connection.close()
+
+    def run(self, parents, allocations):
+        """
+        Allocate addresses with one client thread per parent and return the aggregate number of allocations per
+        second.
+        """
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=len(parents)) as executor:
+            futures = [executor.submit(self.allocate, parent, allocations) for parent in parents]
+            for future in futures:
+                future.result()
+        elapsed = time.monotonic() - start_time
+
+        return len(parents) * allocations / elapsed
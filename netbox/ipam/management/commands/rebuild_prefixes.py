@@ -1,27 +1,103 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
 
 from ipam.models import Prefix, VRF
 from ipam.utils import rebuild_prefixes
 
 
+def close_db_connections():
+    """
+    Discard any database connections inherited from the parent process, so that each worker opens its own.
+    """
+    connections.close_all()
+
+
+def rebuild_vrf(vrf_id, batch_size, diff, dry_run):
+    """
+    Rebuild the prefix hierarchy of a single VRF (or the global table). Returns the number of changed prefixes.
+    """
+    return rebuild_prefixes(vrf_id, batch_size=batch_size, diff=diff, dry_run=dry_run)
+
+
 class Command(BaseCommand):
     help = "Rebuild the prefix hierarchy (depth and children counts)"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of worker processes to rebuild VRFs in parallel (default: 1)"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, dest='batch_size',
+            help="Number of prefixes to retrieve and update per query (default: 1000)"
+        )
+        parser.add_argument(
+            "--diff", action='store_true',
+            help="Update only those prefixes whose depth or children count has changed"
+        )
+        parser.add_argument(
+            "--dry-run", action='store_true', dest='dry_run',
+            help="Report the number of prefixes which would be updated without saving any changes (implies --diff)"
+        )
+
     def handle(self, *model_names, **options):
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        dry_run = options['dry_run']
+        diff = options['diff'] or dry_run
+
         self.stdout.write(f'Rebuilding {Prefix.objects.count()} prefixes...')
 
-        # Reset existing counts
-        Prefix.objects.update(_depth=0, _children=0)
+        # Reset existing counts (unnecessary when comparing against them)
+        if not diff:
+            Prefix.objects.update(_depth=0, _children=0)
+
+        # Determine the number of prefixes in the global table and in each VRF, largest first so that the biggest
+        # VRFs are not left until last when running in parallel
+        vrf_counts = Prefix.objects.order_by().values('vrf').annotate(count=Count('pk')).order_by('-count')
+        vrf_counts = {row['vrf']: row['count'] for row in vrf_counts}
+        vrf_names = {
+            vrf.pk: f'VRF {vrf}' for vrf in VRF.objects.filter(pk__in=vrf_counts.keys())
+        }
+        vrf_names[None] = 'Global'
+
+        start_time = time.monotonic()
+        changed_count = 0
 
-        # Rebuild the global table
-        global_count = Prefix.objects.filter(vrf__isnull=True).count()
-        self.stdout.write(f'Global: {global_count} prefixes...')
-        rebuild_prefixes(None)
+        if workers > 1:
+            # Close the parent's connections prior to forking; each worker will open its own
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context('fork'),
+                initializer=close_db_connections
+            ) as pool:
+                futures = {
+                    pool.submit(rebuild_vrf, vrf_id, batch_size, diff, dry_run): vrf_id for vrf_id in vrf_counts
+                }
+                for future in as_completed(futures):
+                    vrf_id = futures[future]
+                    changed_count += self.report(vrf_names[vrf_id], vrf_counts[vrf_id], future.result(), diff)
+        else:
+            for vrf_id, count in vrf_counts.items():
+                changed = rebuild_vrf(vrf_id, batch_size, diff, dry_run)
+                changed_count += self.report(vrf_names[vrf_id], count, changed, diff)
 
-        # Rebuild each VRF
-        for vrf in VRF.objects.all():
-            vrf_count = Prefix.objects.filter(vrf=vrf).count()
-            self.stdout.write(f'VRF {vrf}: {vrf_count} prefixes...')
-            rebuild_prefixes(vrf.pk)
+        elapsed = time.monotonic() - start_time
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'Dry run: {changed_count} prefixes would have been updated.'))
+        elif diff:
+            self.stdout.write(f'Updated {changed_count} prefixes.')
+        self.stdout.write(self.style.SUCCESS(f'Finished in {elapsed:.1f}s.'))
 
-        self.stdout.write(self.style.SUCCESS('Finished.'))
+    def report(self, name, count, changed, diff):
+        if diff:
+            self.stdout.write(f'{name}: {count} prefixes ({changed} changed)')
+        else:
+            self.stdout.write(f'{name}: {count} prefixes')
+        return changed
@@ -9,6 +9,7 @@ from django.utils.functional import cached_property
 
 from dcim.fields import ASNField
 from dcim.models import Device
+from ipam.available import AvailableIPs, get_address_intervals, get_range_intervals
 from netbox.models import OrganizationalModel, NetBoxModel
 from ipam.choices import *
 from ipam.constants import *
@@ -504,44 +505,45 @@ class Prefix(GetAvailablePrefixesMixin, NetBoxModel):
         else:
             return IPAddress.objects.filter(address__net_host_contained=str(self.prefix), vrf=self.vrf)
 
+    def _get_occupied_intervals(self):
+        """
+        Return callables streaming the sorted intervals of address space occupied by child IPAddresses and IPRanges.
+        """
+        return (
+            lambda: get_address_intervals(self.get_child_ips()),
+            lambda: get_range_intervals(self.get_child_ranges()),
+        )
+
     def get_available_ips(self):
         """
-        Return all available IPs within this prefix as an IPSet.
+        Return all available IPs within this prefix as a lazily evaluated AvailableIPs instance.
         """
         if self.mark_utilized:
-            return list()
+            # No addresses are available
+            return AvailableIPs(self.family, self.prefix.first, self.prefix.first - 1)
 
-        prefix = netaddr.IPSet(self.prefix)
-        child_ips = netaddr.IPSet([ip.address.ip for ip in self.get_child_ips()])
-        child_ranges = netaddr.IPSet()
-        for iprange in self.get_child_ranges():
-            child_ranges.add(iprange.range)
-        available_ips = prefix - child_ips - child_ranges
+        first, last = self.prefix.first, self.prefix.last
 
         # IPv6 /127's, pool, or IPv4 /31-/32 sets are fully usable
-        if (self.family == 6 and self.prefix.prefixlen >= 127) or self.is_pool or (self.family == 4 and self.prefix.prefixlen >= 31):
-            return available_ips
-
-        if self.family == 4:
+        if not self.is_pool and self.family == 4 and self.prefix.prefixlen < 31:
             # For "normal" IPv4 prefixes, omit first and last addresses
-            available_ips -= netaddr.IPSet([
-                netaddr.IPAddress(self.prefix.first),
-                netaddr.IPAddress(self.prefix.last),
-            ])
-        else:
+            first += 1
+            last -= 1
+        elif not self.is_pool and self.family == 6 and self.prefix.prefixlen < 127:
             # For IPv6 prefixes, omit the Subnet-Router anycast address
             # per RFC 4291
-            available_ips -= netaddr.IPSet([netaddr.IPAddress(self.prefix.first)])
-        return available_ips
+            first += 1
+
+        return AvailableIPs(self.family, first, last, self._get_occupied_intervals())
 
     def get_first_available_ip(self):
         """
         Return the first available IP within the prefix (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
+        first_ip = self.get_available_ips().get_first()
+        if first_ip is None:
             return None
-        return '{}/{}'.format(next(available_ips.__iter__()), self.prefix.prefixlen)
+        return '{}/{}'.format(first_ip, self.prefix.prefixlen)
 
     def get_utilization(self):
         """
@@ -559,15 +561,16 @@ class Prefix(GetAvailablePrefixesMixin, NetBoxModel):
             child_prefixes = netaddr.IPSet([p.prefix for p in queryset])
             utilization = float(child_prefixes.size) / self.prefix.size * 100
         else:
-            # Compile an IPSet to avoid counting duplicate IPs
-            child_ips = netaddr.IPSet(
-                [_.range for _ in self.get_child_ranges()] + [_.address.ip for _ in self.get_child_ips()]
-            )
+            # Count the space not covered by any child IP or range (so that duplicate IPs are counted once)
+            unused = AvailableIPs(
+                self.family, self.prefix.first, self.prefix.last, self._get_occupied_intervals()
+            ).size
+            child_ips_size = self.prefix.size - unused
 
             prefix_size = self.prefix.size
             if self.prefix.version == 4 and self.prefix.prefixlen < 31 and not self.is_pool:
                 prefix_size -= 2
-            utilization = float(child_ips.size) / prefix_size * 100
+            utilization = float(child_ips_size) / prefix_size * 100
 
         return min(utilization, 100)
 
@@ -736,33 +739,33 @@ class IPRange(NetBoxModel):
 
     def get_available_ips(self):
         """
-        Return all available IPs within this range as an IPSet.
+        Return all available IPs within this range as a lazily evaluated AvailableIPs instance.
         """
-        range = netaddr.IPRange(self.start_address.ip, self.end_address.ip)
-        child_ips = netaddr.IPSet([ip.address.ip for ip in self.get_child_ips()])
-
-        return netaddr.IPSet(range) - child_ips
+        return AvailableIPs(
+            self.family,
+            self.start_address.ip.value,
+            self.end_address.ip.value,
+            (lambda: get_address_intervals(self.get_child_ips()),)
+        )
 
     @cached_property
     def first_available_ip(self):
         """
         Return the first available IP within the range (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
+        first_ip = self.get_available_ips().get_first()
+        if first_ip is None:
             return None
 
-        return '{}/{}'.format(next(available_ips.__iter__()), self.start_address.prefixlen)
+        return '{}/{}'.format(first_ip, self.start_address.prefixlen)
 
     @cached_property
     def utilization(self):
         """
         Determine the utilization of the range and return it as a percentage.
         """
-        # Compile an IPSet to avoid counting duplicate IPs
-        child_count = netaddr.IPSet([
-            ip.address.ip for ip in self.get_child_ips()
-        ]).size
+        # Count the space not covered by any child IP (so that duplicate IPs are counted once)
+        child_count = self.size - self.get_available_ips().size
 
         return int(float(child_count) / self.size * 100)
 
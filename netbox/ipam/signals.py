@@ -4,26 +4,7 @@ from django.dispatch import receiver
 from dcim.models import Device
 from virtualization.models import VirtualMachine
 from .models import IPAddress, Prefix
-
-
-def update_parents_children(prefix):
-    """
-    Update depth on prefix & containing prefixes
-    """
-    parents = prefix.get_parents(include_self=True).annotate_hierarchy()
-    for parent in parents:
-        parent._children = parent.hierarchy_children
-    Prefix.objects.bulk_update(parents, ['_children'], batch_size=100)
-
-
-def update_children_depth(prefix):
-    """
-    Update children count on prefix & contained prefixes
-    """
-    children = prefix.get_children(include_self=True).annotate_hierarchy()
-    for child in children:
-        child._depth = child.hierarchy_depth
-    Prefix.objects.bulk_update(children, ['_depth'], batch_size=100)
+from .utils import add_prefix_to_hierarchy, defer_hierarchy_update, remove_prefix_from_hierarchy
 
 
 @receiver(post_save, sender=Prefix)
@@ -32,21 +13,20 @@ def handle_prefix_saved(instance, created, **kwargs):
     # Prefix has changed (or new instance has been created)
     if created or instance.vrf_id != instance._vrf_id or instance.prefix != instance._prefix:
 
-        update_parents_children(instance)
-        update_children_depth(instance)
+        if created:
+            if not defer_hierarchy_update(instance.vrf_id):
+                add_prefix_to_hierarchy(instance)
 
         # If this is not a new prefix, clean up parent/children of previous prefix
-        if not created:
-            old_prefix = Prefix(vrf_id=instance._vrf_id, prefix=instance._prefix)
-            update_parents_children(old_prefix)
-            update_children_depth(old_prefix)
+        elif not defer_hierarchy_update(instance.vrf_id, instance._vrf_id):
+            add_prefix_to_hierarchy(instance, old_vrf_id=instance._vrf_id, old_prefix=instance._prefix)
 
 
 @receiver(post_delete, sender=Prefix)
 def handle_prefix_deleted(instance, **kwargs):
 
-    update_parents_children(instance)
-    update_children_depth(instance)
+    if not defer_hierarchy_update(instance.vrf_id):
+        remove_prefix_from_hierarchy(instance)
 
 
 @receiver(pre_delete, sender=IPAddress)
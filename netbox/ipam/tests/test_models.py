@@ -1,3 +1,5 @@
+from itertools import islice
+
 from netaddr import IPNetwork, IPSet
 from django.core.exceptions import ValidationError
 from django.test import TestCase, override_settings
@@ -5,6 +7,7 @@ from django.test import TestCase, override_settings
 from dcim.models import Interface, Device, DeviceRole, DeviceType, Manufacturer, Site
 from ipam.choices import IPAddressRoleChoices, PrefixStatusChoices
 from ipam.models import Aggregate, IPAddress, IPRange, Prefix, RIR, VLAN, VLANGroup, VRF, L2VPN, L2VPNTermination
+from ipam.utils import defer_hierarchy_updates, get_allocation_lock_ids, rebuild_prefixes
 
 
 class TestAggregate(TestCase):
@@ -158,7 +161,10 @@ class TestPrefix(TestCase):
         ])
         available_ips = parent_prefix.get_available_ips()
 
-        self.assertEqual(available_ips, missing_ips)
+        self.assertEqual(IPSet(available_ips.iter_ranges()), missing_ips)
+        self.assertEqual(available_ips.size, 6)
+        self.assertEqual(str(available_ips.get_first()), '10.0.0.2')
+        self.assertEqual([str(ip) for ip in islice(available_ips, 2)], ['10.0.0.2', '10.0.0.4'])
 
     def test_get_first_available_prefix(self):
 
@@ -223,6 +229,28 @@ class TestPrefix(TestCase):
         IPRange.objects.create(start_address=IPNetwork('10.0.0.33/24'), end_address=IPNetwork('10.0.0.64/24'))
         self.assertEqual(prefix.get_utilization(), 64 / 254 * 100)  # ~25% utilization
 
+    def test_get_allocation_lock_ids(self):
+        prefixes = (
+            Prefix.objects.create(prefix=IPNetwork('10.0.0.0/16')),
+            Prefix.objects.create(prefix=IPNetwork('10.0.0.0/24')),
+            Prefix.objects.create(prefix=IPNetwork('10.0.1.0/24')),
+        )
+        iprange = IPRange.objects.create(start_address=IPNetwork('10.0.0.1/24'), end_address=IPNetwork('10.0.0.9/24'))
+
+        with override_settings(ALLOCATION_LOCK_SCOPE='global'):
+            self.assertEqual(get_allocation_lock_ids(100, prefixes[1]), [100])
+
+        # Sibling prefixes share only the lock of their common parent
+        with override_settings(ALLOCATION_LOCK_SCOPE='parent'):
+            self.assertEqual(get_allocation_lock_ids(100, prefixes[0]), [(100, prefixes[0].pk)])
+            self.assertEqual(
+                get_allocation_lock_ids(100, prefixes[1]), [(100, prefixes[0].pk), (100, prefixes[1].pk)]
+            )
+            self.assertEqual(
+                get_allocation_lock_ids(100, prefixes[2]), [(100, prefixes[0].pk), (100, prefixes[2].pk)]
+            )
+            self.assertEqual(get_allocation_lock_ids(100, iprange), [(100, iprange.pk)])
+
     #
     # Uniqueness enforcement tests
     #
@@ -413,6 +441,46 @@ class TestPrefixHierarchy(TestCase):
         self.assertEqual(prefixes[1]._depth, 1)
         self.assertEqual(prefixes[1]._children, 0)
 
+    def test_deferred_hierarchy_updates(self):
+        # Create 10.0.0.0/12 and 10.0.0.0/20 in a single deferred batch
+        with defer_hierarchy_updates():
+            Prefix(prefix='10.0.0.0/12').save()
+            Prefix(prefix='10.0.0.0/20').save()
+
+        prefixes = Prefix.objects.filter(prefix__family=4)
+        self.assertEqual(prefixes[0].prefix, IPNetwork('10.0.0.0/8'))
+        self.assertEqual(prefixes[0]._depth, 0)
+        self.assertEqual(prefixes[0]._children, 4)
+        self.assertEqual(prefixes[1].prefix, IPNetwork('10.0.0.0/12'))
+        self.assertEqual(prefixes[1]._depth, 1)
+        self.assertEqual(prefixes[1]._children, 3)
+        self.assertEqual(prefixes[2].prefix, IPNetwork('10.0.0.0/16'))
+        self.assertEqual(prefixes[2]._depth, 2)
+        self.assertEqual(prefixes[2]._children, 2)
+        self.assertEqual(prefixes[3].prefix, IPNetwork('10.0.0.0/20'))
+        self.assertEqual(prefixes[3]._depth, 3)
+        self.assertEqual(prefixes[3]._children, 1)
+        self.assertEqual(prefixes[4].prefix, IPNetwork('10.0.0.0/24'))
+        self.assertEqual(prefixes[4]._depth, 4)
+        self.assertEqual(prefixes[4]._children, 0)
+
+    def test_rebuild_prefixes_diff(self):
+        # Corrupt the cached hierarchy of 10.0.0.0/16
+        Prefix.objects.filter(prefix='10.0.0.0/16').update(_depth=5, _children=5)
+
+        # A dry run should detect the change without saving it
+        self.assertEqual(rebuild_prefixes(None, batch_size=2, dry_run=True), 1)
+        prefix = Prefix.objects.get(prefix='10.0.0.0/16')
+        self.assertEqual(prefix._depth, 5)
+        self.assertEqual(prefix._children, 5)
+
+        # Only the changed prefix should be updated
+        self.assertEqual(rebuild_prefixes(None, batch_size=2, diff=True), 1)
+        prefix = Prefix.objects.get(prefix='10.0.0.0/16')
+        self.assertEqual(prefix._depth, 1)
+        self.assertEqual(prefix._children, 1)
+        self.assertEqual(rebuild_prefixes(None, batch_size=2, dry_run=True), 0)
+
     def test_duplicate_prefix4(self):
         # Duplicate 10.0.0.0/16
         Prefix(prefix='10.0.0.0/16').save()
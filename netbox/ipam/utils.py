@@ -1,7 +1,15 @@
+from contextlib import ExitStack, contextmanager
+
 import netaddr
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django_pglocks import advisory_lock
 
+from netbox import thread_locals
+from .available import interleave_gaps
 from .constants import *
-from .models import Prefix, VLAN
+from .models import IPRange, Prefix, VLAN
 
 
 def add_requested_prefixes(parent, prefix_list, show_available=True, show_assigned=True):
@@ -39,45 +47,22 @@ def add_available_ipaddresses(prefix, ipaddress_list, is_pool=False):
     Annotate ranges of available IP addresses within a given prefix. If is_pool is True, the first and last IP will be
     considered usable (regardless of mask length).
     """
-
-    output = []
-    prev_ip = None
-
     # Ignore the network and broadcast addresses for non-pool IPv4 prefixes larger than /31.
     if prefix.version == 4 and prefix.prefixlen < 31 and not is_pool:
-        first_ip_in_prefix = netaddr.IPAddress(prefix.first + 1)
-        last_ip_in_prefix = netaddr.IPAddress(prefix.last - 1)
+        first, last = prefix.first + 1, prefix.last - 1
     else:
-        first_ip_in_prefix = netaddr.IPAddress(prefix.first)
-        last_ip_in_prefix = netaddr.IPAddress(prefix.last)
-
-    if not ipaddress_list:
-        return [(
-            int(last_ip_in_prefix - first_ip_in_prefix + 1),
-            '{}/{}'.format(first_ip_in_prefix, prefix.prefixlen)
-        )]
-
-    # Account for any available IPs before the first real IP
-    if ipaddress_list[0].address.ip > first_ip_in_prefix:
-        skipped_count = int(ipaddress_list[0].address.ip - first_ip_in_prefix)
-        first_skipped = '{}/{}'.format(first_ip_in_prefix, prefix.prefixlen)
-        output.append((skipped_count, first_skipped))
-
-    # Iterate through existing IPs and annotate free ranges
-    for ip in ipaddress_list:
-        if prev_ip:
-            diff = int(ip.address.ip - prev_ip.address.ip)
-            if diff > 1:
-                first_skipped = '{}/{}'.format(prev_ip.address.ip + 1, prefix.prefixlen)
-                output.append((diff - 1, first_skipped))
-        output.append(ip)
-        prev_ip = ip
-
-    # Include any remaining available IPs
-    if prev_ip.address.ip < last_ip_in_prefix:
-        skipped_count = int(last_ip_in_prefix - prev_ip.address.ip)
-        first_skipped = '{}/{}'.format(prev_ip.address.ip + 1, prefix.prefixlen)
-        output.append((skipped_count, first_skipped))
+        first, last = prefix.first, prefix.last
+
+    def get_interval(ip):
+        return ip.address.ip.value, ip.address.ip.value
+
+    output = []
+    for gap, ip in interleave_gaps(first, last, ipaddress_list, get_interval):
+        if gap is None:
+            output.append(ip)
+        else:
+            first_skipped = '{}/{}'.format(netaddr.IPAddress(gap[0], prefix.version), prefix.prefixlen)
+            output.append((gap[1] - gap[0] + 1, first_skipped))
 
     return output
 
@@ -126,9 +111,16 @@ def add_available_vlans(vlans, vlan_group=None):
     return vlans
 
 
-def rebuild_prefixes(vrf):
+def rebuild_prefixes(vrf, batch_size=100, diff=False, dry_run=False):
     """
-    Rebuild the prefix hierarchy for all prefixes in the specified VRF (or global table).
+    Rebuild the prefix hierarchy for all prefixes in the specified VRF (or global table). Prefixes are streamed from
+    the database in order, and updates are written in batches of batch_size. Returns the number of prefixes whose
+    depth or child count has changed.
+
+    :param vrf: The PK of the VRF, or None for the global table
+    :param batch_size: The number of prefixes to retrieve and update per query
+    :param diff: Write only those prefixes whose depth or child count has changed
+    :param dry_run: Determine which prefixes have changed without writing anything (implies diff)
     """
     def contains(parent, child):
         return child in parent and child != parent
@@ -138,17 +130,32 @@ def rebuild_prefixes(vrf):
         for n in stack:
             n['children'] += 1
         stack.append({
-            'pk': [prefix['pk']],
+            'prefixes': [prefix],
             'prefix': prefix['prefix'],
             'children': 0,
         })
 
+    def pop_from_stack():
+        nonlocal changed_count
+        node = stack.pop()
+        depth = len(stack)
+        for p in node['prefixes']:
+            unchanged = p['_depth'] == depth and p['_children'] == node['children']
+            if not unchanged:
+                changed_count += 1
+            if not dry_run and not (diff and unchanged):
+                update_queue.append(
+                    Prefix(pk=p['pk'], _depth=depth, _children=node['children'])
+                )
+
+    diff = diff or dry_run
     stack = []
     update_queue = []
-    prefixes = Prefix.objects.filter(vrf=vrf).values('pk', 'prefix')
+    changed_count = 0
+    prefixes = Prefix.objects.filter(vrf=vrf).values('pk', 'prefix', '_depth', '_children')
 
-    # Iterate through all Prefixes in the VRF, growing and shrinking the stack as we go
-    for i, p in enumerate(prefixes):
+    # Stream all Prefixes in the VRF, growing and shrinking the stack as we go
+    for p in prefixes.iterator(chunk_size=batch_size):
 
         # Grow the stack if this is a child of the most recent prefix
         if not stack or contains(stack[-1]['prefix'], p['prefix']):
@@ -156,31 +163,141 @@ def rebuild_prefixes(vrf):
 
         # Handle duplicate prefixes
         elif stack[-1]['prefix'] == p['prefix']:
-            stack[-1]['pk'].append(p['pk'])
+            stack[-1]['prefixes'].append(p)
 
         # If this is a sibling or parent of the most recent prefix, pop nodes from the
         # stack until we reach a parent prefix (or the root)
         else:
             while stack and not contains(stack[-1]['prefix'], p['prefix']):
-                node = stack.pop()
-                for pk in node['pk']:
-                    update_queue.append(
-                        Prefix(pk=pk, _depth=len(stack), _children=node['children'])
-                    )
+                pop_from_stack()
             push_to_stack(p)
 
-        # Flush the update queue once it reaches 100 Prefixes
-        if len(update_queue) >= 100:
+        # Flush the update queue once it reaches the batch size
+        if len(update_queue) >= batch_size:
             Prefix.objects.bulk_update(update_queue, ['_depth', '_children'])
             update_queue = []
 
     # Clear out any prefixes remaining in the stack
     while stack:
-        node = stack.pop()
-        for pk in node['pk']:
-            update_queue.append(
-                Prefix(pk=pk, _depth=len(stack), _children=node['children'])
-            )
+        pop_from_stack()
 
     # Final flush of any remaining Prefixes
-    Prefix.objects.bulk_update(update_queue, ['_depth', '_children'])
+    Prefix.objects.bulk_update(update_queue, ['_depth', '_children'], batch_size=batch_size)
+
+    return changed_count
+
+
+#
+# Prefix hierarchy maintenance
+#
+
+def _apply_hierarchy_delta(vrf_id, prefix, delta, exclude_pk=None):
+    """
+    Adjust the cached hierarchy of all other Prefixes in a VRF to reflect the addition (delta=1) or removal (delta=-1)
+    of a single prefix: the child count of each containing prefix changes by one, as does the depth of each covered
+    prefix unless another instance of the same prefix remains (depth counts distinct parent prefixes).
+    """
+    prefixes = Prefix.objects.filter(vrf_id=vrf_id).exclude(pk=exclude_pk)
+
+    prefixes.filter(prefix__net_contains=prefix).update(
+        _children=Greatest(F('_children') + delta, 0)
+    )
+    if not prefixes.filter(prefix=prefix).exists():
+        prefixes.filter(prefix__net_contained=prefix).update(
+            _depth=Greatest(F('_depth') + delta, 0)
+        )
+
+
+def _update_prefix_hierarchy(instance):
+    """
+    Recalculate the depth and child count of a single Prefix.
+    """
+    instance._depth = instance.get_parents().values('prefix').distinct().count()
+    instance._children = instance.get_children().count()
+    Prefix.objects.filter(pk=instance.pk).update(_depth=instance._depth, _children=instance._children)
+
+
+def add_prefix_to_hierarchy(instance, old_vrf_id=None, old_prefix=None):
+    """
+    Update the prefix hierarchy for a new or modified Prefix. If the Prefix has been moved, its previous VRF and
+    prefix must be specified so that its former parents and children can be updated.
+    """
+    if old_prefix is not None:
+        _apply_hierarchy_delta(old_vrf_id, old_prefix, -1, exclude_pk=instance.pk)
+    _apply_hierarchy_delta(instance.vrf_id, instance.prefix, 1, exclude_pk=instance.pk)
+    _update_prefix_hierarchy(instance)
+
+
+def remove_prefix_from_hierarchy(instance):
+    """
+    Update the prefix hierarchy for a deleted Prefix.
+    """
+    _apply_hierarchy_delta(instance.vrf_id, instance.prefix, -1, exclude_pk=instance.pk)
+
+
+@contextmanager
+def defer_hierarchy_updates():
+    """
+    Suspend incremental prefix hierarchy maintenance (e.g. while importing many prefixes at once). Upon exit, the
+    hierarchy of each VRF in which a prefix was created, modified or deleted is rebuilt in a single pass, writing only
+    those prefixes which have changed.
+    """
+    if hasattr(thread_locals, 'prefix_hierarchy_vrfs'):
+        # Already deferred by an outer context
+        yield
+        return
+
+    thread_locals.prefix_hierarchy_vrfs = set()
+    try:
+        yield
+        for vrf_id in thread_locals.prefix_hierarchy_vrfs:
+            rebuild_prefixes(vrf_id, diff=True)
+    finally:
+        del thread_locals.prefix_hierarchy_vrfs
+
+
+def defer_hierarchy_update(*vrf_ids):
+    """
+    If prefix hierarchy updates are currently deferred, record the VRF(s) to be rebuilt and return True.
+    """
+    deferred_vrfs = getattr(thread_locals, 'prefix_hierarchy_vrfs', None)
+    if deferred_vrfs is None:
+        return False
+    deferred_vrfs.update(vrf_ids)
+    return True
+
+
+#
+# Allocation locking
+#
+
+def get_allocation_lock_ids(lock_key, parent):
+    """
+    Return the advisory lock IDs to be held while allocating child objects from a parent Prefix or IPRange. If
+    ALLOCATION_LOCK_SCOPE is "global", this is simply the lock key for the type of allocation. Otherwise, the IDs pair
+    the lock key with the PK of the parent and (for a Prefix) each prefix containing it, so that allocations from
+    overlapping prefixes are serialized while those from unrelated prefixes are not. IPRanges cannot overlap one another,
+    and addresses within them are never allocated from a parent Prefix, so a range needs only a lock of its own.
+    """
+    if settings.ALLOCATION_LOCK_SCOPE == 'global':
+        return [lock_key]
+
+    if isinstance(parent, IPRange):
+        pks = [parent.pk]
+    else:
+        pks = parent.get_parents(include_self=True).values_list('pk', flat=True)
+
+    # Two-part advisory lock IDs are 32-bit integers; a PK which wraps around merely shares a lock with another object
+    return sorted((lock_key, pk & 0x7FFFFFFF) for pk in pks)
+
+
+@contextmanager
+def allocation_lock(lock_key, parent):
+    """
+    Hold the advisory lock(s) required to allocate child objects from a parent Prefix or IPRange. Locks are always
+    acquired in ascending order to avoid deadlocks between concurrent allocations.
+    """
+    with ExitStack() as stack:
+        for lock_id in get_allocation_lock_ids(lock_key, parent):
+            stack.enter_context(advisory_lock(lock_id))
+        yield
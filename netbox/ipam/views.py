@@ -18,7 +18,7 @@ from .constants import *
 from .models import *
 from .models import ASN
 from .tables.l2vpn import L2VPNTable, L2VPNTerminationTable
-from .utils import add_requested_prefixes, add_available_ipaddresses, add_available_vlans
+from .utils import add_requested_prefixes, add_available_ipaddresses, add_available_vlans, defer_hierarchy_updates
 
 
 #
@@ -552,6 +552,11 @@ class PrefixBulkImportView(generic.BulkImportView):
     model_form = forms.PrefixCSVForm
     table = tables.PrefixTable
 
+    def _create_objects(self, form, request):
+        # Rebuild the prefix hierarchy once all prefixes have been imported, rather than after each one
+        with defer_hierarchy_updates():
+            return super()._create_objects(form, request)
+
 
 class PrefixBulkEditView(generic.BulkEditView):
     queryset = Prefix.objects.prefetch_related('vrf__tenant')
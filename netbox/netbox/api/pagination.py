@@ -1,7 +1,10 @@
 from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from netbox.config import get_config
+from utilities.querysets import count_queryset
 
 
 class OptionalLimitOffsetPagination(LimitOffsetPagination):
@@ -9,12 +12,28 @@ class OptionalLimitOffsetPagination(LimitOffsetPagination):
     Override the stock paginator to allow setting limit=0 to disable pagination for a request. This returns all objects
     matching a query, but retains the same format as a paginated request. The limit can only be disabled if
     MAX_PAGE_SIZE has been set to 0 or None.
+
+    Keyset pagination may be requested by passing the cursor parameter (empty for the first page). Objects are then
+    ordered by primary key, and each page retrieves only those objects following the last object of the previous page
+    (rather than skipping a number of objects by offset). The total count may be omitted by passing count=false.
     """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
     def __init__(self):
         self.default_limit = get_config().PAGINATE_COUNT
+        self.cursor = None
+        self.next_cursor = None
+        self.use_cursor = False
+        self.has_next = None
 
     def paginate_queryset(self, queryset, request, view=None):
 
+        # Keyset pagination is available only for QuerySets
+        self.use_cursor = isinstance(queryset, QuerySet) and self.cursor_query_param in request.query_params
+        if self.use_cursor:
+            return self.paginate_queryset_by_cursor(queryset, request)
+
         if isinstance(queryset, QuerySet):
             self.count = self.get_queryset_count(queryset)
         else:
@@ -28,6 +47,15 @@ class OptionalLimitOffsetPagination(LimitOffsetPagination):
         if self.limit and self.count > self.limit and self.template is not None:
             self.display_page_controls = True
 
+        if isinstance(queryset, QuerySet):
+            if not self.limit:
+                return list(queryset[self.offset:])
+            # The count may be an estimate (see count_queryset()), so retrieve one additional object to determine
+            # whether another page follows
+            results = list(queryset[self.offset:self.offset + self.limit + 1])
+            self.has_next = len(results) > self.limit
+            return results[:self.limit]
+
         if self.count == 0 or self.offset > self.count:
             return list()
 
@@ -52,19 +80,76 @@ class OptionalLimitOffsetPagination(LimitOffsetPagination):
 
         return self.default_limit
 
+    def get_cursor(self, request):
+        cursor = request.query_params[self.cursor_query_param]
+        if not cursor:
+            return None
+        try:
+            return int(cursor)
+        except ValueError:
+            raise NotFound(f"Invalid cursor: {cursor}")
+
+    def get_count_enabled(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() != 'false'
+
     def get_queryset_count(self, queryset):
-        return queryset.count()
+        return count_queryset(queryset)
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        """
+        Return the page of objects following the cursor (the primary key of the last object on the previous page).
+        """
+        self.limit = self.get_limit(request)
+        self.offset = 0
+        self.cursor = self.get_cursor(request)
+        self.request = request
+
+        self.count = self.get_queryset_count(queryset) if self.get_count_enabled(request) else None
+
+        queryset = queryset.order_by('pk')
+        if self.cursor is not None:
+            queryset = queryset.filter(pk__gt=self.cursor)
+
+        if not self.limit:
+            self.next_cursor = None
+            return list(queryset)
+
+        # Retrieve one additional object to determine whether another page follows
+        results = list(queryset[:self.limit + 1])
+        self.next_cursor = None
+        if len(results) > self.limit:
+            # Results may be either model instances or dictionaries of values (see NetBoxModelViewSet)
+            last_result = results[self.limit - 1]
+            self.next_cursor = last_result['pk'] if isinstance(last_result, dict) else last_result.pk
+
+        return results[:self.limit]
 
     def get_next_link(self):
 
+        if self.use_cursor:
+            if self.next_cursor is None:
+                return None
+            url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+            return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
         # Pagination has been disabled
         if not self.limit:
             return None
 
+        if self.has_next is not None:
+            if not self.has_next:
+                return None
+            url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+            return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
         return super().get_next_link()
 
     def get_previous_link(self):
 
+        # Keyset pagination proceeds only forward
+        if self.use_cursor:
+            return None
+
         # Pagination has been disabled
         if not self.limit:
             return None
@@ -82,4 +167,4 @@ class StripCountAnnotationsPaginator(OptionalLimitOffsetPagination):
         cloned_queryset = queryset.all()
         cloned_queryset.query.annotations.clear()
 
-        return cloned_queryset.count()
+        return count_queryset(cloned_queryset)
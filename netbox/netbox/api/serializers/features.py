@@ -1,4 +1,3 @@
-from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 from rest_framework.fields import CreateOnlyDefault
 
@@ -25,11 +24,11 @@ class CustomFieldModelSerializer(serializers.Serializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        if self.instance is not None:
+        # Skip populating custom field values if they have been excluded from the requested fields
+        if self.instance is not None and 'custom_fields' in self.fields:
 
             # Retrieve the set of CustomFields which apply to this type of object
-            content_type = ContentType.objects.get_for_model(self.Meta.model)
-            fields = CustomField.objects.filter(content_types=content_type)
+            fields = CustomField.objects.get_for_model(self.Meta.model)
 
             # Populate custom field values for each instance from database
             if type(self.instance) in (list, tuple):
@@ -3,15 +3,19 @@ import logging
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
-from django.db.models import ProtectedError
+from django.db.models import Prefetch, ProtectedError
 from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField, RelatedField
 from rest_framework.response import Response
+from rest_framework.serializers import SerializerMethodField
 from rest_framework.viewsets import ModelViewSet
 
-from extras.models import ExportTemplate
+from extras.api.customfields import CustomFieldsDataField
+from extras.models import CustomField, ExportTemplate
 from netbox.api.exceptions import SerializerNotFound
 from netbox.constants import NESTED_SERIALIZER_PREFIX
-from utilities.api import get_serializer_for_model
+from utilities.api import get_projected_serializer, get_serializer_for_model
 from utilities.exceptions import AbortRequest
 from .mixins import *
 
@@ -36,6 +40,7 @@ class NetBoxModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ObjectVali
     """
     brief = False
     brief_prefetch_fields = []
+    requested_fields = None
 
     def get_object_with_snapshot(self):
         """
@@ -70,7 +75,22 @@ class NetBoxModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ObjectVali
 
         # Fall back to the hard-coded serializer class
         logger.debug(f"Using serializer {self.serializer_class}")
-        return self.serializer_class
+        return self.get_projected_serializer_class(self.serializer_class)
+
+    def get_projected_serializer_class(self, serializer_class):
+        """
+        If specific fields have been requested, return a serializer derived from the given serializer class which
+        includes only those fields.
+        """
+        if not self.requested_fields:
+            return serializer_class
+
+        logger = logging.getLogger('netbox.api.views.ModelViewSet')
+        logger.debug(f"Request is for fields {', '.join(sorted(self.requested_fields))}")
+        try:
+            return get_projected_serializer(serializer_class, self.requested_fields)
+        except ValueError as e:
+            raise ValidationError({'fields': str(e)})
 
     def get_serializer_context(self):
         """
@@ -79,9 +99,8 @@ class NetBoxModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ObjectVali
         context = super().get_serializer_context()
 
         if hasattr(self.queryset.model, 'custom_fields'):
-            content_type = ContentType.objects.get_for_model(self.queryset.model)
             context.update({
-                'custom_fields': content_type.custom_fields.all(),
+                'custom_fields': CustomField.objects.get_for_model(self.queryset.model),
             })
 
         return context
@@ -91,12 +110,60 @@ class NetBoxModelViewSet(BulkUpdateModelMixin, BulkDestroyModelMixin, ObjectVali
         if self.brief:
             return super().get_queryset().prefetch_related(None).prefetch_related(*self.brief_prefetch_fields)
 
+        # If specific fields have been requested, retrieve only the data needed to represent them
+        if self.requested_fields:
+            return self.get_projected_queryset(super().get_queryset())
+
         return super().get_queryset()
 
+    def get_projected_queryset(self, queryset):
+        """
+        Limit the related objects and annotations retrieved by the queryset to those needed to represent the requested
+        fields. When listing objects, only the values of the requested fields are retrieved if none of the fields
+        requires a model instance.
+        """
+        serializer_fields = list(self.get_serializer_class()().fields.values())
+
+        # Any related object may be needed for a field representing the object as a whole (e.g. its display string)
+        if any(field.source == '*' and isinstance(field, SerializerMethodField) for field in serializer_fields):
+            return queryset
+        sources = {field.source_attrs[0] for field in serializer_fields if field.source != '*'}
+
+        prefetch_lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in sources
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*prefetch_lookups)
+        query = queryset.query
+        if isinstance(query.select_related, dict):
+            query.select_related = {
+                name: value for name, value in query.select_related.items() if name in sources
+            } or False
+        # Excluded annotations remain available for filtering and ordering
+        query.set_annotation_mask([name for name in query.annotations if name in sources])
+
+        value_fields = {
+            field.name for field in queryset.model._meta.concrete_fields if not field.is_relation
+        }.union(query.annotations)
+        if self.action == 'list' and all(
+            field.source in value_fields and not isinstance(
+                field, (CustomFieldsDataField, ManyRelatedField, RelatedField, SerializerMethodField)
+            ) for field in serializer_fields
+        ):
+            return queryset.values('pk', *sources)
+
+        return queryset
+
     def initialize_request(self, request, *args, **kwargs):
-        # Check if brief=True has been passed
-        if request.method == 'GET' and request.GET.get('brief'):
-            self.brief = True
+        if request.method == 'GET':
+            # Check if brief=True has been passed
+            if request.GET.get('brief'):
+                self.brief = True
+            # Check if specific fields have been requested (e.g. fields=id,name)
+            elif request.GET.get('fields') and 'export' not in request.GET:
+                self.requested_fields = frozenset(
+                    name.strip() for name in request.GET['fields'].split(',') if name.strip()
+                )
 
         return super().initialize_request(request, *args, **kwargs)
 
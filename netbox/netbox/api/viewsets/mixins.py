@@ -1,9 +1,20 @@
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
+import copy
+import logging
+
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import ProtectedError, RestrictedError
+from django.db.models.deletion import Collector
+from django.db.models.signals import post_save, pre_save
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer, ModelSerializer, raise_errors_on_nested_writes
+from rest_framework.utils import model_meta
 
-from netbox.api.serializers import BulkOperationSerializer
+from dcim.models.device_components import CabledObjectModel
+from extras.models import ConfigContextModel
+from netbox.api.serializers import BulkOperationSerializer, TaggableModelSerializer
+from netbox.models.features import CustomFieldsMixin, CustomValidationMixin
 
 __all__ = (
     'BulkUpdateModelMixin',
@@ -11,6 +22,69 @@ __all__ = (
     'ObjectValidationMixin',
 )
 
+# Number of objects written by each UPDATE query when bulk updating objects
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Classes whose clean() methods validate an object independently of any other objects
+PER_OBJECT_VALIDATION_CLASSES = (
+    CabledObjectModel, ConfigContextModel, CustomFieldsMixin, CustomValidationMixin, models.Model,
+)
+
+
+class BulkOperationFallback(Exception):
+    """
+    Raised to abandon a set-based bulk operation in favor of processing each object individually.
+    """
+    pass
+
+
+def overrides_method(cls, method, base_classes):
+    """
+    Return True if any class in the MRO of `cls` other than those listed in `base_classes` defines `method`.
+    """
+    return any(
+        method in vars(klass) for klass in cls.__mro__ if klass not in base_classes
+    )
+
+
+def supports_set_based_update(model, serializer_class):
+    """
+    Return True if objects of the given model can be updated in bulk using the given serializer without altering the
+    outcome, i.e. neither the model nor the serializer customizes the saving of an object, and the model's validation
+    does not depend on other objects (which might conflict with one another within the same update).
+    """
+    if model._meta.parents or overrides_method(model, 'save', (models.Model,)):
+        return False
+    if (
+        overrides_method(model, 'clean', PER_OBJECT_VALIDATION_CLASSES) or
+        overrides_method(model, 'validate_unique', (models.Model,))
+    ):
+        return False
+    return not (
+        overrides_method(serializer_class, 'update', (TaggableModelSerializer, ModelSerializer, BaseSerializer)) or
+        overrides_method(serializer_class, 'save', (BaseSerializer,))
+    )
+
+
+def supports_set_based_delete(model):
+    """
+    Return True if objects of the given model can be deleted in bulk without altering the outcome, i.e. the model does
+    not customize the deletion of an object.
+    """
+    return not model._meta.parents and not overrides_method(model, 'delete', (models.Model,))
+
+
+def get_field_values(instance, fields):
+    """
+    Return a dictionary mapping the attribute name of each of the given fields to its value on the instance.
+    """
+    values = {}
+    for field in fields:
+        value = getattr(instance, field.attname)
+        # Copy mutable values (e.g. custom field data) which may be modified in place
+        values[field.attname] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    return values
+
 
 class BulkUpdateModelMixin:
     """
@@ -30,6 +104,9 @@ class BulkUpdateModelMixin:
         }
     ]
     """
+    # Save all objects using set-based queries where possible (see perform_bulk_update())
+    set_based_bulk_update = True
+
     def bulk_update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         serializer = BulkOperationSerializer(data=request.data, many=True)
@@ -48,7 +125,19 @@ class BulkUpdateModelMixin:
         return Response(data, status=status.HTTP_200_OK)
 
     def perform_bulk_update(self, objects, update_data, partial):
+        """
+        Update the objects using set-based queries if possible, falling back to updating each object in turn if the
+        model or serializer does not support this, or if the set-based update cannot be completed.
+        """
         with transaction.atomic():
+            if self.set_based_bulk_update and supports_set_based_update(objects.model, self.get_serializer_class()):
+                try:
+                    with transaction.atomic():
+                        return self.perform_set_based_update(objects, update_data, partial)
+                except BulkOperationFallback:
+                    # Retrieve fresh copies of the objects, as these may have been modified during validation
+                    objects = objects.all()
+
             data_list = []
             for obj in objects:
                 data = update_data.get(obj.id)
@@ -61,6 +150,81 @@ class BulkUpdateModelMixin:
 
             return data_list
 
+    def perform_set_based_update(self, objects, update_data, partial):
+        """
+        Validate all objects before saving them using one bulk UPDATE query for each distinct set of changed fields.
+        pre_save and post_save signals are sent for each object (in turn recording its change and queueing any
+        webhooks), and object permissions are enforced on all objects using a single query.
+
+        Raises BulkOperationFallback if any object fails validation, if many-to-many assignments (including tags) are
+        being modified, or if the update violates a database constraint. As later objects may be valid only following
+        changes to earlier objects, the per-object update is then left to report any error.
+        """
+        model = objects.model
+        logger = logging.getLogger('netbox.api.views.ModelViewSet')
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        relations = model_meta.get_field_info(model).relations
+
+        # Validate each object and apply its validated data
+        instances = []
+        original_values = []
+        serializers = []
+        for obj in objects:
+            data = update_data.get(obj.id)
+            if hasattr(obj, 'snapshot'):
+                obj.snapshot()
+            original_values.append(get_field_values(obj, fields))
+            serializer = self.get_serializer(obj, data=data, partial=partial)
+            if not serializer.is_valid():
+                raise BulkOperationFallback()
+            validated_data = serializer.validated_data
+            raise_errors_on_nested_writes('update', serializer, validated_data)
+            for attr, value in validated_data.items():
+                if attr == 'tags' or (attr in relations and relations[attr].to_many):
+                    raise BulkOperationFallback()
+                setattr(obj, attr, value)
+            if isinstance(serializer, TaggableModelSerializer):
+                # Mimic TaggableModelSerializer.update() for change logging
+                obj._tags = []
+            instances.append(obj)
+            serializers.append(serializer)
+
+        if not instances:
+            return []
+        logger.info(f"Updating {len(instances)} {model._meta.verbose_name_plural}")
+
+        # Prepare each object for saving and group the objects by the set of fields changed
+        using = router.db_for_write(model)
+        changed_objects = {}
+        for obj, values in zip(instances, original_values):
+            pre_save.send(sender=model, instance=obj, raw=False, using=using, update_fields=None)
+            for field in fields:
+                setattr(obj, field.attname, field.pre_save(obj, False))
+            changed_fields = frozenset(
+                field.name for field in fields if getattr(obj, field.attname) != values[field.attname]
+            )
+            if changed_fields:
+                changed_objects.setdefault(changed_fields, []).append(obj)
+
+        try:
+            for changed_fields, objs in changed_objects.items():
+                model._base_manager.using(using).bulk_update(
+                    objs, sorted(changed_fields), batch_size=BULK_UPDATE_BATCH_SIZE
+                )
+        except IntegrityError:
+            raise BulkOperationFallback()
+
+        for obj in instances:
+            post_save.send(sender=model, instance=obj, created=False, update_fields=None, raw=False, using=using)
+
+        # Enforce object-level permissions
+        try:
+            self._validate_objects(instances)
+        except ObjectDoesNotExist:
+            raise PermissionDenied()
+
+        return [serializer.data for serializer in serializers]
+
     def bulk_partial_update(self, request, *args, **kwargs):
         kwargs['partial'] = True
         return self.bulk_update(request, *args, **kwargs)
@@ -77,6 +241,9 @@ class BulkDestroyModelMixin:
         {"id": 456}
     ]
     """
+    # Delete all objects using set-based queries where possible (see perform_bulk_destroy())
+    set_based_bulk_destroy = True
+
     def bulk_destroy(self, request, *args, **kwargs):
         serializer = BulkOperationSerializer(data=request.data, many=True)
         serializer.is_valid(raise_exception=True)
@@ -89,12 +256,47 @@ class BulkDestroyModelMixin:
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     def perform_bulk_destroy(self, objects):
+        """
+        Delete the objects (along with any dependent objects) all at once if possible, falling back to deleting each
+        object in turn if the model does not support this, or if any dependent objects are protected (so that these
+        are reported as they would be for the first affected object).
+        """
         with transaction.atomic():
+            if self.set_based_bulk_destroy and supports_set_based_delete(objects.model):
+                try:
+                    with transaction.atomic():
+                        return self.perform_set_based_destroy(objects)
+                except BulkOperationFallback:
+                    objects = objects.all()
+
             for obj in objects:
                 if hasattr(obj, 'snapshot'):
                     obj.snapshot()
                 self.perform_destroy(obj)
 
+    def perform_set_based_destroy(self, objects):
+        """
+        Delete the objects and collect their dependent objects together, as Model.delete() does for a single object.
+        pre_delete and post_delete signals are sent for each object deleted.
+        """
+        model = objects.model
+        logger = logging.getLogger('netbox.api.views.ModelViewSet')
+
+        instances = list(objects)
+        for obj in instances:
+            if hasattr(obj, 'snapshot'):
+                obj.snapshot()
+        if not instances:
+            return
+        logger.info(f"Deleting {len(instances)} {model._meta.verbose_name_plural}")
+
+        collector = Collector(using=router.db_for_write(model))
+        try:
+            collector.collect(instances)
+        except (ProtectedError, RestrictedError):
+            raise BulkOperationFallback()
+        collector.delete()
+
 
 class ObjectValidationMixin:
 
@@ -1,21 +1,33 @@
+import hashlib
 import logging
-from collections import defaultdict
+import threading
+from collections import OrderedDict, defaultdict
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend, RemoteUserBackend as _RemoteUserBackend
 from django.contrib.auth.models import Group, AnonymousUser
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Q
 
-from users.constants import CONSTRAINT_TOKEN_USER
 from users.models import ObjectPermission
 from utilities.permissions import (
-    permission_is_exempt, qs_filter_from_constraints, resolve_permission, resolve_permission_ct,
+    compile_constraints, get_object_permissions_version, permission_is_exempt, resolve_permission,
+    resolve_permission_ct,
 )
 
 UserModel = get_user_model()
 
+# Cached ObjectPermissions are discarded after this many seconds if not invalidated sooner
+OBJECT_PERMISSIONS_CACHE_TIMEOUT = 3600
+
+# The maximum number of users whose ObjectPermissions are retained in memory by each process
+OBJECT_PERMISSIONS_CACHE_SIZE = 256
+
+_object_permissions_lock = threading.Lock()
+_object_permissions_cache = OrderedDict()
+
 AUTH_BACKEND_ATTRS = {
     # backend name: title, MDI icon name
     'amazon': ('Amazon AWS', 'aws'),
@@ -71,10 +83,39 @@ class ObjectPermissionMixin:
     def get_permission_filter(self, user_obj):
         return Q(users=user_obj) | Q(groups__user=user_obj)
 
+    def get_object_permissions_cache_key(self, user_obj):
+        """
+        Return the key under which the user's ObjectPermissions are cached. This must identify everything on which
+        get_permission_filter() depends.
+        """
+        return f'object_permissions:{type(self).__name__}:{user_obj.pk}'
+
     def get_object_permissions(self, user_obj):
         """
-        Return all permissions granted to the user by an ObjectPermission.
+        Return all permissions granted to the user by an ObjectPermission. These are cached both in memory and in the
+        shared cache until any ObjectPermission or group membership is modified.
         """
+        cache_key = f'{self.get_object_permissions_cache_key(user_obj)}:{get_object_permissions_version()}'
+
+        with _object_permissions_lock:
+            perms = _object_permissions_cache.get(cache_key)
+            if perms is not None:
+                _object_permissions_cache.move_to_end(cache_key)
+                return perms
+
+        perms = cache.get(cache_key)
+        if perms is None:
+            perms = self._get_object_permissions(user_obj)
+            cache.set(cache_key, perms, OBJECT_PERMISSIONS_CACHE_TIMEOUT)
+
+        with _object_permissions_lock:
+            _object_permissions_cache[cache_key] = perms
+            while len(_object_permissions_cache) > OBJECT_PERMISSIONS_CACHE_SIZE:
+                _object_permissions_cache.popitem(last=False)
+
+        return perms
+
+    def _get_object_permissions(self, user_obj):
         # Retrieve all assigned and enabled ObjectPermissions
         object_permissions = ObjectPermission.objects.filter(
             self.get_permission_filter(user_obj),
@@ -89,7 +130,8 @@ class ObjectPermissionMixin:
                     perm_name = f"{object_type.app_label}.{action}_{object_type.model}"
                     perms[perm_name].extend(obj_perm.list_constraints())
 
-        return perms
+        # Return a plain dictionary, as the same instance may be shared by many requests
+        return dict(perms)
 
     def has_perm(self, user_obj, perm, obj=None):
         app_label, action, model_name = resolve_permission(perm)
@@ -117,21 +159,46 @@ class ObjectPermissionMixin:
         if obj is None:
             return True
 
-        # Sanity check: Ensure that the requested permission applies to the specified object
-        model = obj._meta.model
+        return obj.pk in self.has_perm_bulk(user_obj, perm, [obj])
+
+    def has_perm_bulk(self, user_obj, perm, objects):
+        """
+        Return the set of PKs of those objects (all of the same model) on which the user has been granted the specified
+        permission. Constraints are evaluated for all objects using a single query.
+        """
+        app_label, action, model_name = resolve_permission(perm)
+        objects = list(objects)
+        pks = {obj.pk for obj in objects}
+
+        # Superusers implicitly have all permissions
+        if user_obj.is_active and user_obj.is_superuser:
+            return pks
+
+        # Permission is exempt from enforcement (i.e. listed in EXEMPT_VIEW_PERMISSIONS)
+        if permission_is_exempt(perm):
+            return pks
+
+        # Handle inactive/anonymous users
+        if not user_obj.is_active or user_obj.is_anonymous:
+            return set()
+
+        # If no applicable ObjectPermissions have been created for this user/permission, deny permission
+        object_permissions = self.get_all_permissions(user_obj)
+        if perm not in object_permissions or not objects:
+            return set()
+
+        # Sanity check: Ensure that the requested permission applies to the specified objects
+        model = objects[0]._meta.model
         if model._meta.label_lower != '.'.join((app_label, model_name)):
             raise ValueError(f"Invalid permission {perm} for model {model}")
 
         # Compile a QuerySet filter that matches all instances of the specified model
-        tokens = {
-            CONSTRAINT_TOKEN_USER: user_obj,
-        }
-        qs_filter = qs_filter_from_constraints(object_permissions[perm], tokens)
+        qs_filter = compile_constraints(model, object_permissions[perm], user_obj).filter
 
-        # Permission to perform the requested action on the object depends on whether the specified object matches
-        # the specified constraints. Note that this check is made against the *database* record representing the object,
-        # not the instance itself.
-        return model.objects.filter(qs_filter, pk=obj.pk).exists()
+        # Permission to perform the requested action on each object depends on whether the object matches the
+        # specified constraints. Note that this check is made against the *database* records representing the objects,
+        # not the instances themselves.
+        return set(model.objects.filter(qs_filter, pk__in=pks).values_list('pk', flat=True))
 
 
 class ObjectPermissionBackend(ObjectPermissionMixin, ModelBackend):
@@ -304,6 +371,16 @@ try:
                     hasattr(user_obj.ldap_user, "group_names")):
                 permission_filter = permission_filter | Q(groups__name__in=user_obj.ldap_user.group_names)
             return permission_filter
+
+        def get_object_permissions_cache_key(self, user_obj):
+            cache_key = super().get_object_permissions_cache_key(user_obj)
+            if (self.settings.FIND_GROUP_PERMS and
+                    hasattr(user_obj, "ldap_user") and
+                    hasattr(user_obj.ldap_user, "group_names")):
+                # Permissions granted via LDAP group membership vary with the user's current LDAP groups
+                group_names = ','.join(sorted(user_obj.ldap_user.group_names))
+                cache_key = f'{cache_key}:{hashlib.sha256(group_names.encode()).hexdigest()}'
+            return cache_key
 except ModuleNotFoundError:
     pass
 
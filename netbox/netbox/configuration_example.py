@@ -72,6 +72,14 @@ ADMINS = [
     # ('John Doe', 'jdoe@example.com'),
 ]
 
+# The scope of the database locks held while allocating available prefixes and IP addresses via the REST API: either
+# 'global' (serialize all allocations of each type) or 'parent' (serialize only allocations from overlapping parents).
+ALLOCATION_LOCK_SCOPE = 'global'
+
+# Paginated lists estimated (by the database query planner) to contain at least this many objects report the estimate
+# rather than counting all objects exactly. Set to None to always count objects exactly.
+APPROXIMATE_COUNT_THRESHOLD = None
+
 # Enable any desired validators for local account passwords below. For a list of included validators, please see the
 # Django documentation at https://docs.djangoproject.com/en/stable/topics/auth/passwords/#password-validation.
 AUTH_PASSWORD_VALIDATORS = [
@@ -198,6 +206,18 @@ RELEASE_CHECK_URL = None
 # Maximum execution time for background tasks, in seconds.
 RQ_DEFAULT_TIMEOUT = 300
 
+# The maximum number of events for the same webhook to be delivered by a single background task. The default value of 1
+# processes each event in its own task.
+WEBHOOKS_BATCH_SIZE = 1
+
+# The maximum number of webhook requests sent concurrently by a single background task, and the maximum number of
+# concurrent (persistent) connections to any one receiving host.
+WEBHOOKS_CONCURRENCY = 8
+WEBHOOKS_MAX_CONNECTIONS_PER_HOST = 4
+
+# The number of times a failed webhook request (connection error or 429/5xx response) is retried, with backoff.
+WEBHOOKS_MAX_RETRIES = 3
+
 # The file path where custom scripts will be stored. A trailing slash is not needed. Note that the default value of
 # this setting is derived from the installed location.
 # SCRIPTS_ROOT = '/opt/netbox/netbox/scripts'
@@ -118,7 +118,8 @@ class ObjectChangeMiddleware:
     differently for each. Objects being saved are cached into thread-local storage for action *after* the response has
     completed. This ensures that serialization of the object is performed only after any related objects (e.g. tags)
     have been created. Conversely, deletions are acted upon immediately, so that the serialized representation of the
-    object is recorded before it (and any related objects) are actually deleted from the database.
+    object is recorded before it (and any related objects) are actually deleted from the database. ObjectChanges are
+    buffered for the duration of the request and saved in bulk once it has completed.
     """
 
     def __init__(self, get_response):
@@ -77,6 +77,8 @@ DEPLOYMENT_ID = hashlib.sha256(SECRET_KEY.encode('utf-8')).hexdigest()[:16]
 
 # Set static config parameters
 ADMINS = getattr(configuration, 'ADMINS', [])
+ALLOCATION_LOCK_SCOPE = getattr(configuration, 'ALLOCATION_LOCK_SCOPE', 'global')
+APPROXIMATE_COUNT_THRESHOLD = getattr(configuration, 'APPROXIMATE_COUNT_THRESHOLD', None)
 AUTH_PASSWORD_VALIDATORS = getattr(configuration, 'AUTH_PASSWORD_VALIDATORS', [])
 BASE_PATH = getattr(configuration, 'BASE_PATH', '')
 if BASE_PATH:
@@ -136,6 +138,10 @@ STORAGE_BACKEND = getattr(configuration, 'STORAGE_BACKEND', None)
 STORAGE_CONFIG = getattr(configuration, 'STORAGE_CONFIG', {})
 TIME_FORMAT = getattr(configuration, 'TIME_FORMAT', 'g:i a')
 TIME_ZONE = getattr(configuration, 'TIME_ZONE', 'UTC')
+WEBHOOKS_BATCH_SIZE = getattr(configuration, 'WEBHOOKS_BATCH_SIZE', 1)
+WEBHOOKS_CONCURRENCY = getattr(configuration, 'WEBHOOKS_CONCURRENCY', 8)
+WEBHOOKS_MAX_CONNECTIONS_PER_HOST = getattr(configuration, 'WEBHOOKS_MAX_CONNECTIONS_PER_HOST', 4)
+WEBHOOKS_MAX_RETRIES = getattr(configuration, 'WEBHOOKS_MAX_RETRIES', 3)
 
 # Check for hard-coded dynamic config parameters
 for param in PARAMS:
@@ -155,6 +161,12 @@ if RELEASE_CHECK_URL:
     except ValidationError as err:
         raise ImproperlyConfigured(str(err))
 
+# Validate the scope of locks held while allocating available prefixes and IP addresses
+if ALLOCATION_LOCK_SCOPE not in ('global', 'parent'):
+    raise ImproperlyConfigured(
+        f"ALLOCATION_LOCK_SCOPE must be either 'global' or 'parent' (found {ALLOCATION_LOCK_SCOPE})"
+    )
+
 
 #
 # Database
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Func
+from django_rq import job
+
+from circuits.models import Circuit, Provider
+from dcim.models import (
+    Cable, ConsolePort, Device, DeviceType, Interface, PowerPanel, PowerFeed, PowerPort, Rack, Site,
+)
+from ipam.models import Aggregate, IPAddress, IPRange, Prefix, VLAN, VRF
+from tenancy.models import Tenant
+from users.constants import CONSTRAINT_TOKEN_USER
+from utilities.permissions import get_permission_for_model, permission_is_exempt, qs_filter_from_constraints
+from virtualization.models import Cluster, VirtualMachine
+from wireless.models import WirelessLAN, WirelessLink
+
+__all__ = (
+    'count_querysets',
+    'get_home_stats',
+    'get_stats_key',
+    'refresh_home_stats',
+)
+
+logger = logging.getLogger('netbox.stats')
+
+# Statistics older than this many seconds are refreshed in the background (while still being served)
+STATS_REFRESH_INTERVAL = 60
+
+# Statistics are discarded after this many seconds if not refreshed sooner
+STATS_CACHE_TIMEOUT = 300
+
+# Sections of the home page: (label, icon, items), where each item is (label, model, filter parameters)
+HOME_STATS = (
+    ("Organization", "domain", (
+        ("Sites", Site, {}),
+        ("Tenants", Tenant, {}),
+    )),
+    ("IPAM", "counter", (
+        ("VRFs", VRF, {}),
+        ("Aggregates", Aggregate, {}),
+        ("Prefixes", Prefix, {}),
+        ("IP Ranges", IPRange, {}),
+        ("IP Addresses", IPAddress, {}),
+        ("VLANs", VLAN, {}),
+    )),
+    ("Virtualization", "monitor", (
+        ("Clusters", Cluster, {}),
+        ("Virtual Machines", VirtualMachine, {}),
+    )),
+    ("Inventory", "server", (
+        ("Racks", Rack, {}),
+        ("Device Types", DeviceType, {}),
+        ("Devices", Device, {}),
+    )),
+    ("Circuits", "transit-connection-variant", (
+        ("Providers", Provider, {}),
+        ("Circuits", Circuit, {}),
+    )),
+    ("Connections", "cable-data", (
+        ("Cables", Cable, {}),
+        ("Console", ConsolePort, {'_path__is_complete': True}),
+        ("Interfaces", Interface, {'_path__is_complete': True}),
+        ("Power Connections", PowerPort, {'_path__is_complete': True}),
+    )),
+    ("Power", "flash", (
+        ("Power Panels", PowerPanel, {}),
+        ("Power Feeds", PowerFeed, {}),
+    )),
+    ("Wireless", "wifi", (
+        ("Wireless LANs", WirelessLAN, {}),
+        ("Wireless Links", WirelessLink, {}),
+    )),
+)
+
+
+def count_querysets(querysets):
+    """
+    Return the number of objects matched by each of the given QuerySets, counted using a single query.
+    """
+    subqueries = []
+    params = []
+    for queryset in querysets:
+        if queryset.query.is_empty():
+            subqueries.append('0')
+            continue
+        # COUNT() is applied as a plain function (rather than an aggregate) so that the subquery is not grouped
+        sql, queryset_params = queryset.order_by().annotate(
+            _count=Func(F('pk'), function='COUNT')
+        ).values('_count').query.sql_with_params()
+        subqueries.append(f'({sql})')
+        params.extend(queryset_params)
+    if not subqueries:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(subqueries)}", params)
+        return list(cursor.fetchone())
+
+
+def get_stats_key(user):
+    """
+    Return the cache key for the home page statistics visible to the given user. Users whose permissions (including
+    any constraints) for all models are identical share the same statistics.
+    """
+    grants = []
+    for _, _, items in HOME_STATS:
+        for _, model, _ in items:
+            perm = get_permission_for_model(model, 'view')
+            if not user.has_perm(perm):
+                grants.append(None)
+            elif user.is_superuser or permission_is_exempt(perm):
+                grants.append(True)
+            else:
+                # Users with identical constraints see the same objects, unless the constraints refer to the user
+                constraints = user._object_perm_cache[perm]
+                if not qs_filter_from_constraints(constraints):
+                    grants.append(True)
+                elif CONSTRAINT_TOKEN_USER in json.dumps(constraints, default=str):
+                    grants.append([constraints, user.pk])
+                else:
+                    grants.append(constraints)
+
+    digest = hashlib.sha256(json.dumps(grants, sort_keys=True, default=str).encode()).hexdigest()
+    return f'home_stats:{digest}'
+
+
+def compute_home_stats(user):
+    """
+    Compile the home page statistics visible to the given user, counting the objects in each section using a single
+    query.
+    """
+    stats = []
+    for section_label, icon_class, section_items in HOME_STATS:
+        items = []
+        querysets = []
+        for item_label, model, filter_params in section_items:
+            perm = get_permission_for_model(model, 'view')
+            app, scope = perm.split(".")
+            item = {
+                "label": item_label,
+                "count": None,
+                "url": ":".join((app, scope.replace("view_", "") + "_list")),
+                "disabled": True,
+                "icon": icon_class,
+            }
+            if user.has_perm(perm):
+                querysets.append(model.objects.restrict(user, 'view').filter(**filter_params))
+                item["disabled"] = False
+            items.append(item)
+
+        counts = iter(count_querysets(querysets))
+        for item in items:
+            if not item["disabled"]:
+                item["count"] = next(counts)
+        stats.append((section_label, items, icon_class))
+
+    return stats
+
+
+@job('default')
+def refresh_home_stats(user_id):
+    """
+    Recompile and cache the home page statistics visible to the specified user (and all users with equivalent
+    permissions).
+    """
+    user = get_user_model().objects.get(pk=user_id)
+    cache.set(get_stats_key(user), (time.time(), compute_home_stats(user)), STATS_CACHE_TIMEOUT)
+
+
+def get_home_stats(user):
+    """
+    Return the home page statistics visible to the given user. These are cached for up to STATS_CACHE_TIMEOUT seconds,
+    and refreshed in the background by an RQ worker once older than STATS_REFRESH_INTERVAL seconds.
+    """
+    key = get_stats_key(user)
+    cached = cache.get(key)
+
+    if cached is None:
+        stats = compute_home_stats(user)
+        cache.set(key, (time.time(), stats), STATS_CACHE_TIMEOUT)
+        return stats
+
+    timestamp, stats = cached
+    if time.time() - timestamp > STATS_REFRESH_INTERVAL and user.is_authenticated:
+        # Ensure that only a single refresh is queued at a time
+        if cache.add(f'{key}:refreshing', True, STATS_REFRESH_INTERVAL):
+            try:
+                refresh_home_stats.delay(user.pk)
+            except Exception as e:
+                logger.warning(f"Unable to queue refresh of home page statistics: {e}")
+                cache.delete(f'{key}:refreshing')
+
+    return stats
@@ -1,15 +1,21 @@
+import csv
+import io
+
 import django_tables2 as tables
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import FieldDoesNotExist
 from django.db.models.fields.related import RelatedField
+from django.utils.encoding import force_str
 from django_tables2.data import TableQuerysetData
+from django_tables2.rows import BoundRow
 
 from extras.models import CustomField, CustomLink
 from extras.choices import CustomFieldVisibilityChoices
 from netbox.tables import columns
 from utilities.paginator import EnhancedPaginator, get_paginate_count
+from utilities.querysets import STREAMING_CHUNK_SIZE, stream_queryset
 
 __all__ = (
     'BaseTable',
@@ -125,6 +131,50 @@ class BaseTable(tables.Table):
             self._objects_count = sum(1 for obj in self.data if hasattr(obj, 'pk'))
         return self._objects_count
 
+    def iter_values(self, exclude_columns=None, chunk_size=STREAMING_CHUNK_SIZE):
+        """
+        Return a row iterator equivalent to as_values(), except that a QuerySet is streamed from the database chunk_size
+        records at a time rather than being loaded (and cached) in its entirety.
+
+        :param exclude_columns: Names of columns to exclude from the output
+        :param chunk_size: The number of records to retrieve per query
+        """
+        exclude_columns = exclude_columns or ()
+        columns = [
+            column for column in self.columns.iterall()
+            if not (column.column.exclude_from_export or column.name in exclude_columns)
+        ]
+
+        yield [force_str(column.header, strings_only=True) for column in columns]
+
+        if isinstance(self.data, TableQuerysetData):
+            records = stream_queryset(self.data.data, chunk_size)
+        else:
+            records = self.data
+        for record in records:
+            row = BoundRow(record, table=self)
+            yield [
+                force_str(row.get_cell_value(column.name), strings_only=True) for column in columns
+            ]
+
+    def as_csv(self, exclude_columns=None, chunk_size=STREAMING_CHUNK_SIZE):
+        """
+        Render the table data (see iter_values()) in CSV format, yielding one chunk of rows at a time so that memory
+        consumption remains constant regardless of the number of rows.
+
+        :param exclude_columns: Names of columns to exclude from the output
+        :param chunk_size: The number of rows to render per chunk
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for i, row in enumerate(self.iter_values(exclude_columns, chunk_size), start=1):
+            writer.writerow(row)
+            if i % chunk_size == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
     def configure(self, request):
         """
         Configure the table for a specific request context. This performs pagination and records
@@ -179,9 +229,10 @@ class NetBoxTable(BaseTable):
 
         # Add custom field & custom link columns
         content_type = ContentType.objects.get_for_model(self._meta.model)
-        custom_fields = CustomField.objects.filter(
-            content_types=content_type
-        ).exclude(ui_visibility=CustomFieldVisibilityChoices.VISIBILITY_HIDDEN)
+        custom_fields = [
+            cf for cf in CustomField.objects.get_for_model(self._meta.model)
+            if cf.ui_visibility != CustomFieldVisibilityChoices.VISIBILITY_HIDDEN
+        ]
 
         extra_columns.extend([
             (f'cf_{cf.name}', columns.CustomFieldColumn(cf)) for cf in custom_fields
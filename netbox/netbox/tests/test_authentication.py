@@ -11,7 +11,9 @@ from rest_framework.test import APIClient
 
 from dcim.models import Site
 from ipam.models import Prefix
+from netbox.authentication import ObjectPermissionBackend
 from users.models import ObjectPermission, Token
+from utilities.permissions import has_perm_bulk
 from utilities.testing import TestCase
 from utilities.testing.api import APITestCase
 
@@ -524,3 +526,82 @@ class ObjectPermissionAPIViewTestCase(TestCase):
                       kwargs={'pk': self.prefixes[0].pk})
         response = self.client.delete(url, format='json', **self.header)
         self.assertEqual(response.status_code, 204)
+
+
+class ObjectPermissionCacheTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+
+        cls.sites = (
+            Site(name='Site 1', slug='site-1'),
+            Site(name='Site 2', slug='site-2'),
+        )
+        Site.objects.bulk_create(cls.sites)
+        Prefix.objects.bulk_create((
+            Prefix(prefix=IPNetwork('10.0.0.0/24'), site=cls.sites[0]),
+            Prefix(prefix=IPNetwork('10.0.1.0/24'), site=cls.sites[1]),
+        ))
+
+    def setUp(self):
+        self.user = User.objects.create(username='testuser')
+        self.group = Group.objects.create(name='Group 1')
+        self.obj_perm = ObjectPermission(
+            name='Test permission',
+            constraints={'site__name': 'Site 1'},
+            actions=['view']
+        )
+        self.obj_perm.save()
+        self.obj_perm.groups.add(self.group)
+        self.obj_perm.object_types.add(ContentType.objects.get_for_model(Prefix))
+
+    def test_object_permissions_cached(self):
+        backend = ObjectPermissionBackend()
+        self.assertEqual(backend.get_object_permissions(self.user), {})
+
+        # Adding the user to a group should invalidate their cached permissions
+        self.user.groups.add(self.group)
+        perms = backend.get_object_permissions(self.user)
+        self.assertEqual(perms, {'ipam.view_prefix': [{'site__name': 'Site 1'}]})
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_object_permissions(User.objects.get(pk=self.user.pk)), perms)
+
+        # Modifying the ObjectPermission should invalidate all cached permissions
+        self.obj_perm.actions = ['view', 'change']
+        self.obj_perm.save()
+        self.assertIn('ipam.change_prefix', backend.get_object_permissions(self.user))
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=[])
+    def test_restrict(self):
+        self.user.groups.add(self.group)
+
+        # Constraints which do not traverse many-to-many relationships should be applied directly
+        queryset = Prefix.objects.restrict(User.objects.get(pk=self.user.pk), 'view')
+        self.assertNotIn('IN (SELECT', str(queryset.query))
+        self.assertEqual(queryset.get().site, self.sites[0])
+
+        # Constraints which traverse many-to-many relationships should be applied using a subquery
+        self.obj_perm.constraints = {'site__name': 'Site 2', 'tags__isnull': True}
+        self.obj_perm.save()
+        queryset = Prefix.objects.restrict(User.objects.get(pk=self.user.pk), 'view')
+        self.assertIn('IN (SELECT', str(queryset.query))
+        self.assertEqual(queryset.get().site, self.sites[1])
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=[])
+    def test_has_perm_bulk(self):
+        self.user.groups.add(self.group)
+        user = User.objects.get(pk=self.user.pk)
+        prefixes = list(Prefix.objects.all())
+        permitted_pks = {prefix.pk for prefix in prefixes if prefix.site == self.sites[0]}
+
+        # Permissions for all objects should be evaluated using a single query
+        self.assertEqual(has_perm_bulk(user, 'ipam.view_prefix', prefixes), permitted_pks)
+        with self.assertNumQueries(1):
+            self.assertEqual(has_perm_bulk(user, 'ipam.view_prefix', prefixes), permitted_pks)
+        for prefix in prefixes:
+            self.assertEqual(user.has_perm('ipam.view_prefix', prefix), prefix.pk in permitted_pks)
+        self.assertEqual(has_perm_bulk(user, 'ipam.change_prefix', prefixes), set())
+
+        # Superusers are permitted all objects
+        user.is_superuser = True
+        self.assertEqual(has_perm_bulk(user, 'ipam.change_prefix', prefixes), {prefix.pk for prefix in prefixes})
@@ -1,5 +1,6 @@
 from django.template import Context, Template
 from django.test import TestCase
+from django_tables2.export import TableExport
 
 from dcim.models import Site
 from netbox.tables import NetBoxTable, columns
@@ -35,3 +36,28 @@ class TagColumnTest(TestCase):
             'table': table
         })
         template.render(context)
+
+
+class CSVExportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = create_tags('Alpha', 'Bravo', 'Charlie')
+
+        sites = [
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(1, 6)
+        ]
+        Site.objects.bulk_create(sites)
+        for site in sites:
+            site.tags.add(*tags)
+
+    def test_as_csv(self):
+        """
+        Streamed CSV output should match that of django-tables2's TableExport, regardless of chunk size.
+        """
+        exclude_columns = ('pk', 'actions')
+        table = TagColumnTable(Site.objects.order_by('name'))
+        expected = TableExport(TableExport.CSV, table, exclude_columns=exclude_columns).export()
+
+        self.assertEqual(''.join(table.as_csv(exclude_columns=exclude_columns)), expected)
+        self.assertEqual(''.join(table.as_csv(exclude_columns=exclude_columns, chunk_size=2)), expected)
@@ -1,8 +1,15 @@
 import urllib.parse
 
-from utilities.testing import TestCase
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import override_settings
 from django.urls import reverse
 
+from dcim.models import Site
+from netbox.stats import count_querysets, get_stats_key
+from users.models import ObjectPermission
+from utilities.testing import TestCase
+
 
 class HomeViewTestCase(TestCase):
 
@@ -22,3 +29,37 @@ class HomeViewTestCase(TestCase):
 
         response = self.client.get('{}?{}'.format(url, urllib.parse.urlencode(params)))
         self.assertHttpStatus(response, 200)
+
+
+class HomeStatsTestCase(TestCase):
+
+    def test_count_querysets(self):
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(1, 4)
+        ])
+
+        with self.assertNumQueries(1):
+            counts = count_querysets([
+                Site.objects.all(),
+                Site.objects.filter(name='Site 1'),
+                Site.objects.none(),
+                Site.objects.filter(pk__in=Site.objects.filter(slug__in=['site-1', 'site-2']).values('pk')),
+            ])
+        self.assertEqual(counts, [3, 1, 0, 2])
+
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=[])
+    def test_stats_key(self):
+        users = [
+            User.objects.create_user(username=f'User {i}') for i in range(1, 4)
+        ]
+        site_ct = ContentType.objects.get_for_model(Site)
+        for user, constraints in zip(users, ({'name': 'Site 1'}, {'name': 'Site 1'}, {'name': 'Site 2'})):
+            obj_perm = ObjectPermission.objects.create(name=user.username, actions=['view'], constraints=constraints)
+            obj_perm.users.add(user)
+            obj_perm.object_types.add(site_ct)
+
+        # Users with equivalent permissions should share statistics
+        keys = [get_stats_key(User.objects.get(pk=user.pk)) for user in users]
+        self.assertEqual(keys[0], keys[1])
+        self.assertNotEqual(keys[0], keys[2])
+        self.assertNotEqual(keys[0], get_stats_key(User.objects.get(pk=self.user.pk)))
@@ -9,9 +9,8 @@ from django.db import transaction, IntegrityError
 from django.db.models import ManyToManyField, ProtectedError
 from django.db.models.fields.reverse_related import ManyToManyRel
 from django.forms import Form, ModelMultipleChoiceField, MultipleHiddenInput
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django_tables2.export import TableExport
 from django.utils.safestring import mark_safe
 
 from extras.models import ExportTemplate
@@ -22,7 +21,8 @@ from utilities.forms import (
     BootstrapMixin, BulkRenameForm, ConfirmationForm, CSVDataField, CSVFileField, restrict_form_fields,
 )
 from utilities.htmx import is_htmx
-from utilities.permissions import get_permission_for_model
+from utilities.permissions import get_permission_for_model, has_perm_bulk
+from utilities.querysets import stream_queryset
 from utilities.views import GetReturnURLMixin
 from .base import BaseMultiObjectView
 from .mixins import ActionsMixin, TableMixin
@@ -63,15 +63,16 @@ class ObjectListView(BaseMultiObjectView, ActionsMixin, TableMixin):
 
     def export_yaml(self):
         """
-        Export the queryset of objects as concatenated YAML documents.
+        Export the queryset of objects as concatenated YAML documents, yielding each document as it is rendered. The
+        queryset is streamed from the database rather than being held in memory.
         """
-        yaml_data = [obj.to_yaml() for obj in self.queryset]
-
-        return '---\n'.join(yaml_data)
+        for i, obj in enumerate(stream_queryset(self.queryset)):
+            yield obj.to_yaml() if i == 0 else f'---\n{obj.to_yaml()}'
 
     def export_table(self, table, columns=None, filename=None):
         """
-        Export all table data in CSV format.
+        Export all table data in CSV format. The response is streamed, with rows rendered in chunks as they are read
+        from the database.
 
         Args:
             table: The Table instance to export
@@ -85,14 +86,14 @@ class ObjectListView(BaseMultiObjectView, ActionsMixin, TableMixin):
             exclude_columns.update({
                 col for col in all_columns if col not in columns
             })
-        exporter = TableExport(
-            export_format=TableExport.CSV,
-            table=table,
-            exclude_columns=exclude_columns
-        )
-        return exporter.response(
-            filename=filename or f'netbox_{self.queryset.model._meta.verbose_name_plural}.csv'
+        filename = filename or f'netbox_{self.queryset.model._meta.verbose_name_plural}.csv'
+        response = StreamingHttpResponse(
+            table.as_csv(exclude_columns=exclude_columns),
+            content_type='text/csv; charset=utf-8'
         )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        return response
 
     def export_template(self, template, request):
         """
@@ -147,7 +148,7 @@ class ObjectListView(BaseMultiObjectView, ActionsMixin, TableMixin):
 
             # Check for YAML export support on the model
             elif hasattr(model, 'to_yaml'):
-                response = HttpResponse(self.export_yaml(), content_type='text/yaml')
+                response = StreamingHttpResponse(self.export_yaml(), content_type='text/yaml')
                 filename = 'netbox_{}.yaml'.format(self.queryset.model._meta.verbose_name_plural)
                 response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
                 return response
@@ -254,7 +255,7 @@ class BulkCreateView(GetReturnURLMixin, BaseMultiObjectView):
                     new_objs = self._create_objects(form, request)
 
                     # Enforce object-level permissions
-                    if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                    if len(has_perm_bulk(request.user, self.get_required_permission(), new_objs)) != len(new_objs):
                         raise PermissionsViolation
 
                 # If we make it to this point, validation has succeeded on all new objects.
@@ -378,7 +379,7 @@ class BulkImportView(GetReturnURLMixin, BaseMultiObjectView):
                     new_objs = self._create_objects(form, request)
 
                     # Enforce object-level permissions
-                    if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                    if len(has_perm_bulk(request.user, self.get_required_permission(), new_objs)) != len(new_objs):
                         raise PermissionsViolation
 
                 # Compile a table containing the imported objects
@@ -531,8 +532,8 @@ class BulkEditView(GetReturnURLMixin, BaseMultiObjectView):
                         updated_objects = self._update_objects(form, request)
 
                         # Enforce object-level permissions
-                        object_count = self.queryset.filter(pk__in=[obj.pk for obj in updated_objects]).count()
-                        if object_count != len(updated_objects):
+                        permitted_pks = has_perm_bulk(request.user, self.get_required_permission(), updated_objects)
+                        if len(permitted_pks) != len(updated_objects):
                             raise PermissionsViolation
 
                     if updated_objects:
@@ -635,7 +636,10 @@ class BulkRenameView(GetReturnURLMixin, BaseMultiObjectView):
                                 obj.save()
 
                             # Enforce constrained permissions
-                            if self.queryset.filter(pk__in=renamed_pks).count() != len(selected_objects):
+                            permitted_pks = has_perm_bulk(
+                                request.user, self.get_required_permission(), selected_objects
+                            )
+                            if len(permitted_pks) != len(renamed_pks):
                                 raise PermissionsViolation
 
                             model_name = self.queryset.model._meta.verbose_name_plural
@@ -832,7 +836,8 @@ class BulkComponentCreateView(GetReturnURLMixin, BaseMultiObjectView):
                                             form.add_error(field, '{} {}: {}'.format(obj, name, ', '.join(e)))
 
                         # Enforce object-level permissions
-                        if self.queryset.filter(pk__in=[obj.pk for obj in new_components]).count() != len(new_components):
+                        permission = get_permission_for_model(self.queryset.model, 'add')
+                        if len(has_perm_bulk(request.user, permission, new_components)) != len(new_components):
                             raise PermissionsViolation
 
                 except IntegrityError:
@@ -16,7 +16,7 @@ from utilities.error_handlers import handle_protectederror
 from utilities.exceptions import AbortRequest, AbortTransaction, PermissionsViolation
 from utilities.forms import ConfirmationForm, ImportForm, restrict_form_fields
 from utilities.htmx import is_htmx
-from utilities.permissions import get_permission_for_model
+from utilities.permissions import get_permission_for_model, has_perm_bulk
 from utilities.utils import get_viewname, normalize_querydict, prepare_cloned_fields
 from utilities.views import GetReturnURLMixin
 from .base import BaseObjectView
@@ -606,7 +606,7 @@ class ComponentCreateView(GetReturnURLMixin, BaseObjectView):
                             new_objs.append(obj)
 
                         # Enforce object-level permissions
-                        if self.queryset.filter(pk__in=[obj.pk for obj in new_objs]).count() != len(new_objs):
+                        if len(has_perm_bulk(request.user, self.get_required_permission(), new_objs)) != len(new_objs):
                             raise PermissionsViolation
 
                         messages.success(request, "Added {} {}".format(
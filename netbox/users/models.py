@@ -5,14 +5,15 @@ from django.contrib.auth.models import Group, User
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MinLengthValidator
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from netaddr import IPNetwork
 
 from ipam.fields import IPNetworkField
 from netbox.config import get_config
+from utilities.permissions import clear_object_permissions_cache
 from utilities.querysets import RestrictedQuerySet
 from utilities.utils import flatten_dict
 from .constants import *
@@ -327,3 +328,21 @@ class ObjectPermission(models.Model):
         if type(self.constraints) is not list:
             return [self.constraints]
         return self.constraints
+
+
+@receiver(post_save, sender=ObjectPermission)
+@receiver(post_delete, sender=ObjectPermission)
+@receiver(m2m_changed, sender=ObjectPermission.object_types.through)
+@receiver(m2m_changed, sender=ObjectPermission.groups.through)
+@receiver(m2m_changed, sender=ObjectPermission.users.through)
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(post_delete, sender=Group)
+def handle_object_permissions_changed(action=None, **kwargs):
+    """
+    Invalidate the cached ObjectPermissions of all users when an ObjectPermission or its assignments are modified, or
+    when group membership changes. The cache is invalidated both immediately and once the change has been committed, as
+    other processes may repopulate it with the prior permissions in the meantime.
+    """
+    if action in (None, 'post_add', 'post_remove', 'post_clear'):
+        clear_object_permissions_cache()
+        transaction.on_commit(clear_object_permissions_cache)
@@ -1,3 +1,4 @@
+import functools
 import platform
 import sys
 
@@ -28,6 +29,27 @@ def get_serializer_for_model(model, prefix=''):
         )
 
 
+@functools.lru_cache(maxsize=256)
+def get_projected_serializer(serializer_class, fields):
+    """
+    Return a subclass of the given serializer which includes only the specified fields (a frozenset of field names).
+    Raises ValueError if any of the fields are not provided by the serializer.
+    """
+    unknown_fields = fields.difference(serializer_class().fields)
+    if unknown_fields:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown_fields))}")
+
+    class ProjectedSerializer(serializer_class):
+
+        def get_fields(self):
+            return {
+                name: field for name, field in super().get_fields().items() if name in fields
+            }
+
+    ProjectedSerializer.__name__ = ProjectedSerializer.__qualname__ = serializer_class.__name__
+    return ProjectedSerializer
+
+
 def get_graphql_type_for_model(model):
     """
     Return the GraphQL type class for the given model.
@@ -0,0 +1,81 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from dcim.api.views import SiteViewSet
+from dcim.models import Site
+from extras.context_managers import change_logging
+
+BENCHMARK_SITE_PREFIX = 'Bulk operation benchmark'
+
+
+class Command(BaseCommand):
+    help = "Compare the duration of bulk updates and deletions via the REST API using per-object and set-based queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user", required=True,
+            help="Username of the (superuser) account on whose behalf objects are modified"
+        )
+        parser.add_argument(
+            "--objects", type=int, default=1000,
+            help="Number of sites modified by each request (default: 1000)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} not found")
+        count = max(options['objects'], 1)
+
+        self.stdout.write(f"{'Operation':>10} {'Mode':>10} {'Objects':>8} {'Seconds':>8} {'Objects/sec':>12}")
+        try:
+            for set_based in (False, True):
+                mode = 'set-based' if set_based else 'per-object'
+                sites = Site.objects.bulk_create([
+                    Site(name=f'{BENCHMARK_SITE_PREFIX} {i}', slug=f'bulk-operation-benchmark-{i}')
+                    for i in range(count)
+                ])
+
+                data = [{'id': site.pk, 'description': f'Updated {mode}'} for site in sites]
+                elapsed = self.run('patch', data, set_based)
+                self.stdout.write(f"{'update':>10} {mode:>10} {count:>8} {elapsed:>8.2f} {count / elapsed:>12.1f}")
+
+                data = [{'id': site.pk} for site in sites]
+                elapsed = self.run('delete', data, set_based)
+                self.stdout.write(f"{'delete':>10} {mode:>10} {count:>8} {elapsed:>8.2f} {count / elapsed:>12.1f}")
+        finally:
+            Site.objects.filter(name__startswith=BENCHMARK_SITE_PREFIX).delete()
+
+        self.stdout.write(self.style.SUCCESS('Finished.'))
+
+    def run(self, method, data, set_based):
+        """
+        Send a single bulk request to the sites list endpoint (with change logging enabled, as for any API request)
+        and return its duration in seconds.
+        """
+        view = SiteViewSet.as_view({'patch': 'bulk_partial_update', 'delete': 'bulk_destroy'})
+        request = getattr(APIRequestFactory(), method)('/api/dcim/sites/', data, format='json')
+        request.id = uuid.uuid4()
+        request.user = self.user
+        force_authenticate(request, user=self.user)
+
+        SiteViewSet.set_based_bulk_update = set_based
+        SiteViewSet.set_based_bulk_destroy = set_based
+        try:
+            start_time = time.monotonic()
+            with change_logging(request):
+                response = view(request)
+            elapsed = time.monotonic() - start_time
+        finally:
+            del SiteViewSet.set_based_bulk_update
+            del SiteViewSet.set_based_bulk_destroy
+
+        if response.status_code >= 400:
+            raise CommandError(f"Bulk {method} failed ({response.status_code}): {response.data}")
+
+        return elapsed
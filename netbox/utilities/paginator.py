@@ -1,6 +1,9 @@
-from django.core.paginator import Paginator, Page
+from django.core.paginator import EmptyPage, Paginator, Page
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
 
 from netbox.config import get_config
+from utilities.querysets import approximate_count
 
 
 class EnhancedPaginator(Paginator):
@@ -26,6 +29,52 @@ class EnhancedPaginator(Paginator):
 
         super().__init__(object_list, per_page, orphans=orphans, **kwargs)
 
+        # Set when the count is an estimate (see page())
+        self.count_is_approximate = False
+        self._num_pages = None
+
+    @cached_property
+    def count(self):
+        # Tables pass their rows, which wrap the underlying QuerySet (if any)
+        queryset = getattr(getattr(self.object_list, 'data', None), 'data', self.object_list)
+        if isinstance(queryset, QuerySet):
+            count, self.count_is_approximate = approximate_count(queryset)
+            return count
+        return super().count
+
+    @property
+    def num_pages(self):
+        if self._num_pages is not None:
+            return self._num_pages
+        return super().num_pages
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # Further pages may exist beyond those indicated by an estimated count
+            if self.count_is_approximate and int(number) > 1:
+                return int(number)
+            raise
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_approximate:
+            return super().page(number)
+
+        # As an estimated count may be too low (or too high), retrieve one additional object to determine whether
+        # another page follows, and adjust the number of pages accordingly
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        if len(object_list) > self.per_page:
+            self._num_pages = max(super().num_pages, number + 1)
+        else:
+            self._num_pages = number
+
+        return self._get_page(object_list[:self.per_page], number, self)
+
     def _get_page(self, *args, **kwargs):
         return EnhancedPage(*args, **kwargs)
 
@@ -37,6 +86,12 @@ class EnhancedPaginator(Paginator):
 
 class EnhancedPage(Page):
 
+    def end_index(self):
+        # An estimated count cannot be relied upon to indicate the last object on the final page
+        if self.paginator.count_is_approximate:
+            return self.start_index() + len(self.object_list) - 1
+        return super().end_index()
+
     def smart_pages(self):
 
         # When dealing with five or fewer pages, simply return the whole list.
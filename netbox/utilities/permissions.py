@@ -1,15 +1,43 @@
+import json
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+
 from django.conf import settings
+from django.contrib.auth import get_backends
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+
+from users.constants import CONSTRAINT_TOKEN_USER
 
 __all__ = (
+    'clear_object_permissions_cache',
+    'compile_constraints',
+    'CompiledConstraints',
+    'constraints_are_single_valued',
+    'get_object_permissions_version',
     'get_permission_for_model',
+    'has_perm_bulk',
     'permission_is_exempt',
     'qs_filter_from_constraints',
     'resolve_permission',
     'resolve_permission_ct',
 )
 
+# Cache key under which the current version of all users' cached ObjectPermissions is stored
+OBJECT_PERMISSIONS_VERSION_KEY = 'object_permissions_version'
+
+# The maximum number of compiled constraint filters to retain (see compile_constraints())
+COMPILED_CONSTRAINTS_CACHE_SIZE = 1024
+
+CompiledConstraints = namedtuple('CompiledConstraints', ('filter', 'single_valued'))
+
+_constraints_lock = threading.Lock()
+_constraints_cache = OrderedDict()
+
 
 def get_permission_for_model(model, action):
     """
@@ -59,6 +87,31 @@ def resolve_permission_ct(name):
     return content_type, action
 
 
+def has_perm_bulk(user, perm, objects):
+    """
+    Return the set of PKs of those objects (all of the same model) on which the user has been granted the specified
+    permission. This is equivalent to calling user.has_perm(perm, obj) for each object, but evaluates the constraints of
+    any ObjectPermissions for all objects at once.
+
+    :param user: User instance
+    :param perm: Permission name in the format <app_label>.<action>_<model>
+    :param objects: An iterable of model instances
+    """
+    objects = list(objects)
+    pks = {obj.pk for obj in objects}
+    if user.is_active and user.is_superuser:
+        return pks
+
+    permitted = set()
+    for backend in get_backends():
+        if hasattr(backend, 'has_perm_bulk'):
+            permitted |= backend.has_perm_bulk(user, perm, [obj for obj in objects if obj.pk not in permitted])
+            if permitted == pks:
+                break
+
+    return permitted
+
+
 def permission_is_exempt(name):
     """
     Determine whether a specified permission is exempt from evaluation.
@@ -104,3 +157,70 @@ def qs_filter_from_constraints(constraints, tokens=None):
             return Q()
 
     return params
+
+
+def constraints_are_single_valued(model, constraints):
+    """
+    Return True if none of the given ObjectPermission constraints traverses a many-to-many or reverse foreign key
+    relationship of the model. A filter compiled from such constraints matches each object at most once, and so may be
+    applied directly to a QuerySet without introducing duplicate rows.
+    """
+    for constraint in constraints:
+        for lookup in constraint or {}:
+            opts = model._meta
+            for name in lookup.split(LOOKUP_SEP):
+                try:
+                    field = opts.get_field(name)
+                except FieldDoesNotExist:
+                    # Not a field (e.g. a lookup or transform such as "in" or "lower")
+                    break
+                if field.many_to_many or field.one_to_many:
+                    return False
+                if not field.is_relation or field.related_model is None:
+                    break
+                opts = field.related_model._meta
+
+    return True
+
+
+def compile_constraints(model, constraints, user):
+    """
+    Return the CompiledConstraints (a Q filter, and whether it may be applied directly to a QuerySet) for a set of
+    ObjectPermission constraints evaluated on behalf of the given user. Up to COMPILED_CONSTRAINTS_CACHE_SIZE compiled
+    filters are retained, evicting the least recently used.
+    """
+    key = (model._meta.label_lower, user.pk, json.dumps(constraints, sort_keys=True, default=str))
+
+    with _constraints_lock:
+        compiled = _constraints_cache.get(key)
+        if compiled is not None:
+            _constraints_cache.move_to_end(key)
+            return compiled
+
+    tokens = {
+        CONSTRAINT_TOKEN_USER: user,
+    }
+    compiled = CompiledConstraints(
+        filter=qs_filter_from_constraints(constraints, tokens),
+        single_valued=constraints_are_single_valued(model, constraints)
+    )
+    with _constraints_lock:
+        _constraints_cache[key] = compiled
+        while len(_constraints_cache) > COMPILED_CONSTRAINTS_CACHE_SIZE:
+            _constraints_cache.popitem(last=False)
+
+    return compiled
+
+
+def clear_object_permissions_cache():
+    """
+    Invalidate the cached ObjectPermissions of all users (e.g. because an ObjectPermission has been modified).
+    """
+    cache.set(OBJECT_PERMISSIONS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_object_permissions_version():
+    """
+    Return the current version of all users' cached ObjectPermissions.
+    """
+    return cache.get(OBJECT_PERMISSIONS_VERSION_KEY)
@@ -1,7 +1,122 @@
-from django.db.models import QuerySet
+import hashlib
+import json
 
-from users.constants import CONSTRAINT_TOKEN_USER
-from utilities.permissions import permission_is_exempt, qs_filter_from_constraints
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import QuerySet, prefetch_related_objects
+
+from utilities.permissions import compile_constraints, permission_is_exempt
+
+
+# The default number of objects retrieved per query when streaming a QuerySet
+STREAMING_CHUNK_SIZE = 2000
+
+# Approximate counts are cached for this many seconds (see count_queryset())
+APPROXIMATE_COUNT_CACHE_TIMEOUT = 60
+
+
+def stream_queryset(queryset, chunk_size=STREAMING_CHUNK_SIZE):
+    """
+    Iterate over a QuerySet using a server-side cursor, retrieving chunk_size objects at a time without caching them.
+    Any prefetch_related() lookups are applied to each chunk, as QuerySet.iterator() would otherwise ignore them.
+    """
+    lookups = queryset._prefetch_related_lookups
+    if not lookups:
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    chunk = []
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *lookups)
+            yield from chunk
+            chunk = []
+    prefetch_related_objects(chunk, *lookups)
+    yield from chunk
+
+
+def estimate_count(queryset):
+    """
+    Return the number of objects matched by a QuerySet as estimated by the PostgreSQL query planner, without executing
+    the query.
+    """
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def approximate_count(queryset):
+    """
+    Return a tuple of the number of objects matched by a QuerySet and whether this is an estimate. If
+    APPROXIMATE_COUNT_THRESHOLD has been set and the query planner estimates that at least that many objects match,
+    the estimate is returned (and cached briefly) in place of an exact count. As the query incorporates any filters and
+    permission constraints, the cached estimate is specific to them.
+
+    An estimate may be lower than the actual number of objects, so it must not be relied upon to determine whether any
+    further objects exist (e.g. when paginating).
+    """
+    threshold = settings.APPROXIMATE_COUNT_THRESHOLD
+    if not threshold:
+        return queryset.count(), False
+
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0, False
+    digest = hashlib.sha256(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest()
+    cache_key = f'approximate_count:{queryset.model._meta.label_lower}:{digest}'
+
+    count = cache.get(cache_key)
+    if count is not None:
+        return count, True
+
+    count = estimate_count(queryset)
+    if count < threshold:
+        return queryset.count(), False
+    cache.set(cache_key, count, APPROXIMATE_COUNT_CACHE_TIMEOUT)
+
+    return count, True
+
+
+def count_queryset(queryset):
+    """
+    Return the number of objects matched by a QuerySet, which may be an estimate (see approximate_count()).
+    """
+    return approximate_count(queryset)[0]
+
+
+class StreamingQuerySet:
+    """
+    A wrapper around a QuerySet which is streamed (see stream_queryset()) each time it is iterated, for passing to
+    templates which may iterate over a very large number of objects. All other attributes are those of the underlying
+    QuerySet.
+    """
+    def __init__(self, queryset, chunk_size=STREAMING_CHUNK_SIZE):
+        self.queryset = queryset
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return stream_queryset(self.queryset, self.chunk_size)
+
+    def __len__(self):
+        return self.queryset.count()
+
+    def __bool__(self):
+        return self.queryset.exists()
+
+    def __getitem__(self, key):
+        return self.queryset[key]
+
+    def __getattr__(self, item):
+        return getattr(self.queryset, item)
 
 
 class RestrictedQuerySet(QuerySet):
@@ -29,13 +144,13 @@ class RestrictedQuerySet(QuerySet):
 
         # Filter the queryset to include only objects with allowed attributes
         else:
-            tokens = {
-                CONSTRAINT_TOKEN_USER: user,
-            }
-            attrs = qs_filter_from_constraints(user._object_perm_cache[permission_required], tokens)
-            # #8715: Avoid duplicates when JOIN on many-to-many fields without using DISTINCT.
-            # DISTINCT acts globally on the entire request, which may not be desirable.
-            allowed_objects = self.model.objects.filter(attrs)
-            qs = self.filter(pk__in=allowed_objects)
+            compiled = compile_constraints(self.model, user._object_perm_cache[permission_required], user)
+            if compiled.single_valued:
+                qs = self.filter(compiled.filter)
+            else:
+                # #8715: Avoid duplicates when JOIN on many-to-many fields without using DISTINCT.
+                # DISTINCT acts globally on the entire request, which may not be desirable.
+                allowed_objects = self.model.objects.filter(compiled.filter)
+                qs = self.filter(pk__in=allowed_objects)
 
         return qs
@@ -1,16 +1,24 @@
 import urllib.parse
+from unittest.mock import patch
 
 from django.contrib.contenttypes.models import ContentType
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 
-from dcim.models import Region, Site
-from extras.choices import CustomFieldTypeChoices
-from extras.models import CustomField
+from dcim.api.views import SiteViewSet
+from dcim.choices import SiteStatusChoices
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Rack, Region, Site
+from extras.choices import CustomFieldTypeChoices, ObjectChangeActionChoices
+from extras.models import CustomField, ObjectChange
 from ipam.models import VLAN
 from netbox.config import get_config
+from users.models import ObjectPermission
+from utilities.ordering import naturalize
+from utilities.paginator import EnhancedPaginator
+from utilities.querysets import count_queryset, estimate_count
 from utilities.testing import APITestCase, disable_warnings
+from virtualization.models import Cluster, ClusterType, VirtualMachine
 
 
 class WritableNestedSerializerTest(APITestCase):
@@ -175,6 +183,293 @@ class APIPaginationTestCase(APITestCase):
         self.assertIsNone(response.data['previous'])
         self.assertEqual(len(response.data['results']), 100)
 
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=1000000)
+    def test_approximate_count_below_threshold(self):
+        response = self.client.get(f'{self.url}?limit=10', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 100)
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=1)
+    def test_approximate_count(self):
+        queryset = Site.objects.filter(name__startswith='Site')
+        estimate = estimate_count(queryset)
+
+        # The query planner always estimates at least one row, so the estimate should be returned and cached
+        self.assertEqual(count_queryset(queryset), estimate)
+        with self.assertNumQueries(0):
+            self.assertEqual(count_queryset(queryset), estimate)
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=5)
+    @patch('utilities.querysets.estimate_count', return_value=10)
+    def test_approximate_count_too_low(self, estimate_count):
+        pks = list(Site.objects.order_by('pk').values_list('pk', flat=True))
+
+        # Walk all pages by following the next link
+        url = f'{self.url}?limit=30&name__isw=Site'
+        results = []
+        while url:
+            response = self.client.get(url, format='json', **self.header)
+            self.assertHttpStatus(response, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], 10)
+            results.extend(site['id'] for site in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(results), pks)
+
+        # The last page of the UI paginator must also be reachable
+        paginator = EnhancedPaginator(Site.objects.filter(name__istartswith='Site').order_by('pk'), 30)
+        page = paginator.page(4)
+        self.assertEqual([site.pk for site in page.object_list], pks[90:])
+        self.assertEqual(paginator.num_pages, 4)
+        self.assertFalse(page.has_next())
+        self.assertEqual(page.end_index(), 100)
+
+    def test_cursor(self):
+        pks = list(Site.objects.order_by('pk').values_list('pk', flat=True))
+
+        # Walk all pages by following the next link
+        url = f'{self.url}?limit=30&cursor='
+        results = []
+        while url:
+            response = self.client.get(url, format='json', **self.header)
+            self.assertHttpStatus(response, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], 100)
+            self.assertIsNone(response.data['previous'])
+            results.extend(site['id'] for site in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(results, pks)
+
+        response = self.client.get(f'{self.url}?limit=10&cursor={pks[9]}', format='json', **self.header)
+        self.assertEqual([site['id'] for site in response.data['results']], pks[10:20])
+        self.assertTrue(response.data['next'].endswith(f'?cursor={pks[19]}&limit=10'))
+
+    def test_cursor_without_count(self):
+        response = self.client.get(f'{self.url}?limit=10&cursor=&count=false', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'{self.url}?cursor=foo', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_404_NOT_FOUND)
+
+
+class APIFieldsTestCase(APITestCase):
+    user_permissions = ('dcim.view_site',)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('dcim-api:site-list')
+
+        region = Region.objects.create(name='Region 1', slug='region-1')
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}', region=region) for i in range(1, 6)
+        ])
+
+    def test_fields(self):
+        response = self.client.get(f'{self.url}?fields=name,id,status,device_count', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        site = Site.objects.get(name='Site 1')
+        self.assertEqual(dict(response.data['results'][0]), {
+            'id': site.pk,
+            'name': 'Site 1',
+            'status': {'value': site.status, 'label': site.get_status_display()},
+            'device_count': 0,
+        })
+
+    def test_fields_related_objects(self):
+        response = self.client.get(f'{self.url}?fields=id,url,display,region', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        result = response.data['results'][0]
+        self.assertEqual(list(result), ['id', 'url', 'display', 'region'])
+        self.assertEqual(result['display'], 'Site 1')
+        self.assertEqual(result['region']['name'], 'Region 1')
+
+    def test_fields_detail(self):
+        site = Site.objects.first()
+        url = reverse('dcim-api:site-detail', kwargs={'pk': site.pk})
+        response = self.client.get(f'{url}?fields=name,custom_fields', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(dict(response.data), {'name': site.name, 'custom_fields': {}})
+
+    def test_fields_with_cursor(self):
+        response = self.client.get(f'{self.url}?fields=name&limit=2&cursor=', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        results = [dict(result) for result in response.data['results']]
+        self.assertEqual(results, [{'name': 'Site 1'}, {'name': 'Site 2'}])
+        pk = Site.objects.get(name='Site 2').pk
+        self.assertTrue(response.data['next'].endswith(f'cursor={pk}&fields=name&limit=2'))
+
+    def test_invalid_fields(self):
+        response = self.client.get(f'{self.url}?fields=id,foo', format='json', **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+
+
+class APIBulkOperationTestCase(APITestCase):
+    user_permissions = ('dcim.change_site', 'dcim.delete_site')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('dcim-api:site-list')
+
+        Site.objects.bulk_create([
+            Site(name=f'Site {i}', slug=f'site-{i}') for i in range(1, 6)
+        ])
+
+    def test_bulk_update(self):
+        sites = list(Site.objects.order_by('pk')[:3])
+        data = [
+            {'id': sites[0].pk, 'description': 'Foo'},
+            {'id': sites[1].pk, 'description': 'Foo'},
+            {'id': sites[2].pk, 'name': 'Site X', 'status': SiteStatusChoices.STATUS_PLANNED},
+        ]
+
+        response = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Site.objects.filter(description='Foo').count(), 2)
+        site = Site.objects.get(pk=sites[2].pk)
+        self.assertEqual(site.name, 'Site X')
+        self.assertEqual(site._name, naturalize('Site X', max_length=100))
+        self.assertEqual(site.status, SiteStatusChoices.STATUS_PLANNED)
+        self.assertGreater(site.last_updated, sites[2].last_updated)
+
+        # Verify ObjectChange creation
+        objectchanges = ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_for_model(Site),
+            action=ObjectChangeActionChoices.ACTION_UPDATE
+        )
+        self.assertEqual(objectchanges.count(), 3)
+        objectchange = objectchanges.get(changed_object_id=sites[2].pk)
+        self.assertEqual(objectchange.prechange_data['name'], sites[2].name)
+        self.assertEqual(objectchange.postchange_data['name'], 'Site X')
+
+    def test_bulk_update_same_as_per_object_update(self):
+        pks = list(Site.objects.order_by('pk').values_list('pk', flat=True))
+        data = [
+            {'id': pks[0], 'description': 'Foo', 'custom_fields': {}},
+            {'id': pks[1], 'status': SiteStatusChoices.STATUS_PLANNED},
+        ]
+
+        response = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        with patch.object(SiteViewSet, 'set_based_bulk_update', False):
+            expected = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(expected, status.HTTP_200_OK)
+
+        for obj, expected_obj in zip(response.data, expected.data):
+            obj.pop('last_updated')
+            expected_obj.pop('last_updated')
+            self.assertEqual(obj, expected_obj)
+
+    def test_bulk_update_dependent_objects(self):
+        """
+        Objects which are valid only following changes to other objects should be updated in turn.
+        """
+        sites = list(Site.objects.order_by('_name')[:2])
+        data = [
+            {'id': sites[0].pk, 'name': 'Site X'},
+            {'id': sites[1].pk, 'name': sites[0].name},
+        ]
+
+        response = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(Site.objects.get(pk=sites[0].pk).name, 'Site X')
+        self.assertEqual(Site.objects.get(pk=sites[1].pk).name, sites[0].name)
+
+    def test_bulk_update_invalid(self):
+        sites = list(Site.objects.order_by('pk')[:2])
+        data = [
+            {'id': sites[0].pk, 'description': 'Foo'},
+            {'id': sites[1].pk, 'status': 'invalid'},
+        ]
+
+        with disable_warnings('django.request'):
+            response = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Site.objects.filter(description='Foo').exists())
+
+    def test_bulk_update_conflicting_objects(self):
+        """
+        Objects which are valid individually but conflict with one another should be rejected as they would be when
+        updated in turn (VirtualMachine names must be unique within a cluster, but this is not enforced by the database
+        when no tenant is assigned).
+        """
+        cluster = Cluster.objects.create(name='Cluster 1', type=ClusterType.objects.create(name='Cluster Type 1', slug='cluster-type-1'))
+        virtual_machines = VirtualMachine.objects.bulk_create([
+            VirtualMachine(name=f'VM {i}', cluster=cluster) for i in range(1, 3)
+        ])
+        self.add_permissions('virtualization.change_virtualmachine')
+        data = [
+            {'id': vm.pk, 'name': 'VM X'} for vm in virtual_machines
+        ]
+
+        with disable_warnings('django.request'):
+            response = self.client.patch(
+                reverse('virtualization-api:virtualmachine-list'), data, format='json', **self.header
+            )
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(VirtualMachine.objects.filter(name='VM X').exists())
+
+    def test_bulk_update_constrained_permission(self):
+        obj_perm = ObjectPermission(
+            name='Constrained permission',
+            actions=['change'],
+            constraints={'description': ''}
+        )
+        obj_perm.save()
+        obj_perm.users.add(self.user)
+        obj_perm.object_types.add(ContentType.objects.get_for_model(Site))
+        ObjectPermission.objects.filter(name='dcim.change_site').delete()
+
+        data = [
+            {'id': pk, 'description': 'Foo'} for pk in Site.objects.values_list('pk', flat=True)[:3]
+        ]
+
+        with disable_warnings('django.request'):
+            response = self.client.patch(self.url, data, format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Site.objects.filter(description='Foo').exists())
+
+    def test_bulk_destroy(self):
+        pks = list(Site.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        Rack.objects.create(name='Rack 1', site_id=pks[0])
+
+        response = self.client.delete(self.url, [{'id': pk} for pk in pks], format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Site.objects.filter(pk__in=pks).exists())
+        self.assertFalse(Rack.objects.exists())
+
+        # Verify ObjectChange creation (including for the dependent Rack)
+        objectchanges = ObjectChange.objects.filter(action=ObjectChangeActionChoices.ACTION_DELETE)
+        self.assertEqual(objectchanges.count(), 4)
+        self.assertEqual(
+            sorted(objectchanges.filter(
+                changed_object_type=ContentType.objects.get_for_model(Site)
+            ).values_list('changed_object_id', flat=True)),
+            pks
+        )
+
+    def test_bulk_destroy_protected(self):
+        pks = list(Site.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        device_role = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        Device.objects.create(device_type=device_type, device_role=device_role, site_id=pks[1])
+
+        with disable_warnings('django.request'):
+            response = self.client.delete(self.url, [{'id': pk} for pk in pks], format='json', **self.header)
+        self.assertHttpStatus(response, status.HTTP_409_CONFLICT)
+        self.assertEqual(Site.objects.filter(pk__in=pks).count(), 3)
+
 
 class APIOrderingTestCase(APITestCase):
     user_permissions = ('dcim.view_site',)
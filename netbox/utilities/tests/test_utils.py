@@ -1,7 +1,21 @@
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.serializers import serialize
 from django.http import QueryDict
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from jinja2.sandbox import SandboxedEnvironment
+from mptt.models import MPTTModel
 
-from utilities.utils import deepmerge, dict_to_filter_params, normalize_querydict
+from dcim.models import Device, DeviceRole, DeviceType, Interface, Manufacturer, Region, Site
+from extras.utils import is_taggable
+from ipam.models import VLAN
+from utilities.testing.utils import create_tags
+from utilities.utils import (
+    clear_jinja2_cache, deepmerge, dict_to_filter_params, get_jinja2_template, normalize_querydict, render_jinja2,
+    serialize_object,
+)
 
 
 class DictToFilterParamsTest(TestCase):
@@ -128,3 +142,120 @@ class DeepMergeTest(TestCase):
             deepmerge(dict1, dict2),
             merged
         )
+
+
+def serialize_object_reference(obj):
+    """
+    The original implementation of serialize_object() (by way of Django's JSON serializer), against which the output
+    of the optimized implementation is verified.
+    """
+    data = json.loads(serialize('json', [obj]))[0]['fields']
+    if issubclass(obj.__class__, MPTTModel):
+        for field in ['level', 'lft', 'rght', 'tree_id']:
+            data.pop(field)
+    if hasattr(obj, 'custom_field_data'):
+        data['custom_fields'] = data.pop('custom_field_data')
+    if is_taggable(obj):
+        tags = getattr(obj, '_tags', None) or obj.tags.all()
+        data['tags'] = sorted([tag.name for tag in tags])
+    for key in list(data):
+        if isinstance(key, str) and key.startswith('_'):
+            data.pop(key)
+    return data
+
+
+class SerializeObjectTest(TestCase):
+    """
+    Validate the operation of serialize_object().
+    """
+    @classmethod
+    def setUpTestData(cls):
+        region = Region.objects.create(name='Region 1', slug='region-1')
+        site = Site.objects.create(
+            name='Site 1',
+            slug='site-1',
+            region=region,
+            latitude=Decimal('40.123456'),
+            custom_field_data={'foo': [1, 2], 'bar': None}
+        )
+        site.tags.add(*create_tags('Tag 2', 'Tag 1'))
+        manufacturer = Manufacturer.objects.create(name='Manufacturer 1', slug='manufacturer-1')
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model='Device Type 1', slug='device-type-1')
+        device_role = DeviceRole.objects.create(name='Device Role 1', slug='device-role-1')
+        device = Device.objects.create(site=site, device_type=device_type, device_role=device_role, name='Device 1')
+        interface = Interface.objects.create(device=device, name='eth0', mode='tagged', mtu=1500)
+        vlans = (
+            VLAN.objects.create(vid=100, name='VLAN 100'),
+            VLAN.objects.create(vid=200, name='VLAN 200'),
+        )
+        interface.tagged_vlans.set(vlans)
+
+    def test_output_matches_reference(self):
+        for obj in (
+            Region.objects.first(),
+            Site.objects.first(),
+            Device.objects.first(),
+            Interface.objects.first(),
+            Interface.objects.prefetch_related('tagged_vlans', 'tags').first(),
+        ):
+            self.assertEqual(serialize_object(obj), serialize_object_reference(obj))
+
+    def test_extra_data(self):
+        site = Site.objects.first()
+        data = serialize_object(site, extra={'foo': 123, '_bar': 456})
+        self.assertEqual(data['foo'], 123)
+        self.assertNotIn('_bar', data)
+
+    def test_data_is_copied(self):
+        site = Site.objects.first()
+        data = serialize_object(site)
+        site.custom_field_data['foo'].append(3)
+        self.assertEqual(data['custom_fields']['foo'], [1, 2])
+
+    def test_prefetched_object_requires_no_queries(self):
+        """
+        An object whose many-to-many relations (including tags) have been prefetched should be serialized without
+        querying the database.
+        """
+        interface = Interface.objects.prefetch_related(
+            *[field.name for field in Interface._meta.many_to_many]
+        ).first()
+        expected = serialize_object_reference(interface)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(serialize_object(interface), expected)
+
+
+class RenderJinja2Test(TestCase):
+    template_code = '{% for i in items %}<a href="/dcim/devices/{{ i }}/">{{ name|upper }} {{ i }}</a>{% endfor %}'
+    context = {'name': 'device', 'items': range(5)}
+
+    def setUp(self):
+        clear_jinja2_cache()
+
+    def test_render(self):
+        self.assertEqual(
+            render_jinja2('{{ name }} {{ items|length }}', {'name': 'Device 1', 'items': [1, 2]}),
+            'Device 1 2'
+        )
+
+    def test_template_is_cached(self):
+        template = get_jinja2_template(self.template_code)
+        self.assertIs(get_jinja2_template(self.template_code), template)
+        self.assertIsNot(get_jinja2_template(self.template_code + ' '), template)
+
+        clear_jinja2_cache()
+        self.assertIsNot(get_jinja2_template(self.template_code), template)
+
+    @override_settings(JINJA2_FILTERS={'double': lambda value: value * 2})
+    def test_custom_filters(self):
+        self.assertEqual(render_jinja2('{{ 2|double }}', {}), '4')
+
+    def test_cached_template_is_not_recompiled(self):
+        expected = render_jinja2(self.template_code, self.context)
+        template = get_jinja2_template(self.template_code)
+
+        with patch.object(SandboxedEnvironment, 'from_string') as from_string:
+            self.assertIs(get_jinja2_template(self.template_code), template)
+            self.assertEqual(render_jinja2(self.template_code, self.context), expected)
+        from_string.assert_not_called()
@@ -1,14 +1,18 @@
 import datetime
 import decimal
+import hashlib
 import json
+import threading
+from collections import OrderedDict
 from decimal import Decimal
 from itertools import count, groupby
 
 import bleach
-from django.core.serializers import serialize
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Count, OuterRef, Subquery
 from django.db.models.functions import Coalesce
 from django.http import QueryDict
+from django.utils.encoding import is_protected_type
 from jinja2.sandbox import SandboxedEnvironment
 from mptt.models import MPTTModel
 
@@ -18,6 +22,18 @@ from extras.utils import is_taggable
 from netbox.config import get_config
 from utilities.constants import HTTP_REQUEST_META_SAFE_COPY
 
+JSON_ENCODER = DjangoJSONEncoder()
+
+# The maximum number of compiled Jinja2 templates to retain (see get_jinja2_template())
+JINJA2_TEMPLATE_CACHE_SIZE = 256
+
+_jinja2_lock = threading.Lock()
+_jinja2_cache = {
+    'environment': None,
+    'filters': None,
+    'templates': OrderedDict(),
+}
+
 
 def get_viewname(model, action=None, rest_api=False):
     """
@@ -126,39 +142,89 @@ def count_related(model, field):
     return Coalesce(subquery, 0)
 
 
-def serialize_object(obj, extra=None):
+# Fields excluded from the serialized representation of MPTT models
+MPTT_FIELDS = ('level', 'lft', 'rght', 'tree_id')
+
+# Cache of the compiled serialization plan for each model
+_serialization_plans = {}
+
+
+def _get_serialization_plan(model):
+    """
+    Return the (name, field, is_m2m) tuples for all fields of the given model to be included by serialize_object(),
+    in the order employed by Django's built-in serializer. Private fields (prefaced with an underscore) and MPTT
+    fields are omitted.
     """
-    Return a generic JSON representation of an object using Django's built-in serializer. (This is used for things like
-    change logging, not the REST API.) Optionally include a dictionary to supplement the object data. A list of keys
-    can be provided to exclude them from the returned dictionary. Private fields (prefaced with an underscore) are
-    implicitly excluded.
+    if model not in _serialization_plans:
+        exclude = MPTT_FIELDS if issubclass(model, MPTTModel) else ()
+        plan = [
+            (field.name, field, False) for field in model._meta.local_fields
+            if field.serialize
+        ] + [
+            (field.name, field, True) for field in model._meta.local_many_to_many
+            if field.serialize and field.remote_field.through._meta.auto_created
+        ]
+        _serialization_plans[model] = [
+            p for p in plan if not p[0].startswith('_') and p[0] not in exclude
+        ]
+    return _serialization_plans[model]
+
+
+def _serialize_value(value, field, obj):
     """
-    json_str = serialize('json', [obj])
-    data = json.loads(json_str)[0]['fields']
+    Return the value of a field as it would be represented after a round trip through Django's JSON serializer.
+    """
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    if isinstance(value, (Decimal, datetime.date, datetime.time)):
+        return JSON_ENCODER.default(value)
+    if is_protected_type(value):
+        return value
+    value = field.value_to_string(obj)
+    if type(value) is str:
+        return value
+    # Copy any other values (e.g. JSON data) so that the representation does not share mutable state with the instance
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
 
-    # Exclude any MPTTModel fields
-    if issubclass(obj.__class__, MPTTModel):
-        for field in ['level', 'lft', 'rght', 'tree_id']:
-            data.pop(field)
+def serialize_object(obj, extra=None):
+    """
+    Return a generic JSON representation of an object, equivalent to that produced by Django's built-in serializer.
+    (This is used for things like change logging, not the REST API.) Optionally include a dictionary to supplement the
+    object data. Private fields (prefaced with an underscore) are implicitly excluded.
+    """
+    data = {}
+    for name, field, is_m2m in _get_serialization_plan(obj._meta.concrete_model):
+        if is_m2m:
+            # Use any prefetched objects; fall back to querying the PKs of related objects
+            prefetched = getattr(obj, '_prefetched_objects_cache', {}).get(name)
+            if prefetched is not None:
+                pks = [related.pk for related in prefetched]
+            else:
+                pks = getattr(obj, name).values_list('pk', flat=True)
+            data[name] = [
+                pk if is_protected_type(pk) else str(pk) for pk in pks
+            ]
+        else:
+            data[name] = _serialize_value(field.value_from_object(obj), field, obj)
 
     # Include custom_field_data as "custom_fields"
     if hasattr(obj, 'custom_field_data'):
         data['custom_fields'] = data.pop('custom_field_data')
 
-    # Include any tags. Check for tags cached on the instance; fall back to using the manager.
+    # Include any tags. Check for tags cached on the instance or prefetched; fall back to using the manager.
     if is_taggable(obj):
-        tags = getattr(obj, '_tags', None) or obj.tags.all()
-        data['tags'] = sorted([tag.name for tag in tags])
+        tags = getattr(obj, '_tags', None) or getattr(obj, '_prefetched_objects_cache', {}).get('tags')
+        if tags is not None:
+            data['tags'] = sorted([tag.name for tag in tags])
+        else:
+            data['tags'] = sorted(obj.tags.values_list('name', flat=True))
 
-    # Append any extra data
+    # Append any extra data, omitting private keys
     if extra is not None:
-        data.update(extra)
-
-    # Copy keys to list to avoid 'dictionary changed size during iteration' exception
-    for key in list(data):
-        # Private fields shouldn't be logged in the object change
-        if isinstance(key, str) and key.startswith('_'):
-            data.pop(key)
+        data.update({
+            key: value for key, value in extra.items() if not (isinstance(key, str) and key.startswith('_'))
+        })
 
     return data
 
@@ -270,13 +336,60 @@ def to_meters(length, unit):
     raise ValueError(f"Unknown unit {unit}. Must be 'km', 'm', 'cm', 'mi', 'ft', or 'in'.")
 
 
+def get_jinja2_environment():
+    """
+    Return the SandboxedEnvironment shared by all Jinja2 templates, with any custom JINJA2_FILTERS applied. The
+    environment (and any templates compiled within it) is replaced should the configured filters change.
+    """
+    filters = get_config().JINJA2_FILTERS
+    with _jinja2_lock:
+        if _jinja2_cache['environment'] is None or _jinja2_cache['filters'] is not filters:
+            environment = SandboxedEnvironment()
+            environment.filters.update(filters)
+            _jinja2_cache['environment'] = environment
+            _jinja2_cache['filters'] = filters
+            _jinja2_cache['templates'].clear()
+        return _jinja2_cache['environment']
+
+
+def get_jinja2_template(template_code):
+    """
+    Return the compiled Jinja2 Template for the given template code. Up to JINJA2_TEMPLATE_CACHE_SIZE compiled templates
+    are retained (keyed by a hash of their source code), evicting the least recently used.
+    """
+    environment = get_jinja2_environment()
+    key = hashlib.sha256(template_code.encode('utf8')).digest()
+    templates = _jinja2_cache['templates']
+
+    with _jinja2_lock:
+        template = templates.get(key)
+        if template is not None and template.environment is environment:
+            templates.move_to_end(key)
+            return template
+
+    # Compile the template outside the lock; a concurrent compilation of the same code is harmless
+    template = environment.from_string(source=template_code)
+    with _jinja2_lock:
+        templates[key] = template
+        while len(templates) > JINJA2_TEMPLATE_CACHE_SIZE:
+            templates.popitem(last=False)
+
+    return template
+
+
+def clear_jinja2_cache():
+    """
+    Discard all cached Jinja2 templates.
+    """
+    with _jinja2_lock:
+        _jinja2_cache['templates'].clear()
+
+
 def render_jinja2(template_code, context):
     """
     Render a Jinja2 template with the provided context. Return the rendered content.
     """
-    environment = SandboxedEnvironment()
-    environment.filters.update(get_config().JINJA2_FILTERS)
-    return environment.from_string(source=template_code).render(**context)
+    return get_jinja2_template(template_code).render(**context)
 
 
 def prepare_cloned_fields(instance):
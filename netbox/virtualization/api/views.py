@@ -67,6 +67,8 @@ class VirtualMachineViewSet(ConfigContextQuerySetMixin, NetBoxModelViewSet):
         If the `exclude` query param includes `config_context` as a value, return the VirtualMachineSerializer
 
         Else, return the VirtualMachineWithConfigContextSerializer
+
+        If the `fields` query param has been passed, the serializer includes only the requested fields
         """
 
         request = self.get_serializer_context()['request']
@@ -74,9 +76,9 @@ class VirtualMachineViewSet(ConfigContextQuerySetMixin, NetBoxModelViewSet):
             return serializers.NestedVirtualMachineSerializer
 
         elif 'config_context' in request.query_params.get('exclude', []):
-            return serializers.VirtualMachineSerializer
+            return self.get_projected_serializer_class(serializers.VirtualMachineSerializer)
 
-        return serializers.VirtualMachineWithConfigContextSerializer
+        return self.get_projected_serializer_class(serializers.VirtualMachineWithConfigContextSerializer)
 
 
 class VMInterfaceViewSet(NetBoxModelViewSet):